@@ -1,28 +1,108 @@
 from typing import List
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 
-from app.models.admin import DocumentInfo, ReindexRequest
-from app.scripts.ingest import ingest_files
-from app.services import documents_service
+from app.core import executors
+from app.core.chroma_client import CollectionUnavailableError
+from app.models.admin import (
+    CollectionVersions,
+    DocumentInfo,
+    JobInfo,
+    MigrateDimensionsRequest,
+    ReindexRequest,
+)
+from app.services import (
+    collections_service,
+    documents_service,
+    jobs_service,
+    stats_service,
+)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
 @router.get("/documents", response_model=List[DocumentInfo])
-def get_documents(collection: str = Query("docs")):
-    return documents_service.list_documents(collection_name=collection)
+async def get_documents(collection: str = Query("docs")):
+    try:
+        return await executors.run_read(
+            documents_service.list_documents, collection_name=collection
+        )
+    except CollectionUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
 
 
-@router.post("/reindex")
+@router.post("/reindex", response_model=JobInfo, status_code=202)
 async def reindex_collection(body: ReindexRequest):
-    total = await ingest_files(
-        file_patterns=body.paths,
-        collection_name=body.collection,
-        chunk_size=body.chunk_size,
-        chunk_overlap=body.chunk_overlap,
-        reset=body.reset,
-        mode=body.mode,
-    )
-
-    return {"collection": body.collection, "total_chunks": total}
+    try:
+        return await jobs_service.get_job_manager().submit_reindex(body)
+    except jobs_service.JobQueueFullError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    except jobs_service.JobsRunElsewhereError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+
+@router.get("/jobs", response_model=List[JobInfo])
+async def list_jobs():
+    return await jobs_service.get_job_manager().list_jobs()
+
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    try:
+        return await jobs_service.get_job_manager().get_job(job_id)
+    except jobs_service.JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobInfo, status_code=202)
+async def cancel_job(job_id: str):
+    try:
+        return await jobs_service.get_job_manager().cancel(job_id)
+    except jobs_service.JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    except jobs_service.JobAlreadyFinishedError:
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' already finished")
+    except jobs_service.JobsRunElsewhereError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+
+@router.get("/collections/{collection}/versions", response_model=CollectionVersions)
+async def get_collection_versions(collection: str):
+    return await executors.run_read(collections_service.describe, collection)
+
+
+@router.post("/collections/{collection}/rollback", response_model=CollectionVersions)
+async def rollback_collection(collection: str):
+    try:
+        await executors.run_write(collections_service.rollback, collection)
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return await executors.run_read(collections_service.describe, collection)
+
+
+@router.post(
+    "/collections/{collection}/migrate-dimensions",
+    response_model=JobInfo,
+    status_code=202,
+)
+async def migrate_collection_dimensions(
+    collection: str, body: MigrateDimensionsRequest
+):
+    """Re-embed the collection at a new width as a background job."""
+    try:
+        return await jobs_service.get_job_manager().submit_migration(collection, body)
+    except jobs_service.JobQueueFullError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    except jobs_service.JobsRunElsewhereError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+
+@router.post("/collections/gc")
+async def collect_collection_garbage():
+    deleted = await executors.run_write(collections_service.collect_garbage)
+    return {"deleted": deleted}
+
+
+@router.get("/stats")
+async def get_stats():
+    return await stats_service.collect_stats()
@@ -1,12 +1,77 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 
-from app.models.embed import EmbedRequest, EmbedResponse
+from app.core import tokens, vector_codec
+from app.core.config import get_settings
+from app.models.embed import (
+    EmbedBatchRequest,
+    EmbedBatchResponse,
+    EmbedRequest,
+    EmbedResponse,
+)
 from app.services import openai_service
+from app.services.embedding_service import embed_chunks
 
 router = APIRouter(tags=["embeddings"])
 
+OCTET_STREAM = "application/octet-stream"
+
 
 @router.post(path="/embed", response_model=EmbedResponse)
 async def emed(http_request: Request, request: EmbedRequest):
+    settings = get_settings()
+    size = tokens.count_tokens(request.text, settings.openai_embed_model)
+    if size > settings.embed_max_input_tokens:
+        # Upstream would reject it, failing every request batched with it
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"Text is {size} tokens; at most "
+                f"{settings.embed_max_input_tokens} can be embedded."
+            ),
+        )
     vector = await openai_service.embed_text(http_request, request.text)
     return EmbedResponse(embedding=vector)
+
+
+@router.post(
+    path="/embed/batch",
+    response_model=EmbedBatchResponse,
+    responses={200: {"content": {OCTET_STREAM: {}}}},
+)
+async def embed_batch(http_request: Request, request: EmbedBatchRequest):
+    # Split by EMBED_BATCH_SIZE / EMBED_BATCH_MAX_TOKENS, cached texts skipped
+    vectors = await embed_chunks(
+        request.texts, dimensions=request.dimensions, http_request=http_request
+    )
+    model = get_settings().openai_embed_model
+
+    if OCTET_STREAM in http_request.headers.get("accept", ""):
+        # Raw row-major little-endian matrix; shape and dtype in headers
+        body, (rows, columns) = vector_codec.encode_matrix_bytes(vectors, request.dtype)
+        return Response(
+            content=body,
+            media_type=OCTET_STREAM,
+            headers={
+                "X-Embedding-Shape": f"{rows},{columns}",
+                "X-Embedding-Dtype": request.dtype,
+                "X-Embedding-Model": model,
+            },
+        )
+
+    dimensions = len(vectors[0]) if vectors else 0
+    if request.encoding == "base64":
+        return EmbedBatchResponse(
+            model=model,
+            count=len(vectors),
+            dimensions=dimensions,
+            encoding="base64",
+            dtype=request.dtype,
+            embeddings=vector_codec.encode_base64_rows(vectors, request.dtype),
+        )
+    return EmbedBatchResponse(
+        model=model,
+        count=len(vectors),
+        dimensions=dimensions,
+        encoding="float",
+        embeddings=vectors,
+    )
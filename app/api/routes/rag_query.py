@@ -1,17 +1,65 @@
-from fastapi import APIRouter, Request
+import asyncio
+import json
 
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from app.core.chroma_client import CollectionUnavailableError
+from app.core.embedding_dims import DimensionMismatchError
 from app.models.rag import RagAnswer, RagRequest
 from app.services import rag_service
 
 router = APIRouter(tags=["rag"])
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @router.post("/rag-query", response_model=RagAnswer)
 async def rag_query(http_request: Request, request: RagRequest) -> RagAnswer:
-    return await rag_service.rag_with_answer(
-        http_request=http_request,
-        question=request.question,
-        top_k=request.top_k,
-        filename=request.filename,
-        metadata_filter=request.filters,
+    try:
+        return await rag_service.rag_with_answer(
+            http_request=http_request,
+            question=request.question,
+            top_k=request.top_k,
+            filename=request.filename,
+            metadata_filter=request.filters,
+        )
+    except DimensionMismatchError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except CollectionUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Vector search timed out")
+
+
+@router.post("/rag-query/stream")
+async def rag_query_stream(http_request: Request, request: RagRequest):
+    """
+    Server-sent events: `sources`, then `answer` / `summary` deltas, then
+    `done` (usage and timings). Failures after the stream has started are
+    reported as an `error` event.
+    """
+    http_request.state.is_streaming = True
+
+    async def event_stream():
+        try:
+            async for event, data in rag_service.stream_rag_answer(
+                http_request=http_request,
+                question=request.question,
+                top_k=request.top_k,
+                filename=request.filename,
+                metadata_filter=request.filters,
+            ):
+                yield _sse(event, data)
+        except Exception:
+            logger.exception("rag_stream_failed")
+            yield _sse("error", {"detail": "Internal server error"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
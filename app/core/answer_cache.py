@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.models.rag import RagAnswer
+
+
+class _ScopeIndex:
+    """
+    Unit question vectors of one scope as rows of a preallocated matrix, so
+    a lookup is a single matrix-vector product. Removal moves the last row
+    into the freed slot; capacity doubles when full.
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.created_at = np.empty(capacity, dtype=np.float64)
+        self.entry_ids: List[int] = []
+        self.answers: List[RagAnswer] = []
+        self.rows: Dict[int, int] = {}
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
+
+    def add(
+        self, entry_id: int, vector: np.ndarray, answer: RagAnswer, created_at: float
+    ) -> None:
+        row = len(self)
+        if row == len(self.matrix):
+            self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+            self.created_at = np.concatenate(
+                [self.created_at, np.empty_like(self.created_at)]
+            )
+        self.matrix[row] = vector
+        self.created_at[row] = created_at
+        self.entry_ids.append(entry_id)
+        self.answers.append(answer)
+        self.rows[entry_id] = row
+
+    def remove(self, entry_id: int) -> None:
+        row = self.rows.pop(entry_id)
+        last = len(self) - 1
+        if row != last:
+            moved = self.entry_ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.created_at[row] = self.created_at[last]
+            self.entry_ids[row] = moved
+            self.answers[row] = self.answers[last]
+            self.rows[moved] = row
+        self.entry_ids.pop()
+        self.answers.pop()
+
+    def created_before(self, cutoff: float) -> List[int]:
+        rows = np.flatnonzero(self.created_at[: len(self)] < cutoff)
+        return [self.entry_ids[row] for row in rows]
+
+    def best(self, query: np.ndarray) -> Tuple[int, float]:
+        """(row, cosine similarity) of the entry closest to `query`."""
+        scores = self.matrix[: len(self)] @ query
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+
+class SemanticAnswerCache:
+    """
+    In-memory cache of RAG answers, looked up by cosine similarity of the
+    question embedding.
+
+    - Entries live in a `scope` (collection build, filename, filters, top_k);
+      a lookup only compares against entries of the same scope, in one
+      matrix-vector product over the scope's preallocated matrix.
+    - A hit needs similarity >= `threshold`; the closest entry wins.
+    - Entries expire after `ttl_seconds`; beyond `max_entries` the least
+      recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._ids = count()
+        # LRU order over all scopes; value is the entry's scope
+        self._order: "OrderedDict[int, str]" = OrderedDict()
+        self._scopes: Dict[str, _ScopeIndex] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm > 0 else arr
+
+    def _remove(self, entry_id: int) -> None:
+        scope = self._order.pop(entry_id, None)
+        if scope is None:
+            return
+        index = self._scopes.get(scope)
+        if index is not None:
+            index.remove(entry_id)
+            if not len(index):
+                del self._scopes[scope]
+
+    def get(self, scope: str, vector: Sequence[float]) -> Optional[RagAnswer]:
+        query = self._normalize(vector)
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is not None:
+                for entry_id in index.created_before(cutoff):
+                    self._remove(entry_id)
+                index = self._scopes.get(scope)
+            if index is None or index.dim != len(query):
+                self.misses += 1
+                return None
+
+            row, score = index.best(query)
+            if score < self.threshold:
+                self.misses += 1
+                return None
+
+            self._order.move_to_end(index.entry_ids[row])
+            self.hits += 1
+            return index.answers[row].model_copy(update={"cached": True})
+
+    def put(self, scope: str, vector: Sequence[float], answer: RagAnswer) -> None:
+        unit = self._normalize(vector)
+        answer = answer.model_copy(update={"cached": False})
+        created_at = time.time()
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is not None and index.dim != len(unit):
+                # Embedding width changed: the old entries can never match
+                for entry_id in list(index.entry_ids):
+                    self._remove(entry_id)
+                index = None
+            if index is None:
+                index = self._scopes[scope] = _ScopeIndex(len(unit))
+
+            entry_id = next(self._ids)
+            index.add(entry_id, unit, answer, created_at)
+            self._order[entry_id] = scope
+            while len(self._order) > self.max_entries:
+                oldest = next(iter(self._order))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._order.clear()
+            self._scopes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._order),
+                "scopes": len(self._scopes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Process-wide cache, or None when ANSWER_CACHE_ENABLED is false."""
+    settings = get_settings()
+    if not settings.answer_cache_enabled:
+        return None
+    return SemanticAnswerCache(
+        max_entries=settings.answer_cache_max_entries,
+        ttl_seconds=settings.answer_cache_ttl_seconds,
+        threshold=settings.answer_cache_similarity_threshold,
+    )
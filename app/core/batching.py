@@ -0,0 +1,48 @@
+from typing import List, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+    Only used to keep embedding requests under the provider's token limit.
+    """
+    return max(1, len(text) // 4)
+
+
+def batch_ranges(
+    texts: List[str],
+    max_items: int,
+    max_tokens: int,
+) -> List[Tuple[int, int]]:
+    """
+    Split texts into contiguous [start, end) ranges so that every range holds
+    at most `max_items` texts and at most `max_tokens` estimated tokens.
+
+    A single text larger than `max_tokens` still gets its own range; the
+    provider is the one to reject it.
+    """
+    if max_items <= 0:
+        raise ValueError("max_items must be > 0")
+
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be > 0")
+
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    batch_tokens = 0
+
+    for idx, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        batch_len = idx - start
+
+        if batch_len and (batch_len >= max_items or batch_tokens + tokens > max_tokens):
+            ranges.append((start, idx))
+            start = idx
+            batch_tokens = 0
+
+        batch_tokens += tokens
+
+    if start < len(texts):
+        ranges.append((start, len(texts)))
+
+    return ranges
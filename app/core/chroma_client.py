@@ -1,17 +1,262 @@
+import asyncio
 import os
+import threading
+from typing import Dict, Optional, Tuple
 
 import chromadb
+from chromadb.api import AsyncClientAPI, ClientAPI
+from chromadb.api.client import SharedSystemClient
+from chromadb.api.models.AsyncCollection import AsyncCollection
+from chromadb.api.models.Collection import Collection
 from chromadb.config import Settings
+from chromadb.errors import NotFoundError
+from loguru import logger
 
+from app.core.collection_aliases import get_alias_store
 from app.core.config import get_settings
 
 
-def get_chroma_client(db_path: str | None = None):
+class CollectionUnavailableError(LookupError):
+    """A collection (or the build its alias points at) does not exist."""
+
+
+def _http_client_kwargs() -> dict:
+    """HttpClient / AsyncHttpClient arguments, pool sizing included."""
     settings = get_settings()
-    resolved_path = db_path or settings.chroma_persist_dir
-    os.makedirs(resolved_path, exist_ok=True)
-    client = chromadb.PersistentClient(
-        path=resolved_path, settings=Settings(anonymized_telemetry=False)
+    return dict(
+        host=settings.chroma_host,
+        port=settings.chroma_port,
+        ssl=settings.chroma_ssl,
+        # Chroma adds its own headers to the dict it is given
+        headers=dict(settings.chroma_headers),
+        tenant=settings.chroma_tenant,
+        database=settings.chroma_database,
+        settings=Settings(
+            anonymized_telemetry=False,
+            chroma_http_max_connections=settings.chroma_http_max_connections,
+            chroma_http_max_keepalive_connections=settings.chroma_http_max_keepalive,
+            chroma_http_keepalive_secs=settings.chroma_http_keepalive_seconds,
+        ),
+    )
+
+
+class ChromaRegistry:
+    """
+    Process-wide cache of Chroma clients and collection handles. With
+    CHROMA_MODE=embedded there is one PersistentClient per persist dir; with
+    CHROMA_MODE=http one pooled HttpClient for the configured server (plus
+    an AsyncHttpClient per event loop, for async queries). Handles must be
+    invalidated whenever a collection is deleted or recreated, otherwise
+    they keep pointing at the old collection id.
+
+    Collection names are resolved through the alias store first, so a
+    logical name like "docs" always maps to its newest complete build. In
+    http mode the aliases are kept on the server too, so every replica
+    serves the same build.
+
+    Reads never create collections: a missing one raises
+    `CollectionUnavailableError`. Only writers pass `create=True`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, ClientAPI] = {}
+        self._collections: Dict[Tuple[str, str], Collection] = {}
+        self._async_clients: Dict[int, AsyncClientAPI] = {}
+        self._async_collections: Dict[Tuple[int, str], AsyncCollection] = {}
+
+    @staticmethod
+    def _http_mode() -> bool:
+        return get_settings().chroma_mode == "http"
+
+    @staticmethod
+    def _resolve_path(db_path: Optional[str]) -> str:
+        return os.path.abspath(db_path or get_settings().chroma_persist_dir)
+
+    def _client_key(self, db_path: Optional[str]) -> str:
+        """Persist dir in embedded mode, server URL in http mode."""
+        if not self._http_mode():
+            return self._resolve_path(db_path)
+        settings = get_settings()
+        scheme = "https" if settings.chroma_ssl else "http"
+        return (
+            f"{scheme}://{settings.chroma_host}:{settings.chroma_port}"
+            f"/{settings.chroma_tenant}/{settings.chroma_database}"
+        )
+
+    def _create_client(self, key: str) -> ClientAPI:
+        if not self._http_mode():
+            os.makedirs(key, exist_ok=True)
+            client = chromadb.PersistentClient(
+                path=key, settings=Settings(anonymized_telemetry=False)
+            )
+            logger.info("chroma_client_created", path=key)
+            return client
+
+        client = chromadb.HttpClient(**_http_client_kwargs())
+        logger.info("chroma_http_client_created", url=key)
+        return client
+
+    def get_client(self, db_path: Optional[str] = None) -> ClientAPI:
+        key = self._client_key(db_path)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._create_client(key)
+                self._clients[key] = client
+        return client
+
+    async def get_async_client(self) -> AsyncClientAPI:
+        """
+        AsyncHttpClient for the running event loop (http mode only). Chroma
+        keeps one httpx pool per loop, so clients are cached per loop too.
+        """
+        if not self._http_mode():
+            raise RuntimeError("Async Chroma clients need CHROMA_MODE=http")
+        loop_id = id(asyncio.get_running_loop())
+        client = self._async_clients.get(loop_id)
+        if client is None:
+            client = await chromadb.AsyncHttpClient(**_http_client_kwargs())
+            self._async_clients[loop_id] = client
+        return client
+
+    async def get_async_collection(self, name: str) -> AsyncCollection:
+        """Read-only handle; raises `CollectionUnavailableError` if missing."""
+        physical = get_alias_store().resolve(name)
+        key = (id(asyncio.get_running_loop()), physical)
+        collection = self._async_collections.get(key)
+        if collection is None:
+            client = await self.get_async_client()
+            try:
+                collection = await client.get_collection(name=physical)
+            except NotFoundError as exc:
+                raise _unavailable(name, physical) from exc
+            self._async_collections[key] = collection
+        return collection
+
+    def get_collection(
+        self, name: str, db_path: Optional[str] = None, create: bool = False
+    ) -> Collection:
+        """
+        Handle for `name` (resolved through the alias store). Without
+        `create`, a missing collection raises `CollectionUnavailableError`
+        instead of silently coming back empty.
+        """
+        physical = get_alias_store(db_path).resolve(name)
+        key = (self._client_key(db_path), physical)
+        collection = self._collections.get(key)
+        if collection is not None:
+            return collection
+
+        client = self.get_client(db_path)
+        with self._lock:
+            collection = self._collections.get(key)
+            if collection is None:
+                if create:
+                    collection = client.get_or_create_collection(name=physical)
+                else:
+                    try:
+                        collection = client.get_collection(name=physical)
+                    except NotFoundError as exc:
+                        raise _unavailable(name, physical) from exc
+                self._collections[key] = collection
+        return collection
+
+    def delete_collection(self, name: str, db_path: Optional[str] = None) -> None:
+        """
+        Delete a physical collection (no alias resolution) and drop its
+        cached handle. Raises if the collection does not exist.
+        """
+        client = self.get_client(db_path)
+        try:
+            client.delete_collection(name=name)
+        finally:
+            self.invalidate(name, db_path)
+
+    def collection_exists(self, name: str, db_path: Optional[str] = None) -> bool:
+        client = self.get_client(db_path)
+        return any(c.name == name for c in client.list_collections())
+
+    def invalidate(
+        self, name: Optional[str] = None, db_path: Optional[str] = None
+    ) -> None:
+        """Forget cached handles for one collection, or all of them."""
+        client_key = self._client_key(db_path)
+        with self._lock:
+            if name is None:
+                keys = [k for k in self._collections if k[0] == client_key]
+                self._async_collections.clear()
+            else:
+                physical = get_alias_store(db_path).resolve(name)
+                keys = [(client_key, name), (client_key, physical)]
+                for key in list(self._async_collections):
+                    if key[1] in (name, physical):
+                        self._async_collections.pop(key, None)
+            for key in keys:
+                self._collections.pop(key, None)
+
+    def close(self) -> None:
+        with self._lock:
+            self._collections.clear()
+            self._async_collections.clear()
+            self._async_clients.clear()
+            had_clients = bool(self._clients)
+            self._clients.clear()
+        if had_clients:
+            # Stops the shared Chroma systems (sqlite, HNSW segment writers)
+            SharedSystemClient.clear_system_cache()
+            logger.info("chroma_clients_closed")
+
+
+def _unavailable(name: str, physical: str) -> CollectionUnavailableError:
+    if name == physical:
+        return CollectionUnavailableError(f"Collection '{name}' does not exist.")
+    return CollectionUnavailableError(
+        f"Collection '{name}' points at build '{physical}', which does not exist."
     )
 
-    return client
+
+_registry = ChromaRegistry()
+
+
+def get_registry() -> ChromaRegistry:
+    return _registry
+
+
+def get_chroma_client(db_path: str | None = None) -> ClientAPI:
+    return _registry.get_client(db_path)
+
+
+def get_collection(
+    name: str, db_path: str | None = None, create: bool = False
+) -> Collection:
+    return _registry.get_collection(name, db_path, create=create)
+
+
+async def get_async_collection(name: str) -> AsyncCollection:
+    return await _registry.get_async_collection(name)
+
+
+def delete_collection(name: str, db_path: str | None = None) -> None:
+    _registry.delete_collection(name, db_path)
+
+
+def collection_exists(name: str, db_path: str | None = None) -> bool:
+    return _registry.collection_exists(name, db_path)
+
+
+def invalidate_collection(name: str | None = None, db_path: str | None = None):
+    _registry.invalidate(name, db_path)
+
+
+def init_registry() -> None:
+    """Called from the app lifespan: open the default client up front."""
+    _registry.get_client()
+
+
+def shutdown_registry() -> None:
+    _registry.close()
@@ -0,0 +1,339 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import get_settings
+
+ALIASES_FILENAME = "collection_aliases.json"
+VERSION_SEPARATOR = "__v"
+# Chroma collection holding the aliases in CHROMA_MODE=http
+ALIAS_COLLECTION = "collection-aliases"
+ALIAS_REFRESH_SECONDS = 2.0
+
+
+def _now() -> float:
+    return time.time()
+
+
+def new_version_name(alias: str) -> str:
+    """Physical collection name for a fresh build of `alias`."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+    return f"{alias}{VERSION_SEPARATOR}{stamp}"
+
+
+class AliasStore:
+    """
+    Maps logical collection names (aliases) to versioned physical Chroma
+    collections, persisted as JSON next to the Chroma data.
+
+    File layout:
+        {"docs": {"current": "docs__v2025...", "versions": [
+            {"name": "docs__v2025...", "created_at": 1.0, "retired_at": null},
+            ...]}}
+
+    Every change takes an exclusive file lock and rewrites the file
+    atomically, so the API and the CLIs can share it. Reads are served from
+    memory and reloaded when the file changes.
+    """
+
+    def __init__(self, base_dir: str):
+        os.makedirs(base_dir, exist_ok=True)
+        self.path = os.path.join(base_dir, ALIASES_FILENAME)
+        self._lock_path = self.path + ".lock"
+        self._thread_lock = threading.Lock()
+        self._data: Dict[str, dict] = {}
+        self._mtime_ns: Optional[int] = None
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._data, self._mtime_ns = {}, None
+            return
+        if mtime_ns == self._mtime_ns:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            self._data = json.load(f)
+        self._mtime_ns = mtime_ns
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive read-modify-write section, across threads and processes."""
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._mtime_ns = None
+                self._reload_if_changed()
+                yield self._data
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, indent=2)
+                os.replace(tmp_path, self.path)
+                self._mtime_ns = os.stat(self.path).st_mtime_ns
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def resolve(self, name: str) -> str:
+        """Physical collection behind `name` (or `name` itself if no alias)."""
+        with self._thread_lock:
+            self._reload_if_changed()
+            entry = self._data.get(name)
+        if entry and entry.get("current"):
+            return entry["current"]
+        return name
+
+    def is_alias(self, name: str) -> bool:
+        with self._thread_lock:
+            self._reload_if_changed()
+            return name in self._data
+
+    def versions(self, alias: str) -> List[dict]:
+        with self._thread_lock:
+            self._reload_if_changed()
+            entry = self._data.get(alias) or {"current": None, "versions": []}
+        return [
+            {**v, "current": v["name"] == entry["current"]}
+            for v in sorted(entry["versions"], key=lambda v: v["created_at"])
+        ]
+
+    # -------------------------
+    # Changes
+    # -------------------------
+    def promote(
+        self, alias: str, physical: str, legacy: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Point `alias` at `physical` and retire the previous version.
+
+        `legacy` names a pre-existing collection that used to be served under
+        the alias name directly; it is kept as a retired version so it can be
+        rolled back to and garbage-collected like any other build.
+        Returns the previously current physical name.
+        """
+        with self._locked() as data:
+            entry = data.setdefault(alias, {"current": None, "versions": []})
+            now = _now()
+
+            if legacy and not any(v["name"] == legacy for v in entry["versions"]):
+                entry["versions"].append(
+                    {"name": legacy, "created_at": 0.0, "retired_at": now}
+                )
+
+            previous = entry["current"] or legacy
+            for version in entry["versions"]:
+                if version["name"] == entry["current"]:
+                    version["retired_at"] = now
+
+            if not any(v["name"] == physical for v in entry["versions"]):
+                entry["versions"].append(
+                    {"name": physical, "created_at": now, "retired_at": None}
+                )
+            for version in entry["versions"]:
+                if version["name"] == physical:
+                    version["retired_at"] = None
+            entry["current"] = physical
+
+        return previous
+
+    def rollback(self, alias: str) -> str:
+        """
+        Switch `alias` back to the most recently retired version.
+        Raises LookupError when there is nothing to roll back to.
+        """
+        with self._locked() as data:
+            entry = data.get(alias)
+            if not entry:
+                raise LookupError(f"'{alias}' is not an alias")
+
+            retired = [
+                v
+                for v in entry["versions"]
+                if v["retired_at"] is not None and v["name"] != entry["current"]
+            ]
+            if not retired:
+                raise LookupError(f"No previous version of '{alias}' to roll back to")
+
+            target = max(retired, key=lambda v: v["retired_at"])
+            now = _now()
+            for version in entry["versions"]:
+                if version["name"] == entry["current"]:
+                    version["retired_at"] = now
+            target["retired_at"] = None
+            entry["current"] = target["name"]
+            return target["name"]
+
+    def expired_versions(
+        self, grace_seconds: float, alias: Optional[str] = None
+    ) -> List[str]:
+        """Retired versions whose grace period is over (never the current one)."""
+        cutoff = _now() - grace_seconds
+        with self._thread_lock:
+            self._reload_if_changed()
+            aliases = [alias] if alias else list(self._data)
+            expired = []
+            for name in aliases:
+                entry = self._data.get(name)
+                if not entry:
+                    continue
+                for version in entry["versions"]:
+                    retired_at = version["retired_at"]
+                    if (
+                        version["name"] != entry["current"]
+                        and retired_at is not None
+                        and retired_at <= cutoff
+                    ):
+                        expired.append(version["name"])
+        return expired
+
+    def forget(self, physical: str) -> None:
+        """Drop a (deleted) physical collection from every alias."""
+        with self._locked() as data:
+            for entry in data.values():
+                entry["versions"] = [
+                    v
+                    for v in entry["versions"]
+                    if v["name"] != physical or v["name"] == entry["current"]
+                ]
+
+
+class ServerAliasStore(AliasStore):
+    """
+    AliasStore kept on the Chroma server, for CHROMA_MODE=http: every replica
+    then resolves aliases to the same build. Each alias is one record of the
+    ALIAS_COLLECTION collection, its entry stored as JSON in the document.
+
+    Reads are served from memory. Once `refresh_seconds` old, the entries
+    are re-read in a background thread while the current ones keep being
+    served, so a promotion made elsewhere is seen within a few seconds and
+    queries never wait on it. Chroma has no transactions: a change re-reads
+    the entries just before writing and writes back only the aliases it
+    touched, so changes to different aliases never overwrite each other.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable,
+        refresh_seconds: float = ALIAS_REFRESH_SECONDS,
+    ):
+        self._client_factory = client_factory
+        self.refresh_seconds = refresh_seconds
+        self._thread_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._data: Dict[str, dict] = {}
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+        self._writes = 0
+        self._handle = None
+
+    def _collection(self):
+        if self._handle is None:
+            client = self._client_factory()
+            self._handle = client.get_or_create_collection(name=ALIAS_COLLECTION)
+        return self._handle
+
+    def _fetch(self) -> Dict[str, dict]:
+        result = self._collection().get(include=["documents"])
+        return {
+            alias: json.loads(document)
+            for alias, document in zip(result["ids"], result["documents"])
+        }
+
+    def _reload_if_changed(self) -> None:
+        # Called with _thread_lock held
+        if self._loaded_at is None:
+            self._data, self._loaded_at = self._fetch(), time.monotonic()
+        elif (
+            not self._refreshing
+            and time.monotonic() - self._loaded_at >= self.refresh_seconds
+        ):
+            self._refreshing = True
+            threading.Thread(
+                target=self._refresh,
+                args=(self._writes,),
+                name="alias-refresh",
+                daemon=True,
+            ).start()
+
+    def _refresh(self, writes: int) -> None:
+        try:
+            data = self._fetch()
+        except Exception as exc:
+            logger.warning("alias_refresh_failed", error=str(exc))
+            data = None
+        with self._thread_lock:
+            # A change made meanwhile is newer than what we just read
+            if data is not None and writes == self._writes:
+                self._data, self._loaded_at = data, time.monotonic()
+            self._refreshing = False
+
+    @contextmanager
+    def _locked(self):
+        with self._write_lock:
+            data = self._fetch()
+            before = {alias: json.dumps(entry) for alias, entry in data.items()}
+            yield data
+            changed = [
+                alias
+                for alias, entry in data.items()
+                if json.dumps(entry) != before.get(alias)
+            ]
+            if changed:
+                self._collection().upsert(
+                    ids=changed,
+                    documents=[json.dumps(data[alias]) for alias in changed],
+                    # Chroma needs a vector per record; aliases do not use it
+                    embeddings=[[0.0]] * len(changed),
+                )
+            with self._thread_lock:
+                self._data, self._loaded_at = data, time.monotonic()
+                self._writes += 1
+
+
+_stores: Dict[str, AliasStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _store_key(db_path: Optional[str]) -> str:
+    settings = get_settings()
+    if settings.chroma_mode == "http":
+        return (
+            f"http://{settings.chroma_host}:{settings.chroma_port}"
+            f"/{settings.chroma_tenant}/{settings.chroma_database}"
+        )
+    return os.path.abspath(db_path or settings.chroma_persist_dir)
+
+
+def _create_store(key: str) -> AliasStore:
+    if get_settings().chroma_mode != "http":
+        return AliasStore(key)
+    # chroma_client resolves names through this module
+    from app.core import chroma_client
+
+    return ServerAliasStore(chroma_client.get_chroma_client)
+
+
+def get_alias_store(db_path: Optional[str] = None) -> AliasStore:
+    """
+    The file-backed store under the persist dir in embedded mode, the
+    server-backed one in http mode.
+    """
+    key = _store_key(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _create_store(key)
+            _stores[key] = store
+    return store
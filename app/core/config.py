@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Dict, Literal, Optional
 
 from loguru import logger
 from pydantic import Field
@@ -24,12 +25,133 @@ class Settings(BaseSettings):
         validation_alias="OPENAI_EMBED_MODEL",
     )
 
+    # -------------------------
+    # Prompt templates (app/core/prompts.py)
+    # -------------------------
+    # Pin template versions, JSON: {"rag": "v1"}; default is the newest
+    prompt_versions: Dict[str, str] = Field(
+        default_factory=dict, validation_alias="PROMPT_VERSIONS"
+    )
+
     # -------------------------
     # RAG Defaults (future-friendly)
     # -------------------------
     default_top_k: int = Field(default=6, validation_alias="DEFAULT_TOP_K")
     max_top_k: int = Field(default=20, validation_alias="MAX_TOP_K")
     max_query_chars: int = Field(default=2000, validation_alias="MAX_QUERY_CHARS")
+    # Token budget for the retrieved context in RAG prompts (0 = no limit)
+    rag_context_max_tokens: int = Field(
+        default=3000, ge=0, validation_alias="RAG_CONTEXT_MAX_TOKENS"
+    )
+    # Merge adjacent chunks of the same page, dropping their overlap
+    rag_context_merge_adjacent: bool = Field(
+        default=True, validation_alias="RAG_CONTEXT_MERGE_ADJACENT"
+    )
+
+    # -------------------------
+    # Embedding width (text-embedding-3 `dimensions`)
+    # -------------------------
+    # Width new collection builds are embedded at; unset = the model's full width
+    embed_dimensions: Optional[int] = Field(
+        default=None, ge=1, validation_alias="EMBED_DIMENSIONS"
+    )
+    # Per-collection override, JSON: {"docs": 512}
+    collection_embed_dimensions: Dict[str, int] = Field(
+        default_factory=dict, validation_alias="COLLECTION_EMBED_DIMENSIONS"
+    )
+    # Query vector wider than the collection: "adapt" (truncate and
+    # re-normalize) or "refuse"
+    embed_dimension_mismatch: Literal["adapt", "refuse"] = Field(
+        default="adapt", validation_alias="EMBED_DIMENSION_MISMATCH"
+    )
+
+    # -------------------------
+    # Embedding batches (ingestion)
+    # -------------------------
+    embed_batch_size: int = Field(default=128, validation_alias="EMBED_BATCH_SIZE")
+    embed_batch_max_tokens: int = Field(
+        default=100_000, validation_alias="EMBED_BATCH_MAX_TOKENS"
+    )
+    embed_concurrency: int = Field(default=4, validation_alias="EMBED_CONCURRENCY")
+    embed_max_retries: int = Field(default=3, validation_alias="EMBED_MAX_RETRIES")
+
+    # -------------------------
+    # Embedding micro-batching (queries, /embed)
+    # -------------------------
+    # Concurrent single-text embed calls are coalesced into one request
+    embed_microbatch_enabled: bool = Field(
+        default=True, validation_alias="EMBED_MICROBATCH_ENABLED"
+    )
+    embed_microbatch_max_size: int = Field(
+        default=64, validation_alias="EMBED_MICROBATCH_MAX_SIZE"
+    )
+    embed_microbatch_max_wait_ms: float = Field(
+        default=5.0, validation_alias="EMBED_MICROBATCH_MAX_WAIT_MS"
+    )
+    # Longer /embed texts are refused before they reach a batch (the
+    # embedding models accept 8192 tokens per input)
+    embed_max_input_tokens: int = Field(
+        default=8192, validation_alias="EMBED_MAX_INPUT_TOKENS"
+    )
+
+    # -------------------------
+    # Ingestion pipeline (parse -> embed -> write)
+    # -------------------------
+    # Processes used to extract and chunk documents; 1 parses in-process
+    parse_workers: int = Field(default=4, validation_alias="PARSE_WORKERS")
+    # PDFs with more pages than this are split across several workers
+    pdf_pages_per_task: int = Field(default=50, validation_alias="PDF_PAGES_PER_TASK")
+    # Batches buffered between stages; a full queue pauses the stage before it
+    ingest_queue_size: int = Field(default=8, validation_alias="INGEST_QUEUE_SIZE")
+    ingest_write_concurrency: int = Field(
+        default=1, validation_alias="INGEST_WRITE_CONCURRENCY"
+    )
+
+    # -------------------------
+    # Embedding cache (shared by ingestion and queries)
+    # -------------------------
+    embedding_cache_enabled: bool = Field(
+        default=True, validation_alias="EMBEDDING_CACHE_ENABLED"
+    )
+    embedding_cache_dir: str = Field(
+        default="./embedding_cache", validation_alias="EMBEDDING_CACHE_DIR"
+    )
+    embedding_cache_max_entries: int = Field(
+        default=500_000, validation_alias="EMBEDDING_CACHE_MAX_ENTRIES"
+    )
+    # Live vector bytes kept; 500k 1536-dim vectors take about 3 GB
+    embedding_cache_max_bytes: int = Field(
+        default=2 * 1024**3, ge=0, validation_alias="EMBEDDING_CACHE_MAX_BYTES"
+    )
+    # Rewrite the vector file once this fraction of it is dead (1 disables)
+    embedding_cache_compact_ratio: float = Field(
+        default=0.5, gt=0, le=1, validation_alias="EMBEDDING_CACHE_COMPACT_RATIO"
+    )
+
+    # -------------------------
+    # Request coalescing
+    # -------------------------
+    # Identical concurrent LLM / embedding calls share one upstream call
+    single_flight_enabled: bool = Field(
+        default=True, validation_alias="SINGLE_FLIGHT_ENABLED"
+    )
+
+    # -------------------------
+    # Semantic answer cache (/rag-query)
+    # -------------------------
+    answer_cache_enabled: bool = Field(
+        default=True, validation_alias="ANSWER_CACHE_ENABLED"
+    )
+    # Minimum cosine similarity between question embeddings for a hit
+    answer_cache_similarity_threshold: float = Field(
+        default=0.95, validation_alias="ANSWER_CACHE_SIMILARITY_THRESHOLD"
+    )
+    answer_cache_ttl_seconds: int = Field(
+        default=3600, validation_alias="ANSWER_CACHE_TTL_SECONDS"
+    )
+    answer_cache_max_entries: int = Field(
+        default=1000, validation_alias="ANSWER_CACHE_MAX_ENTRIES"
+    )
 
     # -------------------------
     # Storage (containers / k8s)
@@ -38,6 +160,129 @@ class Settings(BaseSettings):
         default="./chroma_db", validation_alias="CHROMA_PERSIST_DIR"
     )
     data_dir: str = Field(default="./data", validation_alias="DATA_DIR")
+    # How long a replaced collection build is kept for rollback
+    collection_gc_grace_seconds: int = Field(
+        default=24 * 3600, validation_alias="COLLECTION_GC_GRACE_SECONDS"
+    )
+
+    # -------------------------
+    # Chroma server
+    # -------------------------
+    # "embedded" opens CHROMA_PERSIST_DIR in-process; "http" talks to a
+    # Chroma server shared by all workers and replicas
+    chroma_mode: Literal["embedded", "http"] = Field(
+        default="embedded", validation_alias="CHROMA_MODE"
+    )
+    chroma_host: str = Field(default="localhost", validation_alias="CHROMA_HOST")
+    chroma_port: int = Field(default=8000, validation_alias="CHROMA_PORT")
+    chroma_ssl: bool = Field(default=False, validation_alias="CHROMA_SSL")
+    # Extra request headers, JSON: {"Authorization": "Bearer ..."}
+    chroma_headers: Dict[str, str] = Field(
+        default_factory=dict, validation_alias="CHROMA_HEADERS"
+    )
+    chroma_tenant: str = Field(
+        default="default_tenant", validation_alias="CHROMA_TENANT"
+    )
+    chroma_database: str = Field(
+        default="default_database", validation_alias="CHROMA_DATABASE"
+    )
+    # Connection pool per process; keep it above READ_EXECUTOR_WORKERS +
+    # WRITE_EXECUTOR_WORKERS so executor threads never queue for a socket
+    chroma_http_max_connections: int = Field(
+        default=32, ge=1, validation_alias="CHROMA_HTTP_MAX_CONNECTIONS"
+    )
+    chroma_http_max_keepalive: int = Field(
+        default=16, ge=0, validation_alias="CHROMA_HTTP_MAX_KEEPALIVE"
+    )
+    chroma_http_keepalive_seconds: float = Field(
+        default=40.0, validation_alias="CHROMA_HTTP_KEEPALIVE_SECONDS"
+    )
+    # Chroma's client has no timeout setting: queries are abandoned after
+    # this long on our side instead (the server call itself is not aborted)
+    chroma_http_timeout_seconds: float = Field(
+        default=60.0, validation_alias="CHROMA_HTTP_TIMEOUT_SECONDS"
+    )
+    # Run Chroma queries on the event loop with AsyncHttpClient instead of
+    # holding a read-executor thread per query (http mode only)
+    chroma_async_queries: bool = Field(
+        default=False, validation_alias="CHROMA_ASYNC_QUERIES"
+    )
+
+    # -------------------------
+    # Vector search backends
+    # -------------------------
+    # "chroma" (HNSW inside Chroma) or "numpy" (exact, in-process snapshot)
+    vector_backend: Literal["chroma", "numpy"] = Field(
+        default="chroma", validation_alias="VECTOR_BACKEND"
+    )
+    # Per-collection override, JSON: {"docs": "numpy"}
+    vector_backends: Dict[str, Literal["chroma", "numpy"]] = Field(
+        default_factory=dict, validation_alias="VECTOR_BACKENDS"
+    )
+    # numpy backend: "int8" scans quantized codes, then rescores
+    # top_k * NUMPY_INDEX_OVERSAMPLE candidates with the float32 vectors
+    numpy_index_quantization: Literal["none", "int8"] = Field(
+        default="none", validation_alias="NUMPY_INDEX_QUANTIZATION"
+    )
+    numpy_index_oversample: int = Field(
+        default=4, ge=1, validation_alias="NUMPY_INDEX_OVERSAMPLE"
+    )
+    # How often queries look for a snapshot built by another process
+    numpy_index_refresh_seconds: float = Field(
+        default=5.0, ge=0, validation_alias="NUMPY_INDEX_REFRESH_SECONDS"
+    )
+
+    # -------------------------
+    # Background jobs (reindex)
+    # -------------------------
+    max_concurrent_jobs: int = Field(default=1, validation_alias="MAX_CONCURRENT_JOBS")
+    max_queued_jobs: int = Field(default=10, validation_alias="MAX_QUEUED_JOBS")
+    job_history_limit: int = Field(default=100, validation_alias="JOB_HISTORY_LIMIT")
+    # Whether this process may run jobs. Only one process per persist dir
+    # does; with several workers, run jobs in a dedicated single-worker
+    # instance and set this to false everywhere else
+    jobs_enabled: bool = Field(default=True, validation_alias="JOBS_ENABLED")
+
+    # -------------------------
+    # Metrics (/metrics, Prometheus format)
+    # -------------------------
+    # Multi-worker servers also need PROMETHEUS_MULTIPROC_DIR, see
+    # app/core/metrics.py
+    metrics_enabled: bool = Field(default=True, validation_alias="METRICS_ENABLED")
+
+    # -------------------------
+    # Tracing (request spans, Server-Timing header)
+    # -------------------------
+    tracing_enabled: bool = Field(default=True, validation_alias="TRACING_ENABLED")
+    server_timing_enabled: bool = Field(
+        default=True, validation_alias="SERVER_TIMING_ENABLED"
+    )
+    # Also export spans to an OpenTelemetry collector (OTLP/gRPC)
+    otel_export_enabled: bool = Field(
+        default=False, validation_alias="OTEL_EXPORT_ENABLED"
+    )
+    otel_exporter_endpoint: str = Field(
+        default="http://localhost:4317", validation_alias="OTEL_EXPORTER_OTLP_ENDPOINT"
+    )
+    otel_service_name: str = Field(
+        default="ai-backend", validation_alias="OTEL_SERVICE_NAME"
+    )
+
+    # -------------------------
+    # Blocking work / event loop health
+    # -------------------------
+    read_executor_workers: int = Field(
+        default=8, validation_alias="READ_EXECUTOR_WORKERS"
+    )
+    write_executor_workers: int = Field(
+        default=2, validation_alias="WRITE_EXECUTOR_WORKERS"
+    )
+    loop_monitor_enabled: bool = Field(
+        default=True, validation_alias="LOOP_MONITOR_ENABLED"
+    )
+    loop_lag_threshold_ms: int = Field(
+        default=100, validation_alias="LOOP_LAG_THRESHOLD_MS"
+    )
 
     # -------------------------
     # Local dev convenience ONLY
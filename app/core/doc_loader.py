@@ -1,6 +1,6 @@
 import os
 import re
-from typing import List, Literal, Tuple
+from typing import List, Literal, Optional, Tuple
 
 from pypdf import PdfReader
 
@@ -88,13 +88,21 @@ def load_document(
     return clean_text(raw)
 
 
+def pdf_page_count(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+
 def load_document_pages(
-    file_path: str, *, file_type: Literal["auto", "txt", "pdf"] = "auto"
+    file_path: str,
+    *,
+    file_type: Literal["auto", "txt", "pdf"] = "auto",
+    page_range: Optional[Tuple[int, int]] = None,
 ) -> List[Tuple[int, str]]:
     """
     Load a document and return a list of (page_number, cleaned_text).
 
     - For PDF: one entry per real page (1-based), cleaned with clean_text().
+      `page_range` (0-based, end exclusive) limits extraction to those pages.
     - For TXT: single tuple (1, cleaned_text).
     """
     if not os.path.exists(file_path):
@@ -119,9 +127,10 @@ def load_document_pages(
 
     if file_type == "pdf":
         reader = PdfReader(file_path)
+        start, end = page_range or (0, len(reader.pages))
         pages: List[Tuple[int, str]] = []
-        for idx, page in enumerate(reader.pages):
-            raw_text = page.extract_text() or ""
+        for idx in range(start, min(end, len(reader.pages))):
+            raw_text = reader.pages[idx].extract_text() or ""
             cleaned = clean_text(raw_text)
             if cleaned.strip():
                 pages.append((idx + 1, cleaned))
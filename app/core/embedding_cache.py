@@ -0,0 +1,711 @@
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from app.core.config import get_settings
+
+INDEX_FILENAME = "index.sqlite3"
+BLOB_FILENAME = "vectors.f32"
+FLOAT_SIZE = 4
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+# Lookups record recency and hit/miss counts in memory; they are written
+# with the next eviction, or once this many keys / seconds have piled up
+_USAGE_FLUSH_KEYS = 1000
+_USAGE_FLUSH_SECONDS = 30.0
+_BUSY_TIMEOUT_MS = 30_000
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalization applied before hashing: unicode NFC + collapsed whitespace.
+    Texts that only differ in spacing share one cache entry.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, model: str, dimensions: Optional[int] = None) -> str:
+    payload = f"{model}\0{dimensions or 0}\0{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def _unpack(data: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(data) // FLOAT_SIZE}f", data))
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk embedding store.
+
+    - SQLite index: key -> (model, dimensions, offset, length, last_used_at)
+    - Packed little-endian float32 vectors appended to a blob file, one
+      file per generation (`vectors.f32`, then `vectors.<n>.f32`)
+    - LRU eviction by entry count and by live vector bytes; the entry and
+      byte totals are kept in `meta` as rows come and go, so writes never
+      recount the table
+    - `compact()` copies the live vectors into the next generation's file;
+      it runs in a background thread once dead bytes exceed `compact_ratio`
+      of the file, and lookups keep going meanwhile
+
+    Safe to share between threads. Several processes may read and append
+    concurrently: offsets are only ever read together with the generation
+    they belong to, and a generation's file is written before it is
+    committed. Lookups only read: `last_used_at` and the persisted hit/miss
+    totals are updated in batches.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int = 500_000,
+        max_bytes: int = 2 * 1024**3,
+        compact_ratio: float = 0.5,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compact_ratio = compact_ratio
+        self._db_path = os.path.join(cache_dir, INDEX_FILENAME)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self._db_path,
+            timeout=_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+        self._blob_fd: Optional[int] = None
+        self._generation = -1
+        if self._meta("generation") == 0:
+            # Later generations' files are created by compaction
+            open(self._blob_path(0), "ab").close()
+        self._compaction: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.compactions = 0
+
+        # Not yet written to the index (see `_write_usage`)
+        self._touched: Dict[str, float] = {}
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._usage_written_at = time.monotonic()
+
+    # -------------------------
+    # Setup
+    # -------------------------
+    def _init_schema(self) -> None:
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_embeddings_last_used
+                ON embeddings (last_used_at);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (name, value) VALUES
+                ('generation', 0), ('hits', 0), ('misses', 0);
+            """
+        )
+        if self._conn.execute("SELECT 1 FROM meta WHERE name = 'entries'").fetchone():
+            return
+        # Index written before the totals were tracked: count it once
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            entries, live_floats = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM embeddings"
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)",
+                [("entries", entries), ("live_bytes", live_floats * FLOAT_SIZE)],
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _meta(self, name: str) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _totals(self) -> tuple:
+        """(entries, live vector bytes), as kept in `meta`."""
+        return self._meta("entries"), self._meta("live_bytes")
+
+    def _add_totals(self, entries: int, live_bytes: int) -> None:
+        """Adjust the totals; call inside the write transaction that changed rows."""
+        self._conn.executemany(
+            "UPDATE meta SET value = value + ? WHERE name = ?",
+            [(entries, "entries"), (live_bytes, "live_bytes")],
+        )
+
+    def _blob_path(self, generation: int) -> str:
+        if not generation:
+            return os.path.join(self.cache_dir, BLOB_FILENAME)
+        stem, ext = os.path.splitext(BLOB_FILENAME)
+        return os.path.join(self.cache_dir, f"{stem}.{generation}{ext}")
+
+    def _blob(self) -> int:
+        """
+        Return an fd for the blob file of the generation the current
+        transaction sees, reopening after compaction. Raises
+        FileNotFoundError when that generation has been compacted away
+        since the transaction started.
+        """
+        generation = self._meta("generation")
+        if self._blob_fd is None or generation != self._generation:
+            fd = os.open(self._blob_path(generation), os.O_RDWR | os.O_APPEND)
+            if self._blob_fd is not None:
+                os.close(self._blob_fd)
+            self._blob_fd, self._generation = fd, generation
+        return self._blob_fd
+
+    # -------------------------
+    # Lookups / writes
+    # -------------------------
+    def get_many(
+        self,
+        texts: Sequence[str],
+        model: str,
+        dimensions: Optional[int] = None,
+    ) -> List[Optional[List[float]]]:
+        """Return cached vectors aligned with `texts` (None for a miss)."""
+        keys = [cache_key(t, model, dimensions) for t in texts]
+
+        with self._lock:
+            try:
+                found = self._read(keys)
+            except FileNotFoundError:
+                # A compaction finished between our snapshot and opening its
+                # file; a new transaction sees the new generation.
+                found = self._read(keys)
+
+            hits = sum(1 for k in keys if k in found)
+            misses = len(keys) - hits
+            self.hits += hits
+            self.misses += misses
+            self._pending_hits += hits
+            self._pending_misses += misses
+            now = time.time()
+            for key in found:
+                self._touched[key] = now
+
+            if (
+                len(self._touched) >= _USAGE_FLUSH_KEYS
+                or time.monotonic() - self._usage_written_at >= _USAGE_FLUSH_SECONDS
+            ):
+                self._try_write_usage()
+
+        return [found.get(k) for k in keys]
+
+    def _read(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Vectors for `keys`, in one read transaction so the offsets and the
+        blob generation match. Call with the lock held.
+        """
+        found: Dict[str, List[float]] = {}
+        self._conn.execute("BEGIN")
+        try:
+            fd = self._blob()
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), _SQL_CHUNK):
+                part = unique_keys[i : i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    "SELECT key, offset, length FROM embeddings "
+                    f"WHERE key IN ({placeholders})",
+                    part,
+                ).fetchall()
+                for key, offset, length in rows:
+                    data = os.pread(fd, length * FLOAT_SIZE, offset)
+                    if len(data) == length * FLOAT_SIZE:
+                        found[key] = _unpack(data)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return found
+
+    def get(
+        self, text: str, model: str, dimensions: Optional[int] = None
+    ) -> Optional[List[float]]:
+        return self.get_many([text], model, dimensions)[0]
+
+    def put_many(
+        self,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        model: str,
+        dimensions: Optional[int] = None,
+    ) -> None:
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+        if not texts:
+            return
+
+        entries = {cache_key(t, model, dimensions): v for t, v in zip(texts, vectors)}
+
+        with self._lock:
+            # The write lock also keeps compaction from switching files
+            # between our append and the index insert.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Rows about to be replaced leave the totals
+                replaced, replaced_floats = 0, 0
+                keys = list(entries)
+                for i in range(0, len(keys), _SQL_CHUNK):
+                    part = keys[i : i + _SQL_CHUNK]
+                    placeholders = ",".join("?" * len(part))
+                    count, floats = self._conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM embeddings "
+                        f"WHERE key IN ({placeholders})",
+                        part,
+                    ).fetchone()
+                    replaced += count
+                    replaced_floats += floats
+
+                fd = self._blob()
+                payload = b"".join(_pack(v) for v in entries.values())
+                # O_APPEND: the write lands at the end even with other writers
+                os.write(fd, payload)
+                base = os.lseek(fd, 0, os.SEEK_CUR) - len(payload)
+
+                now = time.time()
+                rows = []
+                offset = base
+                for key, vector in entries.items():
+                    rows.append(
+                        (key, model, dimensions or 0, offset, len(vector), now, now)
+                    )
+                    offset += len(vector) * FLOAT_SIZE
+
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings "
+                    "(key, model, dimensions, offset, length, created_at, "
+                    "last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._add_totals(
+                    len(rows) - replaced, len(payload) - replaced_floats * FLOAT_SIZE
+                )
+                evicted = self._evict_locked(self.max_entries, self.max_bytes)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.writes += len(rows)
+            self.evictions += evicted
+
+        if evicted:
+            self._log_eviction(evicted, self.max_entries, self.max_bytes)
+        self.compact_if_fragmented()
+
+    def put(
+        self,
+        text: str,
+        vector: Sequence[float],
+        model: str,
+        dimensions: Optional[int] = None,
+    ) -> None:
+        self.put_many([text], [vector], model, dimensions)
+
+    # -------------------------
+    # Usage bookkeeping
+    # -------------------------
+    def _write_usage(self) -> None:
+        """
+        Write pending recency and hit/miss counts. Call with the lock held,
+        inside a write transaction; if it rolls back they are lost, which
+        only makes eviction a little less accurate.
+        """
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used_at = MAX(last_used_at, ?) "
+                "WHERE key = ?",
+                [(used_at, key) for key, used_at in self._touched.items()],
+            )
+        for name, delta in (
+            ("hits", self._pending_hits),
+            ("misses", self._pending_misses),
+        ):
+            if delta:
+                self._conn.execute(
+                    "UPDATE meta SET value = value + ? WHERE name = ?", (delta, name)
+                )
+        self._touched = {}
+        self._pending_hits = self._pending_misses = 0
+        self._usage_written_at = time.monotonic()
+
+    def _try_write_usage(self) -> None:
+        """
+        `_write_usage` without waiting: skipped while another writer holds
+        the database. Call with the lock held.
+        """
+        self._conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            # Keep the batch for the next attempt
+            return
+        finally:
+            self._conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        try:
+            self._write_usage()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def flush_usage(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_usage()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def evict(
+        self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> int:
+        """
+        Drop least recently used entries until at most `max_entries` remain
+        and their vectors take at most `max_bytes`.
+        """
+        entry_limit = self.max_entries if max_entries is None else max_entries
+        byte_limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                evicted = self._evict_locked(entry_limit, byte_limit)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.evictions += evicted
+
+        if evicted:
+            self._log_eviction(evicted, entry_limit, byte_limit)
+        return evicted
+
+    def _evict_locked(self, entry_limit: int, byte_limit: int) -> int:
+        """
+        The eviction itself; call with the lock held, inside a write
+        transaction. Only walks the rows it deletes.
+        """
+        entries, live_bytes = self._totals()
+        excess_entries = entries - entry_limit
+        excess_bytes = live_bytes - byte_limit
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return 0
+
+        # Recency from recent lookups decides who goes first
+        self._write_usage()
+        victims, freed = [], 0
+        cur = self._conn.execute(
+            "SELECT key, length FROM embeddings ORDER BY last_used_at ASC"
+        )
+        for key, length in cur:
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            victims.append((key,))
+            excess_entries -= 1
+            excess_bytes -= length * FLOAT_SIZE
+            freed += length * FLOAT_SIZE
+        cur.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._add_totals(-len(victims), -freed)
+        return len(victims)
+
+    @staticmethod
+    def _log_eviction(evicted: int, max_entries: int, max_bytes: int) -> None:
+        logger.info(
+            "embedding_cache_evicted",
+            evicted=evicted,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+        )
+
+    def dead_bytes(self) -> int:
+        """Bytes of the blob file no index entry points at any more."""
+        with self._lock:
+            blob_bytes = os.fstat(self._blob()).st_size
+            live_bytes = self._meta("live_bytes")
+        return max(0, blob_bytes - live_bytes)
+
+    def compact_if_fragmented(self) -> bool:
+        """
+        Start `compact()` in a background thread once dead bytes exceed
+        `compact_ratio` of the blob file. Returns whether one was started.
+        """
+        with self._lock:
+            blob_bytes = os.fstat(self._blob()).st_size
+            dead = blob_bytes - self._meta("live_bytes")
+            if not blob_bytes or dead <= self.compact_ratio * blob_bytes:
+                return False
+            if self._compaction is not None and self._compaction.is_alive():
+                return False
+            self._compaction = threading.Thread(
+                target=self._compact_in_background,
+                name="embedding-cache-compact",
+                daemon=True,
+            )
+            self._compaction.start()
+        return True
+
+    def _compact_in_background(self) -> None:
+        try:
+            reclaimed = self.compact()
+        except Exception:
+            logger.exception("embedding_cache_compaction_failed")
+            return
+        logger.info("embedding_cache_compacted", reclaimed_bytes=reclaimed)
+
+    def wait_for_compaction(self, timeout: Optional[float] = None) -> None:
+        """Block until a background compaction (if any) has finished."""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join(timeout)
+
+    def delete_model(self, model: str) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted, floats = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM embeddings "
+                    "WHERE model = ?",
+                    (model,),
+                ).fetchone()
+                self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+                self._add_totals(-deleted, -floats * FLOAT_SIZE)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.compact_if_fragmented()
+        return deleted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.execute(
+                    "UPDATE meta SET value = 0 WHERE name IN ('entries', 'live_bytes')"
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.compact()
+
+    def compact(self) -> int:
+        """
+        Copy the live vectors into the next generation's blob file and
+        delete the old one. Returns the number of bytes reclaimed (0 when
+        another process compacted first).
+
+        Runs on its own connection and never holds `self._lock`, so lookups
+        continue throughout:
+        1. The live vectors of a snapshot are copied to a temporary file
+           without any lock.
+        2. Under the database write lock, vectors appended since then are
+           copied too, the file gets the next generation's name, and the new
+           offsets are committed together with the generation bump.
+        3. The old file is deleted. Readers that already have it open keep
+           using it with their snapshot's offsets; one that finds it gone
+           retries in a new transaction.
+        """
+        conn = sqlite3.connect(
+            self._db_path, timeout=_BUSY_TIMEOUT_MS / 1000, isolation_level=None
+        )
+        tmp_path = f"{self._blob_path(0)}.{os.getpid()}-{threading.get_ident()}.compact"
+        src = None
+        try:
+            conn.execute("BEGIN")
+            generation = conn.execute(
+                "SELECT value FROM meta WHERE name = 'generation'"
+            ).fetchone()[0]
+            rows = conn.execute(
+                "SELECT key, offset, length FROM embeddings ORDER BY offset"
+            ).fetchall()
+            conn.execute("COMMIT")
+            try:
+                src = os.open(self._blob_path(generation), os.O_RDONLY)
+            except FileNotFoundError:
+                return 0
+
+            updates = []
+            new_offset = 0
+
+            def _copy(copied_rows) -> None:
+                nonlocal new_offset
+                for key, offset, length in copied_rows:
+                    data = os.pread(src, length * FLOAT_SIZE, offset)
+                    out.write(data)
+                    updates.append((new_offset, key, offset))
+                    new_offset += len(data)
+
+            with open(tmp_path, "wb") as out:
+                _copy(rows)
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    current = conn.execute(
+                        "SELECT value FROM meta WHERE name = 'generation'"
+                    ).fetchone()[0]
+                    if current != generation:
+                        conn.execute("ROLLBACK")
+                        return 0
+                    before = os.fstat(src).st_size
+                    # Anything appended since the snapshot lands past its
+                    # last vector
+                    copied_upto = max(
+                        (o + n * FLOAT_SIZE for _, o, n in rows), default=0
+                    )
+                    _copy(
+                        conn.execute(
+                            "SELECT key, offset, length FROM embeddings "
+                            "WHERE offset >= ? ORDER BY offset",
+                            (copied_upto,),
+                        ).fetchall()
+                    )
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                    # Rows replaced or evicted since the snapshot no longer
+                    # match their old offset and are left alone
+                    conn.executemany(
+                        "UPDATE embeddings SET offset = ? "
+                        "WHERE key = ? AND offset = ?",
+                        updates,
+                    )
+                    os.replace(tmp_path, self._blob_path(generation + 1))
+                    conn.execute(
+                        "UPDATE meta SET value = value + 1 WHERE name = 'generation'"
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    if os.path.exists(self._blob_path(generation + 1)):
+                        os.remove(self._blob_path(generation + 1))
+                    raise
+        finally:
+            if src is not None:
+                os.close(src)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            conn.close()
+
+        os.remove(self._blob_path(generation))
+        self.compactions += 1
+        return max(0, before - new_offset)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, live_bytes = self._totals()
+            blob_bytes = os.fstat(self._blob()).st_size
+            models = self._conn.execute(
+                "SELECT model, dimensions, COUNT(*) FROM embeddings "
+                "GROUP BY model, dimensions ORDER BY model"
+            ).fetchall()
+            total_hits = self._meta("hits") + self._pending_hits
+            total_misses = self._meta("misses") + self._pending_misses
+
+        lookups = total_hits + total_misses
+
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "live_bytes": live_bytes,
+            "blob_bytes": blob_bytes,
+            "models": [
+                {"model": m, "dimensions": d or None, "entries": n}
+                for m, d, n in models
+            ],
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": (total_hits / lookups) if lookups else None,
+            "process": {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "compactions": self.compactions,
+            },
+        }
+
+    def close(self) -> None:
+        self.wait_for_compaction()
+        try:
+            self.flush_usage()
+        except sqlite3.Error:
+            logger.warning("embedding_cache_usage_not_saved", cache_dir=self.cache_dir)
+        with self._lock:
+            if self._blob_fd is not None:
+                os.close(self._blob_fd)
+                self._blob_fd = None
+            self._conn.close()
+
+
+@lru_cache
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache, or None when EMBEDDING_CACHE_ENABLED is false."""
+    settings = get_settings()
+    if not settings.embedding_cache_enabled:
+        return None
+    return EmbeddingCache(
+        cache_dir=settings.embedding_cache_dir,
+        max_entries=settings.embedding_cache_max_entries,
+        max_bytes=settings.embedding_cache_max_bytes,
+        compact_ratio=settings.embedding_cache_compact_ratio,
+    )
+
+
+def shutdown_embedding_cache() -> None:
+    """
+    Called from the app lifespan: write pending usage and close the cache.
+    The next `get_embedding_cache()` opens it again.
+    """
+    if not get_embedding_cache.cache_info().currsize:
+        return
+    cache = get_embedding_cache()
+    get_embedding_cache.cache_clear()
+    if cache is not None:
+        cache.close()
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.core.collection_aliases import VERSION_SEPARATOR
+from app.core.config import get_settings
+
+# Collection metadata keys describing the vectors stored in it
+MODEL_KEY = "embed_model"
+DIMENSIONS_KEY = "embed_dimensions"
+# True when the vectors were requested with the `dimensions` parameter
+REDUCED_KEY = "embed_dimensions_reduced"
+
+
+class DimensionMismatchError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class CollectionDimensions:
+    width: int
+    reduced: bool
+    model: Optional[str] = None
+
+    @property
+    def request_dimensions(self) -> Optional[int]:
+        """Value for the embeddings `dimensions` parameter (None = full width)."""
+        return self.width if self.reduced else None
+
+
+def configured_dimensions(collection_name: str) -> Optional[int]:
+    """
+    Width new builds of the collection are embedded at:
+    COLLECTION_EMBED_DIMENSIONS for the collection (or its alias), else
+    EMBED_DIMENSIONS. None means the model's full width.
+    """
+    settings = get_settings()
+    alias = collection_name.split(VERSION_SEPARATOR, 1)[0]
+    per_collection = settings.collection_embed_dimensions
+    if collection_name in per_collection:
+        return per_collection[collection_name]
+    return per_collection.get(alias, settings.embed_dimensions)
+
+
+def recorded_dimensions(collection) -> Optional[CollectionDimensions]:
+    """What the collection metadata says, or None for older collections."""
+    metadata = getattr(collection, "metadata", None) or {}
+    if DIMENSIONS_KEY not in metadata:
+        return None
+    return CollectionDimensions(
+        width=int(metadata[DIMENSIONS_KEY]),
+        reduced=bool(metadata.get(REDUCED_KEY, False)),
+        model=metadata.get(MODEL_KEY),
+    )
+
+
+def stored_dimensions(collection) -> Optional[CollectionDimensions]:
+    """
+    Recorded dimensions, else the width of a stored vector (collections
+    created before this was recorded hold full-width vectors). None when the
+    collection is empty.
+    """
+    recorded = recorded_dimensions(collection)
+    if recorded is not None:
+        return recorded
+    sample = collection.get(limit=1, include=["embeddings"])
+    embeddings = sample.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    return CollectionDimensions(width=len(embeddings[0]), reduced=False)
+
+
+def record_dimensions(collection, dimensions: CollectionDimensions) -> None:
+    metadata = dict(getattr(collection, "metadata", None) or {})
+    metadata[DIMENSIONS_KEY] = dimensions.width
+    metadata[REDUCED_KEY] = dimensions.reduced
+    if dimensions.model:
+        metadata[MODEL_KEY] = dimensions.model
+    collection.modify(metadata=metadata)
+
+
+def shorten(vector: Sequence[float], width: int) -> List[float]:
+    """
+    Truncate and re-normalize an embedding. For text-embedding-3 models this
+    is what the `dimensions` parameter does upstream.
+    """
+    if len(vector) < width:
+        raise DimensionMismatchError(
+            f"Cannot widen a {len(vector)}-dimensional vector to {width}"
+        )
+    short = np.asarray(vector[:width], dtype=np.float32)
+    norm = float(np.linalg.norm(short))
+    return (short / norm if norm > 0 else short).tolist()
+
+
+def adapt_query_vector(
+    vector: Sequence[float], width: int, collection_name: str
+) -> Sequence[float]:
+    """
+    Make a query vector match the collection width. With
+    EMBED_DIMENSION_MISMATCH=refuse (or when the query is narrower) a
+    mismatch raises DimensionMismatchError.
+    """
+    if len(vector) == width:
+        return vector
+    if get_settings().embed_dimension_mismatch == "refuse" or len(vector) < width:
+        raise DimensionMismatchError(
+            f"Query embedding has {len(vector)} dimensions but collection "
+            f"'{collection_name}' stores {width}"
+        )
+    return shorten(vector, width)
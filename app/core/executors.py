@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+READ = "read"
+WRITE = "write"
+
+_lock = threading.Lock()
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+
+def _get_executor(kind: str) -> ThreadPoolExecutor:
+    executor = _executors.get(kind)
+    if executor is not None:
+        return executor
+
+    with _lock:
+        executor = _executors.get(kind)
+        if executor is None:
+            settings = get_settings()
+            workers = (
+                settings.read_executor_workers
+                if kind == READ
+                else settings.write_executor_workers
+            )
+            executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"{kind}-pool"
+            )
+            _executors[kind] = executor
+    return executor
+
+
+async def _run(kind: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    # Copy contextvars so logging context etc. follows the call into the pool
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(kind), call)
+
+
+async def run_read(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking read (vector queries, metadata scans, cache lookups,
+    globbing) on the read pool.
+    """
+    return await _run(READ, func, *args, **kwargs)
+
+
+async def run_write(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run blocking ingestion work (document parsing, collection writes and
+    deletes, cache writes) on the write pool, so a reindex can never take
+    all the threads that queries need.
+    """
+    return await _run(WRITE, func, *args, **kwargs)
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Optional
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel
 
@@ -14,3 +17,128 @@ class LLMCallLog(BaseModel):
     prompt_tokens: Optional[int] = None
     completion_tokens: Optional[int] = None
     total_tokens: Optional[int] = None
+    # Set when the call was coalesced with other requests' calls: tokens are
+    # this caller's share of the batch, latency is the shared upstream call
+    batch_size: Optional[int] = None
+    queue_wait_ms: Optional[int] = None
+    # True when an identical in-flight call did the work (tokens paid once)
+    deduplicated: Optional[bool] = None
+    # Prompt tokens served from the provider's prefix cache
+    cached_tokens: Optional[int] = None
+    # "<name>@<version>" of the prompt template used, see app.core.prompts
+    prompt_template: Optional[str] = None
+    # Streams only, as seen by this caller: time to the first token, gaps
+    # between chunks, generation rate after the first token, and whether
+    # the client went away before the end
+    first_token_ms: Optional[int] = None
+    inter_token_p50_ms: Optional[float] = None
+    inter_token_p95_ms: Optional[float] = None
+    inter_token_max_ms: Optional[float] = None
+    output_tokens_per_second: Optional[float] = None
+    client_disconnected: Optional[bool] = None
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest rank
+    index = max(math.ceil(q * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class StreamTimer:
+    """Chunk arrival times of one stream; `tick()` as each chunk is read."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.chunks = 0
+        # Seconds between consecutive chunks
+        self.gaps: List[float] = []
+
+    def tick(self) -> None:
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now
+        else:
+            self.gaps.append(now - self.last)
+        self.last = now
+        self.chunks += 1
+
+    @property
+    def first_token_seconds(self) -> Optional[float]:
+        return None if self.first is None else self.first - self.started
+
+    def tokens_per_second(self, completion_tokens: Optional[int]) -> Optional[float]:
+        """
+        Output rate after the first token. Counts chunks (about one token
+        each) when the stream ended without usage, e.g. on a disconnect.
+        """
+        if self.first is None or self.last is None or self.last <= self.first:
+            return None
+        # The first token is excluded: its wait is the time to first token
+        tokens = (completion_tokens or self.chunks) - 1
+        return tokens / (self.last - self.first) if tokens > 0 else None
+
+    def summary(self, completion_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """LLMCallLog fields for this stream."""
+        ttft = self.first_token_seconds
+        gaps = sorted(self.gaps)
+        rate = self.tokens_per_second(completion_tokens)
+        return {
+            "first_token_ms": None if ttft is None else int(ttft * 1000),
+            "inter_token_p50_ms": (
+                round(_percentile(gaps, 0.5) * 1000, 1) if gaps else None
+            ),
+            "inter_token_p95_ms": (
+                round(_percentile(gaps, 0.95) * 1000, 1) if gaps else None
+            ),
+            "inter_token_max_ms": round(gaps[-1] * 1000, 1) if gaps else None,
+            "output_tokens_per_second": None if rate is None else round(rate, 1),
+        }
+
+
+class PromptCacheStats:
+    """
+    Process-wide prompt token counters per (operation, prompt template), to
+    follow the prefix-cache hit rate. Deduplicated calls are not recorded:
+    their tokens were counted once, with the call that did the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (operation, template) -> [calls, prompt_tokens, cached_tokens]
+        self._counts: Dict[Tuple[str, str], List[int]] = {}
+
+    def record(
+        self,
+        operation: str,
+        prompt_template: Optional[str],
+        prompt_tokens: Optional[int],
+        cached_tokens: Optional[int],
+    ) -> None:
+        if prompt_tokens is None:
+            return
+        key = (operation, prompt_template or "")
+        with self._lock:
+            counts = self._counts.setdefault(key, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += prompt_tokens
+            counts[2] += cached_tokens or 0
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            items = sorted(self._counts.items())
+        return [
+            {
+                "operation": operation,
+                "prompt_template": template or None,
+                "calls": calls,
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": cached_tokens,
+                "hit_rate": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+            }
+            for (operation, template), (calls, prompt_tokens, cached_tokens) in items
+        ]
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> Optional[str]:
+    if task is None:
+        return None
+    coro = task.get_coro()
+    name = getattr(coro, "__qualname__", None) or repr(coro)
+    return f"{task.get_name()} ({name})"
+
+
+def _describe_stack(thread_id: int, limit: int = 5) -> list[str]:
+    """Innermost frames of the loop thread, app frames first."""
+    frame = sys._current_frames().get(thread_id)
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append((code.co_filename, frame.f_lineno, code.co_name))
+        frame = frame.f_back
+
+    app_frames = [f for f in frames if f[0].startswith(_APP_DIR)]
+    picked = (app_frames or frames)[:limit]
+    return [
+        f"{os.path.relpath(path, os.path.dirname(_APP_DIR))}:{line} in {func}"
+        for path, line, func in picked
+    ]
+
+
+class LoopLagMonitor:
+    """
+    Detects event-loop stalls.
+
+    - A heartbeat coroutine wakes up every `interval_s` and measures how late
+      it woke up; lag above `threshold_s` is logged as `event_loop_stall`.
+    - A watchdog thread notices while the loop is still blocked and records
+      which task was running and where, so the log names the culprit.
+    """
+
+    def __init__(self, threshold_ms: int = 100, interval_ms: int = 50):
+        self.threshold_s = threshold_ms / 1000
+        self.interval_s = interval_ms / 1000
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Guards _last_beat and _culprit, shared with the watchdog thread
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._culprit: Optional[dict] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._last_beat = time.monotonic()
+            self._culprit = None
+        self._stop.clear()
+        self._heartbeat_task = self._loop.create_task(
+            self._heartbeat(), name="loop-lag-heartbeat"
+        )
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            beat = time.monotonic()
+            with self._lock:
+                self._last_beat = beat
+            await asyncio.sleep(self.interval_s)
+            lag = time.monotonic() - beat - self.interval_s
+            if lag > self.threshold_s:
+                self._report(lag)
+
+    def _report(self, lag_s: float) -> None:
+        lag_ms = round(lag_s * 1000, 1)
+        with self._lock:
+            culprit, self._culprit = self._culprit or {}, None
+        self.stalls += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+        logger.bind(
+            lag_ms=lag_ms,
+            task=culprit.get("task"),
+            stack=culprit.get("stack", []),
+        ).warning(
+            "event_loop_stall lag_ms={} task={}",
+            lag_ms,
+            culprit.get("task") or "unknown",
+        )
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            with self._lock:
+                blocked_for = time.monotonic() - self._last_beat - self.interval_s
+                if blocked_for <= self.threshold_s or self._culprit is not None:
+                    continue
+            # Runs while the loop thread is still stuck inside the culprit.
+            # The stack comes from the loop thread's own frame; the task is
+            # only a label and may be None between steps.
+            culprit = {
+                "task": _describe_task(asyncio.current_task(self._loop)),
+                "stack": _describe_stack(self._loop_thread_id),
+            }
+            with self._lock:
+                if self._culprit is None:
+                    self._culprit = culprit
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+
+MANIFEST_FILENAME = "ingest_manifest.sqlite3"
+# How long `version` trusts its in-process copy; writes made through this
+# process update it right away, other processes' writes show up after this
+VERSION_TTL_S = 2.0
+
+
+class ManifestEntry(BaseModel):
+    source: str
+    content_hash: str
+    size: int
+    mtime_ns: int
+    chunk_params: Dict[str, object]
+    chunk_ids: List[str]
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    What has been ingested into each physical collection: per source file the
+    content hash, size/mtime, chunking parameters and the chunk ids produced.
+
+    Stored in one SQLite file next to the Chroma data so the API and the CLIs
+    see the same state. Each collection also has a version counter, bumped
+    whenever its content changes (not on size/mtime-only refreshes).
+    """
+
+    def __init__(self, base_dir: str):
+        os.makedirs(base_dir, exist_ok=True)
+        self.path = os.path.join(base_dir, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS manifest (
+                collection TEXT NOT NULL,
+                source TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                chunk_params TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (collection, source)
+            );
+            CREATE TABLE IF NOT EXISTS versions (
+                collection TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _row_to_entry(row) -> ManifestEntry:
+        source, content_hash, size, mtime_ns, params, chunk_ids = row
+        return ManifestEntry(
+            source=source,
+            content_hash=content_hash,
+            size=size,
+            mtime_ns=mtime_ns,
+            chunk_params=json.loads(params),
+            chunk_ids=json.loads(chunk_ids),
+        )
+
+    def entries(self, collection: str) -> Dict[str, ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, content_hash, size, mtime_ns, chunk_params, "
+                "chunk_ids FROM manifest WHERE collection = ?",
+                (collection,),
+            ).fetchall()
+        return {row[0]: self._row_to_entry(row) for row in rows}
+
+    def get(self, collection: str, source: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, content_hash, size, mtime_ns, chunk_params, "
+                "chunk_ids FROM manifest WHERE collection = ? AND source = ?",
+                (collection, source),
+            ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def _bump(self, collection: str) -> None:
+        """Call with the lock held, inside the write's transaction."""
+        self._conn.execute(
+            "INSERT INTO versions (collection, version) VALUES (?, 1) "
+            "ON CONFLICT (collection) DO UPDATE SET version = version + 1",
+            (collection,),
+        )
+        self._versions.pop(collection, None)
+
+    def put(self, collection: str, entry: ManifestEntry) -> None:
+        params = json.dumps(entry.chunk_params, sort_keys=True)
+        chunk_ids = json.dumps(entry.chunk_ids)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT content_hash, chunk_params, chunk_ids FROM manifest "
+                "WHERE collection = ? AND source = ?",
+                (collection, entry.source),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest (collection, source, content_hash, "
+                "size, mtime_ns, chunk_params, chunk_ids, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    collection,
+                    entry.source,
+                    entry.content_hash,
+                    entry.size,
+                    entry.mtime_ns,
+                    params,
+                    chunk_ids,
+                    time.time(),
+                ),
+            )
+            if previous != (entry.content_hash, params, chunk_ids):
+                self._bump(collection)
+            self._conn.commit()
+
+    def remove(self, collection: str, source: str) -> None:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM manifest WHERE collection = ? AND source = ?",
+                (collection, source),
+            )
+            if cur.rowcount:
+                self._bump(collection)
+            self._conn.commit()
+
+    def version(self, collection: str) -> str:
+        """
+        Changes whenever a file of `collection` is ingested with new content
+        or removed. Cached for VERSION_TTL_S.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._versions.get(collection)
+            if cached is not None and now - cached[1] < VERSION_TTL_S:
+                return str(cached[0])
+            row = self._conn.execute(
+                "SELECT version FROM versions WHERE collection = ?", (collection,)
+            ).fetchone()
+            version = row[0] if row else 0
+            self._versions[collection] = (version, now)
+        return str(version)
+
+    def drop_collection(self, collection: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM manifest WHERE collection = ?", (collection,)
+            )
+            self._conn.execute(
+                "DELETE FROM versions WHERE collection = ?", (collection,)
+            )
+            self._versions.pop(collection, None)
+            self._conn.commit()
+
+
+_manifests: Dict[str, IngestManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(db_path: Optional[str] = None) -> IngestManifest:
+    path = os.path.abspath(db_path or get_settings().chroma_persist_dir)
+    with _manifests_lock:
+        manifest = _manifests.get(path)
+        if manifest is None:
+            manifest = IngestManifest(path)
+            _manifests[path] = manifest
+    return manifest
@@ -0,0 +1,186 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Optional, Tuple, TypeVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+T = TypeVar("T")
+
+# With several uvicorn workers, every process writes its samples to
+# memory-mapped files in this directory and /metrics sums them. It must be
+# set before the process starts: prometheus_client reads it on import.
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Upstream calls and streams take seconds, index lookups milliseconds
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+VECTOR_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30)
+# Micro-batches wait a few ms for company
+QUEUE_WAIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+# A stall between two chunks is anything past a few hundred ms
+GAP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency (streams: until the last byte)",
+    ["method", "route", "status"],
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Upstream LLM / embeddings call latency",
+    ["operation", "model"],
+    buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "Upstream tokens by kind (prompt, completion, cached prompt)",
+    ["operation", "model", "kind"],
+)
+VECTOR_QUERY_SECONDS = Histogram(
+    "vector_query_duration_seconds",
+    "Nearest-neighbour query latency",
+    ["backend"],
+    buckets=VECTOR_BUCKETS,
+)
+CHROMA_WRITE_SECONDS = Histogram(
+    "chroma_write_duration_seconds",
+    "Chroma write latency",
+    ["operation"],
+    buckets=VECTOR_BUCKETS,
+)
+STREAM_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_stream_time_to_first_token_seconds",
+    "Time from the streaming call to its first token",
+    ["model"],
+    buckets=TTFT_BUCKETS,
+)
+STREAM_INTER_TOKEN_SECONDS = Histogram(
+    "llm_stream_inter_token_seconds",
+    "Gaps between consecutive streamed chunks",
+    ["model"],
+    buckets=GAP_BUCKETS,
+)
+STREAM_TOKENS_PER_SECOND = Histogram(
+    "llm_stream_output_tokens_per_second",
+    "Output rate of each stream after its first token",
+    ["model"],
+    buckets=THROUGHPUT_BUCKETS,
+)
+STREAM_DISCONNECTS = Counter(
+    "llm_stream_client_disconnects",
+    "Streams the client closed before the last token",
+    ["model"],
+)
+MICROBATCH_SIZE = Histogram(
+    "microbatch_size",
+    "Items coalesced into each batched call",
+    ["batcher"],
+    buckets=BATCH_SIZE_BUCKETS,
+)
+MICROBATCH_QUEUE_WAIT_SECONDS = Histogram(
+    "microbatch_queue_wait_seconds",
+    "Time an item waited for its batch to be sent",
+    ["batcher"],
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+MICROBATCH_FAILURES = Counter(
+    "microbatch_failed_batches",
+    "Batched calls that failed for every item in them",
+    ["batcher"],
+)
+INGEST_CHUNKS = Counter(
+    "ingest_chunks", "Chunks embedded and written by ingestion", ["collection"]
+)
+INGEST_CHUNKS_PER_SECOND = Histogram(
+    "ingest_chunks_per_second",
+    "Throughput of each ingestion run",
+    ["collection"],
+    buckets=THROUGHPUT_BUCKETS,
+)
+
+
+def observe_http(method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def observe_llm(
+    operation: str,
+    model: str,
+    seconds: float,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    cached_tokens: Optional[int] = None,
+) -> None:
+    LLM_REQUEST_SECONDS.labels(operation, model).observe(seconds)
+    for kind, count in (
+        ("prompt", prompt_tokens),
+        ("completion", completion_tokens),
+        ("cached", cached_tokens),
+    ):
+        if count:
+            LLM_TOKENS.labels(operation, model, kind).inc(count)
+
+
+def observe_stream(
+    model: str,
+    first_token_seconds: Optional[float],
+    gaps: Iterable[float],
+    tokens_per_second: Optional[float],
+    disconnected: bool,
+) -> None:
+    if first_token_seconds is not None:
+        STREAM_FIRST_TOKEN_SECONDS.labels(model).observe(first_token_seconds)
+    gap_histogram = STREAM_INTER_TOKEN_SECONDS.labels(model)
+    for gap in gaps:
+        gap_histogram.observe(gap)
+    if tokens_per_second is not None:
+        STREAM_TOKENS_PER_SECOND.labels(model).observe(tokens_per_second)
+    if disconnected:
+        STREAM_DISCONNECTS.labels(model).inc()
+
+
+def observe_microbatch(batcher: str, size: int, waits: Iterable[float]) -> None:
+    MICROBATCH_SIZE.labels(batcher).observe(size)
+    wait_histogram = MICROBATCH_QUEUE_WAIT_SECONDS.labels(batcher)
+    for wait in waits:
+        wait_histogram.observe(wait)
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - t0)
+
+
+def timed_write(operation: str, func: Callable[..., T], **kwargs: Any) -> T:
+    """Run a Chroma write (`func`) and observe its duration, in the executor."""
+    with timed(CHROMA_WRITE_SECONDS, operation):
+        return func(**kwargs)
+
+
+def observe_ingest(collection: str, chunks: int, seconds: float) -> None:
+    if chunks and seconds > 0:
+        INGEST_CHUNKS_PER_SECOND.labels(collection).observe(chunks / seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition body and content type for /metrics."""
+    registry: Any = REGISTRY
+    if os.environ.get(MULTIPROC_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
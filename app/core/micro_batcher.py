@@ -0,0 +1,212 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from app.core import metrics
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = metrics.BATCH_SIZE_BUCKETS
+
+
+@dataclass
+class BatchInfo:
+    """What happened to one submitted item."""
+
+    batch_size: int
+    queue_wait_ms: int
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesces concurrent single-item calls into batched calls.
+
+    Callers `await submit(item)`; items are collected until `max_batch_size`
+    are waiting or `max_wait_ms` has passed since the first one, then
+    `flush(items)` runs once for all of them and each caller gets its own
+    result back (with the batch size and how long it waited). If the batched
+    call fails, returns the wrong number of results or is cancelled, every
+    caller in the batch gets the exception (or is cancelled), except for
+    `isolate_errors`: those mean one input was rejected, so the items are
+    flushed again one by one and only the bad ones fail.
+
+    `name` labels the batch size and queue wait metrics.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "batch",
+        isolate_errors: Tuple[Type[BaseException], ...] = (),
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self._flush = flush
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self.isolate_errors = isolate_errors
+
+        self._pending: List[Tuple[T, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.isolated_batches = 0
+        self.flushed_full = 0
+        self.flushed_on_timer = 0
+        self.max_batch_seen = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_seen_ms = 0.0
+        self.size_histogram: Dict[str, int] = {
+            **{str(bound): 0 for bound in BATCH_SIZE_BUCKETS},
+            "+Inf": 0,
+        }
+
+    async def submit(self, item: T) -> Tuple[R, BatchInfo]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self.flushed_full += 1
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._on_timer)
+
+        return await future
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        if self._pending:
+            self.flushed_on_timer += 1
+            self._start_flush()
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        # Callers that gave up (cancelled) while waiting are dropped
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    def _record(self, size: int, waits_ms: List[float]) -> None:
+        self.batches += 1
+        self.items += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self.total_wait_ms += sum(waits_ms)
+        self.max_wait_seen_ms = max(self.max_wait_seen_ms, *waits_ms)
+        bucket = next((str(b) for b in BATCH_SIZE_BUCKETS if size <= b), "+Inf")
+        self.size_histogram[bucket] += 1
+        metrics.observe_microbatch(self.name, size, [w / 1000 for w in waits_ms])
+
+    async def _call(self, items: List[T]) -> List[R]:
+        results = await self._flush(items)
+        if len(results) != len(items):
+            raise RuntimeError(
+                f"Batched call returned {len(results)} results "
+                f"for {len(items)} items"
+            )
+        return results
+
+    def _fail(self, batch: List[Tuple[T, asyncio.Future, float]], exc) -> None:
+        for _, future, _ in batch:
+            if future.done():
+                continue
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        waits_ms = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+        self._record(len(batch), waits_ms)
+
+        try:
+            results = await self._call([item for item, _, _ in batch])
+        except BaseException as exc:
+            if isinstance(exc, self.isolate_errors) and len(batch) > 1:
+                self.isolated_batches += 1
+                await self._run_each(batch, waits_ms)
+                return
+            self.failed_batches += 1
+            metrics.MICROBATCH_FAILURES.labels(self.name).inc()
+            self._fail(batch, exc)
+            if not isinstance(exc, Exception):
+                # Cancellation, KeyboardInterrupt...: callers are released,
+                # but the task itself must still end the way it was told to
+                raise
+            return
+
+        for (_, future, _), result, wait_ms in zip(batch, results, waits_ms):
+            if not future.done():
+                info = BatchInfo(batch_size=len(batch), queue_wait_ms=int(wait_ms))
+                future.set_result((result, info))
+
+    async def _run_each(
+        self, batch: List[Tuple[T, asyncio.Future, float]], waits_ms: List[float]
+    ) -> None:
+        """Flush each item alone, so a rejected input only fails its caller."""
+        try:
+            outcomes = await asyncio.gather(
+                *(self._call([item]) for item, _, _ in batch), return_exceptions=True
+            )
+        except BaseException as exc:
+            self._fail(batch, exc)
+            raise
+
+        for entry, outcome, wait_ms in zip(batch, outcomes, waits_ms):
+            future = entry[1]
+            if isinstance(outcome, BaseException):
+                self._fail([entry], outcome)
+            elif not future.done():
+                info = BatchInfo(batch_size=1, queue_wait_ms=int(wait_ms))
+                future.set_result((outcome[0], info))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failed_batches": self.failed_batches,
+            "isolated_batches": self.isolated_batches,
+            "pending": len(self._pending),
+            "flushed_full": self.flushed_full,
+            "flushed_on_timer": self.flushed_on_timer,
+            "avg_batch_size": (
+                round(self.items / self.batches, 2) if self.batches else 0.0
+            ),
+            "max_batch_size": self.max_batch_seen,
+            "batch_size_histogram": dict(self.size_histogram),
+            "avg_queue_wait_ms": (
+                round(self.total_wait_ms / self.items, 2) if self.items else 0.0
+            ),
+            "max_queue_wait_ms": round(self.max_wait_seen_ms, 2),
+        }
@@ -9,8 +9,13 @@ from loguru import logger
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.responses import StreamingResponse
 
+from app.core import metrics, tracing
+from app.core.config import get_settings
+
 
 def setup_middleware(app: FastAPI):
+    settings = get_settings()
+
     def _bind_log(
         request: Request,
         *,
@@ -25,6 +30,7 @@ def setup_middleware(app: FastAPI):
             status_code=status_code,
             duration_ms=duration_ms,
             llm_calls=[c.model_dump() for c in request.state.llm_calls],
+            spans=[s.model_dump() for s in request.state.spans],
         )
 
     def _log_request(
@@ -36,6 +42,19 @@ def setup_middleware(app: FastAPI):
         exc: Optional[BaseException],
     ) -> None:
         duration_ms = (time() - start_time) * 1000
+        # Route template, not the raw path, to keep label cardinality bounded
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        metrics.observe_http(request.method, route, status_code, duration_ms / 1000)
+        tracing.export_request(
+            request,
+            f"{request.method} {route}",
+            status_code,
+            {
+                "http.request.method": request.method,
+                "http.route": route,
+                "request_id": request_id,
+            },
+        )
         log = _bind_log(
             request,
             request_id=request_id,
@@ -86,6 +105,7 @@ def setup_middleware(app: FastAPI):
         request_id: str = request.headers.get("x-request-id") or str(uuid.uuid4())
         request.state.request_id = request_id
         request.state.llm_calls = []
+        tracing.start_request(request)
 
         start = time()
         response = None
@@ -105,6 +125,12 @@ def setup_middleware(app: FastAPI):
                     request_id=request_id,
                     start_time=start,
                 )
+            elif response is not None and settings.server_timing_enabled:
+                # Streams send their headers before any stage has finished;
+                # their spans are only in the log and the exported trace
+                response.headers["Server-Timing"] = tracing.server_timing(
+                    request.state.spans, total_ms=(time() - start) * 1000
+                )
 
             return response
 
@@ -0,0 +1,514 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_DIRNAME = "vector_index"
+CURRENT_FILENAME = "CURRENT"
+EXPORT_PAGE_SIZE = 5000
+# Rows dequantized at a time by the int8 pass (bounds the float32 temporary)
+QUANTIZED_BLOCK_ROWS = 65536
+
+_COMPARISONS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+@dataclass
+class IndexHit:
+    id: str
+    document: str
+    metadata: Dict[str, Any]
+    distance: float
+
+
+class _Column:
+    """
+    One metadata key stored columnar. Values are kept per type, the way Chroma
+    stores them: numbers (ints and floats compare with each other), strings
+    and booleans never match one another.
+    """
+
+    def __init__(self, values: Sequence[Any]):
+        n = len(values)
+        self.num = np.full(n, np.nan, dtype=np.float64)
+        self.text = np.full(n, None, dtype=object)
+        self.flag = np.full(n, -1, dtype=np.int8)
+        for row, value in enumerate(values):
+            if isinstance(value, bool):
+                self.flag[row] = int(value)
+            elif isinstance(value, (int, float)):
+                self.num[row] = value
+            elif isinstance(value, str):
+                self.text[row] = value
+
+    def equals(self, value: Any) -> np.ndarray:
+        if isinstance(value, bool):
+            return self.flag == int(value)
+        if isinstance(value, (int, float)):
+            return self.num == value
+        if isinstance(value, str):
+            return self.text == value
+        raise ValueError(f"Unsupported where value: {value!r}")
+
+    def isin(self, values: Sequence[Any]) -> np.ndarray:
+        mask = np.zeros(len(self.num), dtype=bool)
+        for value in values:
+            mask |= self.equals(value)
+        return mask
+
+
+class MetadataColumns:
+    """
+    Chunk metadata as columns, for vectorized evaluation of the Chroma `where`
+    filters built by `retrieval._build_where`.
+
+    Semantics follow Chroma: `{"key": v}` is `$eq`; `$ne` / `$nin` also match
+    rows without the key; `$gt`/`$gte`/`$lt`/`$lte` need a number;
+    `$and` / `$or` need a list of at least two expressions.
+    """
+
+    def __init__(self, metadatas: Sequence[Optional[Dict[str, Any]]]):
+        self.size = len(metadatas)
+        keys = sorted({key for meta in metadatas if meta for key in meta})
+        self._columns = {
+            key: _Column([(meta or {}).get(key) for meta in metadatas]) for key in keys
+        }
+
+    def _column(self, key: str) -> _Column:
+        column = self._columns.get(key)
+        if column is None:
+            column = _Column([None] * self.size)
+        return column
+
+    def mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for `where`, or None when there is no filter."""
+        if not where:
+            return None
+        return self._evaluate(where)
+
+    def _evaluate(self, where: Dict[str, Any]) -> np.ndarray:
+        if not isinstance(where, dict) or len(where) != 1:
+            raise ValueError(f"Expected where to have exactly one operator: {where}")
+        ((key, value),) = where.items()
+
+        if key in ("$and", "$or"):
+            if not isinstance(value, list) or len(value) < 2:
+                raise ValueError(
+                    f"Expected {key} to be a list of at least two where expressions"
+                )
+            masks = [self._evaluate(expr) for expr in value]
+            reduce = np.logical_and if key == "$and" else np.logical_or
+            return reduce.reduce(masks)
+
+        column = self._column(key)
+        if not isinstance(value, dict):
+            return column.equals(value)
+        if len(value) != 1:
+            raise ValueError(f"Expected one operator for {key!r}, got {value}")
+
+        ((op, operand),) = value.items()
+        if op == "$eq":
+            return column.equals(operand)
+        if op == "$ne":
+            return ~column.equals(operand)
+        if op in ("$in", "$nin"):
+            if not isinstance(operand, list):
+                raise ValueError(f"Expected a list for {op}, got {operand!r}")
+            matched = column.isin(operand)
+            return matched if op == "$in" else ~matched
+        if op in _COMPARISONS:
+            if isinstance(operand, bool) or not isinstance(operand, (int, float)):
+                raise ValueError(
+                    f"Expected operand value to be an int or a float for {op}"
+                )
+            with np.errstate(invalid="ignore"):
+                return _COMPARISONS[op](column.num, operand)
+        raise ValueError(f"Unsupported where operator: {op}")
+
+
+class NumpyIndex:
+    """
+    Read-only snapshot of one collection for exact in-process search.
+
+    - vectors.npy: float32 matrix, memory-mapped so every worker process
+      shares one copy through the page cache
+    - norms.npy: squared L2 norm of each row
+    - documents.bin + doc_offsets.npy: UTF-8 texts; only hits are decoded
+    - codes.npy + quant_offset.npy / quant_scale.npy: the vectors
+      quantized per dimension to int8, a quarter of the float32 size
+    - meta.json: ids, metadatas and the distance space of the source
+
+    Exact search scores every row passing the filter with one matrix-vector
+    product and picks the top k with argpartition. Quantized search scores
+    the int8 codes instead, keeps the best `k * oversample` candidates and
+    rescores only those against the float32 rows, so the float matrix does
+    not need to stay resident. Distances use the same definition as Chroma
+    for the source's space.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.sq_norms = np.load(os.path.join(path, "norms.npy"), mmap_mode="r")
+        self._offsets = np.load(os.path.join(path, "doc_offsets.npy"), mmap_mode="r")
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.quant_offset = np.load(os.path.join(path, "quant_offset.npy"))
+        self.quant_scale = np.load(os.path.join(path, "quant_scale.npy"))
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.ids: List[str] = meta["ids"]
+        self.metadatas: List[Dict[str, Any]] = meta["metadatas"]
+        self.space: str = meta["space"]
+        self.version: str = meta["version"]
+        self.columns = MetadataColumns(self.metadatas)
+
+        with open(os.path.join(path, "documents.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._documents = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def document(self, row: int) -> str:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._documents[start:end]).decode("utf-8")
+
+    def _to_distances(
+        self, dots: np.ndarray, sq_norms: np.ndarray, query: np.ndarray
+    ) -> np.ndarray:
+        if self.space == "cosine":
+            denom = np.sqrt(sq_norms) * float(np.linalg.norm(query))
+            return 1.0 - dots / np.where(denom > 0, denom, 1.0)
+        if self.space == "ip":
+            return 1.0 - dots
+        return sq_norms + float(query @ query) - 2.0 * dots
+
+    def distances(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Exact distances of `rows` (all rows if None) to `query`."""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        return self._to_distances(vectors @ query, sq_norms, query)
+
+    def approximate_distances(
+        self, query: np.ndarray, rows: Optional[np.ndarray]
+    ) -> np.ndarray:
+        """
+        Distances from the int8 codes. With x ~ offset + scale * (code + 128),
+        q.x ~ code . (q * scale) + q . (offset + 128 * scale).
+        """
+        weights = query * self.quant_scale
+        base = float(query @ (self.quant_offset + 128.0 * self.quant_scale))
+        n = self.codes.shape[0] if rows is None else rows.shape[0]
+        dots = np.empty(n, dtype=np.float32)
+        for start in range(0, n, QUANTIZED_BLOCK_ROWS):
+            end = min(start + QUANTIZED_BLOCK_ROWS, n)
+            block = (
+                self.codes[start:end] if rows is None else self.codes[rows[start:end]]
+            )
+            dots[start:end] = block.astype(np.float32) @ weights
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        return self._to_distances(dots + base, sq_norms, query)
+
+    def search(
+        self,
+        embedding: Sequence[float],
+        k: int,
+        where: Optional[Dict[str, Any]] = None,
+        quantized: bool = False,
+        oversample: int = 4,
+    ) -> List[IndexHit]:
+        if not self.ids or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+
+        mask = self.columns.mask(where)
+        rows = None if mask is None else np.flatnonzero(mask)
+        if rows is not None and rows.size == 0:
+            return []
+        n = len(self.ids) if rows is None else rows.shape[0]
+
+        if quantized:
+            approx = self.approximate_distances(query, rows)
+            candidates = np.argpartition(approx, min(k * oversample, n) - 1)
+            candidates = candidates[: min(k * oversample, n)]
+            # Ascending row order keeps the float32 reads sequential on disk
+            rows = np.sort(candidates if rows is None else rows[candidates])
+            n = rows.shape[0]
+
+        distances = self.distances(query, rows)
+        k = min(k, n)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+
+        hits = []
+        for position in top:
+            row = int(position if rows is None else rows[position])
+            hits.append(
+                IndexHit(
+                    id=self.ids[row],
+                    document=self.document(row),
+                    metadata=self.metadatas[row],
+                    distance=float(distances[position]),
+                )
+            )
+        return hits
+
+
+def quantize_int8(
+    matrix: np.ndarray, codes: Optional[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-dimension int8 quantization of `matrix` into `codes` (same shape).
+    Returns (offset, scale): dimension j maps [min_j, max_j] onto -128..127.
+    """
+    if matrix.shape[0] == 0:
+        dim = matrix.shape[1]
+        return np.zeros(dim, dtype=np.float32), np.ones(dim, dtype=np.float32)
+
+    low = np.full(matrix.shape[1], np.inf, dtype=np.float32)
+    high = np.full(matrix.shape[1], -np.inf, dtype=np.float32)
+    for start in range(0, matrix.shape[0], QUANTIZED_BLOCK_ROWS):
+        block = matrix[start : start + QUANTIZED_BLOCK_ROWS]
+        low = np.minimum(low, block.min(axis=0))
+        high = np.maximum(high, block.max(axis=0))
+
+    scale = (high - low) / 255.0
+    scale[scale == 0] = 1.0
+    for start in range(0, matrix.shape[0], QUANTIZED_BLOCK_ROWS):
+        block = matrix[start : start + QUANTIZED_BLOCK_ROWS]
+        levels = np.rint((block - low) / scale) - 128.0
+        codes[start : start + QUANTIZED_BLOCK_ROWS] = np.clip(levels, -128, 127)
+    return low.astype(np.float32), scale.astype(np.float32)
+
+
+# (ids, embeddings, documents, metadatas) pages read from the source store
+ExportPage = Tuple[List[str], Any, List[Optional[str]], List[Optional[dict]]]
+
+
+def write_snapshot(
+    path: str, pages: Iterator[ExportPage], count: int, space: str, version: str
+) -> None:
+    """Write a snapshot of at most `count` rows into the (new) directory `path`."""
+    os.makedirs(path)
+    ids: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    offsets = [0]
+    vectors = None
+
+    with open(os.path.join(path, "documents.bin"), "wb") as documents:
+        for page_ids, page_embeddings, page_docs, page_metas in pages:
+            page_vectors = np.asarray(page_embeddings, dtype=np.float32)
+            room = count - len(ids)
+            if room <= 0:
+                break
+            if vectors is None and len(page_ids):
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(path, "vectors.npy"),
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(count, page_vectors.shape[1]),
+                )
+            take = min(room, len(page_ids))
+            vectors[len(ids) : len(ids) + take] = page_vectors[:take]
+            for doc, meta in zip(page_docs[:take], page_metas[:take]):
+                data = (doc or "").encode("utf-8")
+                documents.write(data)
+                offsets.append(offsets[-1] + len(data))
+                metadatas.append(meta or {})
+            ids.extend(page_ids[:take])
+
+    if vectors is None:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(path, "vectors.npy"), matrix)
+    else:
+        vectors.flush()
+        matrix = vectors[: len(ids)]
+        if len(ids) < count:
+            # Rows were deleted while exporting: rewrite at the real size
+            matrix = np.array(matrix)
+            del vectors
+            np.save(os.path.join(path, "vectors.npy"), matrix)
+
+    np.save(
+        os.path.join(path, "norms.npy"),
+        np.einsum("ij,ij->i", matrix, matrix).astype(np.float32),
+    )
+    if matrix.size:
+        codes = np.lib.format.open_memmap(
+            os.path.join(path, "codes.npy"),
+            mode="w+",
+            dtype=np.int8,
+            shape=matrix.shape,
+        )
+        offset, scale = quantize_int8(matrix, codes)
+        codes.flush()
+        del codes
+    else:
+        np.save(os.path.join(path, "codes.npy"), np.zeros(matrix.shape, np.int8))
+        offset, scale = quantize_int8(matrix, None)
+    np.save(os.path.join(path, "quant_offset.npy"), offset)
+    np.save(os.path.join(path, "quant_scale.npy"), scale)
+    np.save(os.path.join(path, "doc_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {"ids": ids, "metadatas": metadatas, "space": space, "version": version},
+            f,
+        )
+
+
+def _snapshot_dirname(version: str) -> str:
+    return "v-" + hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+
+
+# Builds a snapshot of a physical collection into the given new directory
+SnapshotBuilder = Callable[[str, str], None]
+
+
+class NumpyIndexStore:
+    """
+    Snapshots of physical collections under `<base_dir>/vector_index/`, one
+    directory per collection with a CURRENT file naming the live snapshot.
+
+    `get` builds the snapshot for a collection version (the ingest manifest
+    version) if it is not the live one yet; ingestion calls it once it is
+    done. Building takes an exclusive file lock, so with several uvicorn
+    workers one builds and the others load the result. Queries use `latest`,
+    which never builds and only re-reads CURRENT every `refresh_seconds`.
+    """
+
+    def __init__(self, base_dir: str, refresh_seconds: float = 5.0):
+        self.root = os.path.join(base_dir, INDEX_DIRNAME)
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, NumpyIndex] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    def _collection_dir(self, physical: str) -> str:
+        return os.path.join(self.root, physical)
+
+    def _current(self, physical: str) -> Optional[str]:
+        try:
+            with open(
+                os.path.join(self._collection_dir(physical), CURRENT_FILENAME),
+                "r",
+                encoding="utf-8",
+            ) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _build_lock(self, physical: str):
+        directory = self._collection_dir(physical)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield directory
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, physical: str, version: str, build: SnapshotBuilder) -> NumpyIndex:
+        """The snapshot of `physical` at `version`, building it if needed."""
+        wanted = _snapshot_dirname(version)
+        index = self._loaded.get(physical)
+        if index is not None and index.version == version:
+            return index
+
+        with self._lock:
+            index = self._loaded.get(physical)
+            if index is not None and index.version == version:
+                return index
+
+            if self._current(physical) != wanted:
+                with self._build_lock(physical) as directory:
+                    # Another worker may have built it while we waited
+                    if self._current(physical) != wanted:
+                        tmp = os.path.join(directory, f"tmp-{uuid.uuid4().hex}")
+                        build(physical, tmp)
+                        target = os.path.join(directory, wanted)
+                        shutil.rmtree(target, ignore_errors=True)
+                        os.rename(tmp, target)
+                        current_tmp = os.path.join(directory, CURRENT_FILENAME + ".tmp")
+                        with open(current_tmp, "w", encoding="utf-8") as f:
+                            f.write(wanted)
+                        os.replace(
+                            current_tmp, os.path.join(directory, CURRENT_FILENAME)
+                        )
+                        self._remove_stale(directory, keep=wanted)
+
+            index = NumpyIndex(os.path.join(self._collection_dir(physical), wanted))
+            self._loaded[physical] = index
+            return index
+
+    def latest(self, physical: str) -> Optional[NumpyIndex]:
+        """
+        The live snapshot of `physical`, or None if none was built yet.
+        Picks up snapshots built by other processes within `refresh_seconds`.
+        """
+        now = time.monotonic()
+        index = self._loaded.get(physical)
+        if (
+            index is not None
+            and now - self._checked_at.get(physical, 0.0) < self.refresh_seconds
+        ):
+            return index
+
+        with self._lock:
+            self._checked_at[physical] = now
+            index = self._loaded.get(physical)
+            wanted = self._current(physical)
+            if wanted is None or (
+                index is not None and os.path.basename(index.path) == wanted
+            ):
+                return index
+            try:
+                index = NumpyIndex(os.path.join(self._collection_dir(physical), wanted))
+            except FileNotFoundError:
+                # Replaced again while we read CURRENT; keep serving ours
+                return self._loaded.get(physical)
+            self._loaded[physical] = index
+            return index
+
+    @staticmethod
+    def _remove_stale(directory: str, keep: str) -> None:
+        # Readers in other workers keep their mmaps valid after unlink
+        for name in os.listdir(directory):
+            if name.startswith(("v-", "tmp-")) and name != keep:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    def remove(self, physical: str) -> None:
+        with self._lock:
+            self._loaded.pop(physical, None)
+            self._checked_at.pop(physical, None)
+        shutil.rmtree(self._collection_dir(physical), ignore_errors=True)
+
+
+_stores: Dict[str, NumpyIndexStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_index_store(base_dir: str, refresh_seconds: float = 5.0) -> NumpyIndexStore:
+    path = os.path.abspath(base_dir)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = NumpyIndexStore(path, refresh_seconds=refresh_seconds)
+            _stores[path] = store
+    return store
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.core.chunking import chunk_text, semantic_chunk_text_with_overlap
+from app.core.doc_loader import load_document_pages, pdf_page_count
+
+# (page_number, chunks of that page, words on that page)
+PageChunks = Tuple[int, List[str], int]
+
+
+def chunk_pages(
+    path: str,
+    mode: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    page_range: Optional[Tuple[int, int]] = None,
+) -> List[PageChunks]:
+    """
+    Load, clean and chunk the pages of one file (or one page range of a PDF).
+    Runs inside worker processes, so it only takes and returns plain data.
+    """
+    pages = load_document_pages(path, file_type="auto", page_range=page_range)
+
+    results: List[PageChunks] = []
+    for page_num, page_text in pages:
+        if mode == "fixed":
+            page_chunks = chunk_text(
+                page_text,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+            )
+        elif mode == "semantic":
+            page_chunks = semantic_chunk_text_with_overlap(
+                text=page_text,
+                max_chunk_words=chunk_size,
+                overlap_words=chunk_overlap,
+            )
+        else:
+            raise ValueError(f"Unsupported mode: {mode}")
+        results.append((page_num, page_chunks, len(page_text.split())))
+    return results
+
+
+def page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into consecutive ranges of at most pages_per_task."""
+    if pages_per_task <= 0:
+        raise ValueError("pages_per_task must be positive")
+    return [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+
+
+class ParsePool:
+    """
+    Process pool for CPU-bound parsing (PDF text extraction, cleaning,
+    chunking). Whole files are one task each; PDFs with more than
+    `pages_per_task` pages are split into page ranges. Results always come
+    back in page order, whatever order the workers finish in.
+
+    Workers are spawned rather than forked: the parent has live threads
+    (executors, Chroma) that must not be copied mid-operation.
+    """
+
+    def __init__(self, workers: int, pages_per_task: int):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def iter_parse(
+        self, path: Path, mode: str, chunk_size: int, chunk_overlap: int
+    ) -> AsyncIterator[List[PageChunks]]:
+        """
+        Yield the pages of `path` one task (page range) at a time, in page
+        order. At most `workers` ranges of one file are in flight, so a huge
+        PDF never sits in memory all at once.
+
+        When the caller stops early (an aborted ingest), ranges still queued
+        are dropped and the ones already running are waited for, so the
+        pool's workers are free again once this returns.
+        """
+        loop = asyncio.get_running_loop()
+        ranges: List[Optional[Tuple[int, int]]] = [None]
+        if path.suffix.lower() == ".pdf":
+            count = await loop.run_in_executor(self._pool, pdf_page_count, str(path))
+            if count > self.pages_per_task:
+                ranges = list(page_ranges(count, self.pages_per_task))
+
+        def _submit(page_range: Optional[Tuple[int, int]]) -> Future:
+            return self._pool.submit(
+                chunk_pages,
+                str(path),
+                mode,
+                chunk_size,
+                chunk_overlap,
+                page_range,
+            )
+
+        queued = deque(ranges)
+        in_flight = deque(
+            _submit(queued.popleft()) for _ in range(min(self.workers, len(queued)))
+        )
+        try:
+            while in_flight:
+                part = await asyncio.wrap_future(in_flight[0])
+                in_flight.popleft()
+                if queued:
+                    in_flight.append(_submit(queued.popleft()))
+                yield part
+        finally:
+            # A worker process cannot be interrupted mid-range: cancel what
+            # has not started and drain the rest.
+            running = [future for future in in_flight if not future.cancel()]
+            if running:
+                await asyncio.gather(
+                    *(asyncio.wrap_future(future) for future in running),
+                    return_exceptions=True,
+                )
+
+    async def parse(
+        self, path: Path, mode: str, chunk_size: int, chunk_overlap: int
+    ) -> List[PageChunks]:
+        pages: List[PageChunks] = []
+        async for part in self.iter_parse(path, mode, chunk_size, chunk_overlap):
+            pages.extend(part)
+        return pages
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -1,51 +1,160 @@
-from typing import List
+from dataclasses import dataclass
+from typing import List, Optional
 
+from app.core import prompts, tokens
 from app.models.chunk import TextChunk
 
+CONTEXT_SEPARATOR = "\n\n"
+
+
+@dataclass
+class ContextBlock:
+    """One cited snippet: a chunk, or a run of adjacent chunks merged."""
+
+    chunks: List[TextChunk]
+    text: str
+    # Best (lowest) distance among the merged chunks
+    score: float
+
+    @property
+    def metadata(self):
+        return self.chunks[0].metadata
+
+
+@dataclass
+class PackedContext:
+    context: str
+    # blocks[i] is what citation [i] refers to
+    blocks: List[ContextBlock]
+    tokens: int
+
+
+def _header(idx: int, chunk: TextChunk) -> str:
+    meta = chunk.metadata
+
+    meta_parts = [f"source={meta.filename}"]
+    if meta.page is not None:
+        meta_parts.append(f"page={meta.page}")
+    if meta.chunk_number is not None:
+        meta_parts.append(f"chunk={meta.chunk_number}")
+
+    return f"[{idx}] [{', '.join(meta_parts)}]"
+
 
 def build_context(chunks: List[TextChunk]) -> str:
     """
     Build a context string with explicit indices and metadata so the LLM can
     reference [0], [1], etc. and we can map them back to sources.
     """
-    lines = []
-    for idx, ch in enumerate(chunks):
-        meta = ch.metadata
+    return CONTEXT_SEPARATOR.join(
+        f"{_header(idx, ch)}\n{ch.text.strip()}" for idx, ch in enumerate(chunks)
+    )
+
+
+def _overlap(left: List[str], right: List[str]) -> int:
+    """Number of words that end `left` and also start `right`."""
+    for size in range(min(len(left), len(right)), 0, -1):
+        if left[-size:] == right[:size]:
+            return size
+    return 0
 
-        meta_parts = [f"source={meta.filename}"]
-        if meta.page is not None:
-            meta_parts.append(f"page={meta.page}")
-        if meta.chunk_number is not None:
-            meta_parts.append(f"chunk={meta.chunk_number}")
 
-        meta_str = ", ".join(meta_parts)
-        lines.append(f"[{idx}] [{meta_str}]\n{ch.text.strip()}")
+def _adjacent(previous: TextChunk, chunk: TextChunk) -> bool:
+    a, b = previous.metadata, chunk.metadata
+    return (
+        a.source == b.source
+        and a.page == b.page
+        and a.chunk_number is not None
+        and b.chunk_number == a.chunk_number + 1
+    )
 
-    return "\n\n".join(lines)
 
+def merge_adjacent(chunks: List[TextChunk]) -> List[ContextBlock]:
+    """
+    Merge retrieved chunks that follow each other in the same file and page
+    into one block, dropping the words their chunk overlap repeats. Blocks
+    come back best score first.
+    """
+    ordered = sorted(
+        chunks,
+        key=lambda ch: (
+            ch.metadata.source,
+            ch.metadata.page is None,
+            ch.metadata.page or 0,
+            ch.metadata.chunk_number is None,
+            ch.metadata.chunk_number or 0,
+        ),
+    )
+
+    blocks: List[ContextBlock] = []
+    words: List[List[str]] = []
+    for chunk in ordered:
+        chunk_words = chunk.text.split()
+        if blocks and _adjacent(blocks[-1].chunks[-1], chunk):
+            block = blocks[-1]
+            words[-1].extend(chunk_words[_overlap(words[-1], chunk_words) :])
+            block.chunks.append(chunk)
+            block.score = min(block.score, chunk.score)
+        else:
+            blocks.append(ContextBlock(chunks=[chunk], text="", score=chunk.score))
+            words.append(chunk_words)
 
-def build_rag_prompt(context: str, question: str) -> str:
-    return f"""You are a precise assistant answering questions based ONLY on the provided context.
+    for block, block_words in zip(blocks, words):
+        block.text = " ".join(block_words)
+    blocks.sort(key=lambda block: block.score)
+    return blocks
 
-Context:
-{context}
 
-Question:
-{question}
+def pack_context(
+    chunks: List[TextChunk],
+    max_tokens: Optional[int] = None,
+    model: Optional[str] = None,
+    merge: bool = True,
+) -> PackedContext:
+    """
+    Context for the prompt within `max_tokens` (None or 0 = no limit):
+    blocks in score order until the next one no longer fits. The first block
+    is truncated rather than dropped, so there is always some context.
+    """
+    if merge:
+        blocks = merge_adjacent(chunks)
+    else:
+        blocks = [
+            ContextBlock(chunks=[ch], text=ch.text.strip(), score=ch.score)
+            for ch in sorted(chunks, key=lambda ch: ch.score)
+        ]
 
-Instructions:
-- Use ONLY the information in the context. Do NOT use external knowledge.
-- If the answer is not in the context, say you cannot answer based on the given information.
-- When you refer to specific facts, add citations like [0], [1], [2] that correspond to the snippet indices in the Context section.
-- Do NOT invent or list your own source filenames or page numbers; citations are just [0], [1], etc.
-- First write an 'ANSWER:' section with a concise answer (2–4 sentences).
-- Then write a 'SUMMARY:' section with 1–3 bullet points summarizing the key ideas.
+    parts: List[str] = []
+    packed: List[ContextBlock] = []
+    used = 0
+    separator_tokens = tokens.count_tokens(CONTEXT_SEPARATOR, model)
+    for block in blocks:
+        header = _header(len(packed), block.chunks[0])
+        part = f"{header}\n{block.text}"
+        cost = tokens.count_tokens(part, model) + (separator_tokens if parts else 0)
+        if max_tokens and used + cost > max_tokens:
+            if packed:
+                break
+            header_tokens = tokens.count_tokens(header + "\n", model)
+            block.text = tokens.truncate_to_tokens(
+                block.text, max_tokens - header_tokens, model
+            )
+            part = f"{header}\n{block.text}"
+            cost = tokens.count_tokens(part, model)
+        parts.append(part)
+        packed.append(block)
+        used += cost
 
-Respond in the following format exactly:
+    return PackedContext(
+        context=CONTEXT_SEPARATOR.join(parts), blocks=packed, tokens=used
+    )
 
-ANSWER:
-<your answer here>
 
-SUMMARY:
-<your summary here>
-"""
+def build_rag_prompt(
+    context: str, question: str, version: Optional[str] = None
+) -> prompts.RenderedPrompt:
+    """
+    System message with the fixed instructions (a stable, cacheable prefix),
+    user message with the context and question.
+    """
+    return prompts.get_prompt("rag", version).render(context=context, question=question)
@@ -2,13 +2,15 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import Request
 
-from app.core import chroma_client
+from app.core import chroma_client, embedding_dims, executors, tracing, vector_store
 from app.core.config import get_settings
 from app.models.chunk import ChunkMetadata, TextChunk
 from app.services import openai_service
 
 settings = get_settings()
 
+DEFAULT_COLLECTION = "docs"
+
 
 def _to_chunk_metadata(raw_meta) -> ChunkMetadata:
     if isinstance(raw_meta, ChunkMetadata):
@@ -50,41 +52,71 @@ def _build_where(
     return {"$and": conditions}
 
 
+def _collection_dimensions(
+    collection_name: str,
+) -> Optional[embedding_dims.CollectionDimensions]:
+    collection = chroma_client.get_collection(collection_name)
+    return embedding_dims.recorded_dimensions(collection)
+
+
+async def _embed_at(
+    http_request: Optional[Request],
+    query: str,
+    dimensions: Optional[embedding_dims.CollectionDimensions],
+) -> List[float]:
+    if dimensions is None or dimensions.request_dimensions is None:
+        return await openai_service.embed_text(http_request, query)
+    return await openai_service.embed_text(
+        http_request, query, dimensions=dimensions.request_dimensions
+    )
+
+
+async def embed_query(
+    http_request: Optional[Request],
+    query: str,
+    collection_name: str = DEFAULT_COLLECTION,
+) -> List[float]:
+    """Embed `query` at the width of the collection it will search."""
+    dimensions = await executors.run_read(_collection_dimensions, collection_name)
+    return await _embed_at(http_request, query, dimensions)
+
+
 async def search_chunks(
     http_request: Optional[Request],
     query: str,
-    collection_name: str = "docs",
+    collection_name: str = DEFAULT_COLLECTION,
     k: int = settings.default_top_k,
     filename: Optional[str] = None,
     metadata_filter: Optional[dict[str, Any]] = None,
+    query_embedding: Optional[List[float]] = None,
 ) -> List[TextChunk]:
-    given_embedding = await openai_service.embed_text(http_request, query)
-
-    client = chroma_client.get_chroma_client()
-    collection = client.get_or_create_collection(name=collection_name)
+    dimensions = await executors.run_read(_collection_dimensions, collection_name)
+    if query_embedding is None:
+        with tracing.span(http_request, "embed_query"):
+            given_embedding = await _embed_at(http_request, query, dimensions)
+    elif dimensions is not None:
+        # Callers that already embedded the query (answer cache) pass it in
+        given_embedding = embedding_dims.adapt_query_vector(
+            query_embedding, dimensions.width, collection_name
+        )
+    else:
+        given_embedding = query_embedding
 
     where = _build_where(filename=filename, metadata_filter=metadata_filter)
 
-    results = collection.query(
-        query_embeddings=[given_embedding],
-        n_results=k,
-        where=where,
-        include=["documents", "metadatas", "distances"],
-    )
-
-    docs = results["documents"][0]
-    metas = results["metadatas"][0]
-    distances = results["distances"][0]
-    ids = results.get("ids", [[]])[0]
-
-    chunks: List[TextChunk] = []
-    for doc, meta, dist, id_ in zip(docs, metas, distances, ids):
-        text_chunk = TextChunk(
-            id=id_,
-            text=doc,
-            score=float(dist),
-            metadata=_to_chunk_metadata(meta),
+    store = vector_store.get_vector_store(collection_name)
+    with tracing.span(
+        http_request, "vector_query", backend=store.backend, k=k
+    ) as entry:
+        hits = await store.aquery(collection_name, given_embedding, k, where)
+        tracing.annotate(entry, hits=len(hits))
+
+    return [
+        TextChunk(
+            id=hit.id,
+            text=hit.document,
+            score=hit.distance,
+            metadata=_to_chunk_metadata(hit.metadata),
         )
-        chunks.append(text_chunk)
-
-    return chunks
+        for hit in hits
+    ]
@@ -0,0 +1,168 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+R = TypeVar("R")
+
+# Upstream token stream; writes whatever it learns (usage, model) into `meta`
+StreamFactory = Callable[[Dict[str, Any]], AsyncIterator[str]]
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class TeeStream:
+    """
+    One upstream token stream shared by several readers. Every reader sees
+    the whole stream: tokens that arrived before it joined are replayed,
+    later ones are delivered live. Upstream errors reach every reader. The
+    upstream is cancelled when the last reader leaves early.
+    """
+
+    def __init__(self, factory: StreamFactory, on_done: Callable[[], None]):
+        self.tokens: List[str] = []
+        self.meta: Dict[str, Any] = {}
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._readers = 0
+        self._changed = asyncio.Event()
+        self._on_done = on_done
+        self._task = asyncio.create_task(self._pump(factory))
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _pump(self, factory: StreamFactory) -> None:
+        try:
+            async for token in factory(self.meta):
+                self.tokens.append(token)
+                self._notify()
+        except BaseException as exc:  # CancelledError included: readers must wake
+            self.error = exc
+        finally:
+            self.done = True
+            self._on_done()
+            self._notify()
+
+    def join(self) -> AsyncIterator[str]:
+        self._readers += 1
+        return self._read()
+
+    async def _read(self) -> AsyncIterator[str]:
+        position = 0
+        try:
+            while True:
+                while position < len(self.tokens):
+                    yield self.tokens[position]
+                    position += 1
+                changed = self._changed
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            self._readers -= 1
+            if self._readers == 0 and not self.done:
+                self._on_done()
+                self._task.cancel()
+
+
+class SingleFlight:
+    """
+    Request coalescing: while a call for `key` is in flight, identical calls
+    wait for it instead of starting their own, and all get the same result
+    (or exception). Keys are tuples whose first item names the operation,
+    which is what the saved-call counters are grouped by.
+
+    A waiter that is cancelled only stops waiting; the upstream call is
+    cancelled once nobody waits for it any more.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._streams: Dict[Hashable, TeeStream] = {}
+        self.upstream_calls: Counter = Counter()
+        self.saved_calls: Counter = Counter()
+
+    def _forget(self, registry: dict, key: Hashable, value: Any) -> None:
+        if registry.get(key) is value:
+            del registry[key]
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[R]]) -> Tuple[R, bool]:
+        """Returns (result, shared); shared is True if another call did the work."""
+        if not self.enabled:
+            return await fn(), False
+
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(task=asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(
+                lambda _task, f=flight: self._forget(self._flights, key, f)
+            )
+            self.upstream_calls[key[0]] += 1
+        else:
+            self.saved_calls[key[0]] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                self._forget(self._flights, key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stream(
+        self, key: Tuple, factory: StreamFactory
+    ) -> Tuple[AsyncIterator[str], TeeStream, bool]:
+        """
+        Join the in-flight stream for `key` or start it. Returns
+        (tokens, tee, shared); `tee.meta` holds what the upstream reported
+        once the tokens are exhausted.
+        """
+        tee = self._streams.get(key) if self.enabled else None
+        shared = tee is not None
+        if tee is None:
+            holder: List[TeeStream] = []
+            tee = TeeStream(
+                factory,
+                on_done=lambda: self._forget(self._streams, key, holder[0]),
+            )
+            holder.append(tee)
+            if self.enabled:
+                self._streams[key] = tee
+            self.upstream_calls[key[0]] += 1
+        else:
+            self.saved_calls[key[0]] += 1
+        return tee.join(), tee, shared
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights) + len(self._streams),
+            "upstream_calls": dict(self.upstream_calls),
+            "saved_calls": dict(self.saved_calls),
+            "saved_total": sum(self.saved_calls.values()),
+        }
@@ -0,0 +1,129 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from loguru import logger
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Rough size of an English token, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+FALLBACK_ENCODING = "o200k_base"
+# A failed load (BPE files are downloaded on first use) is tried again after
+RETRY_SECONDS = 60.0
+
+_lock = threading.Lock()
+_encodings: Dict[Optional[str], Any] = {}
+_failed_at: Dict[Optional[str], float] = {}
+_loading: Set[Optional[str]] = set()
+
+
+def _load(model: Optional[str]):
+    """Load the encoding for `model`, blocking. None (and logged) on failure."""
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as exc:
+        logger.warning(
+            "tokenizer_unavailable",
+            model=model,
+            error=str(exc),
+            retry_in_s=RETRY_SECONDS,
+        )
+        with _lock:
+            _failed_at[model] = time.monotonic()
+        return None
+    with _lock:
+        _encodings[model] = encoding
+        _failed_at.pop(model, None)
+    return encoding
+
+
+def _load_in_background(model: Optional[str]) -> None:
+    with _lock:
+        if model in _loading:
+            return
+        _loading.add(model)
+
+    def _run() -> None:
+        try:
+            _load(model)
+        finally:
+            with _lock:
+                _loading.discard(model)
+
+    threading.Thread(target=_run, name="tokenizer-load", daemon=True).start()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _encoding(model: Optional[str]):
+    """
+    tiktoken encoding for `model`, or None to use the estimate meanwhile.
+
+    Loading may download BPE files, so it never happens on the event loop:
+    there the estimate is used while a background thread loads it. Threads
+    and CLIs load inline. A failed load is retried after RETRY_SECONDS.
+    """
+    if tiktoken is None:
+        return None
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    failed_at = _failed_at.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < RETRY_SECONDS:
+        return None
+    if _on_event_loop():
+        _load_in_background(model)
+        return None
+    return _load(model)
+
+
+def load_encodings(models: Iterable[Optional[str]]) -> None:
+    """
+    Load the encodings up front (blocking: the app lifespan runs it in an
+    executor), so requests never wait for or estimate around them.
+    """
+    if tiktoken is None:
+        return
+    for model in models:
+        if model not in _encodings:
+            _load(model)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Longest prefix of `text` within `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        # Cut at a word boundary when there is one
+        cut = text.rfind(" ", 0, limit + 1)
+        return text[: cut if cut > 0 else limit]
+    ids = encoding.encode(text, disallowed_special=())
+    if len(ids) <= max_tokens:
+        return text
+    return encoding.decode(ids[:max_tokens])
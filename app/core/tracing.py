@@ -0,0 +1,199 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from app.core.config import get_settings
+
+
+class SpanLog(BaseModel):
+    """One timed stage of a request, kept in `request.state.spans`."""
+
+    name: str
+    # Offset from the start of the request
+    start_ms: float
+    duration_ms: float = 0.0
+    # Index of the enclosing span in request.state.spans
+    parent: Optional[int] = None
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+
+
+# Index of the innermost open span, per task
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+
+
+def start_request(request) -> None:
+    """Called by the middleware before the request is handled."""
+    request.state.spans = []
+    request.state.span_origin = (time.perf_counter(), time.time_ns())
+
+
+@contextmanager
+def span(request, name: str, **attributes: Any) -> Iterator[Optional[SpanLog]]:
+    """
+    Time the enclosed block as a span of `request`; a no-op (yielding None)
+    outside a traced request, e.g. in scripts. Attributes can be added to
+    the yielded span while it is open.
+    """
+    state = getattr(request, "state", None)
+    spans: Optional[List[SpanLog]] = getattr(state, "spans", None)
+    if spans is None or not get_settings().tracing_enabled:
+        yield None
+        return
+
+    origin = state.span_origin[0]
+    t0 = time.perf_counter()
+    parent = _current_span.get()
+    entry = SpanLog(
+        name=name,
+        start_ms=(t0 - origin) * 1000,
+        parent=parent,
+        attributes={k: v for k, v in attributes.items() if v is not None},
+    )
+    spans.append(entry)
+    _current_span.set(len(spans) - 1)
+    try:
+        yield entry
+    except BaseException as exc:
+        entry.attributes["error"] = type(exc).__name__
+        raise
+    finally:
+        entry.duration_ms = (time.perf_counter() - t0) * 1000
+        # set(), not reset(): async generators may close in another context
+        _current_span.set(parent)
+
+
+def annotate(entry: Optional[SpanLog], **attributes: Any) -> None:
+    """Add attributes to a span yielded by `span()`, if tracing is on."""
+    if entry is not None:
+        entry.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+
+def server_timing(spans: List[SpanLog], total_ms: Optional[float] = None) -> str:
+    """Server-Timing header value: one metric per finished span."""
+    # Spans still open (streamed responses send headers first) are left out
+    parts = [f"{s.name};dur={s.duration_ms:.1f}" for s in spans if s.duration_ms > 0]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+# -------------------------
+# OpenTelemetry export (optional)
+# -------------------------
+_otel_lock = threading.Lock()
+_otel_provider = None
+_otel_tracer = None
+_otel_initialized = False
+
+
+def init_otel(exporter=None):
+    """
+    Set up the OpenTelemetry tracer spans are exported with: OTLP/gRPC to
+    OTEL_EXPORTER_OTLP_ENDPOINT unless another `exporter` is given. Returns
+    None when the OpenTelemetry SDK is not installed.
+    """
+    global _otel_provider, _otel_tracer, _otel_initialized
+    _otel_initialized = True
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("otel_export_unavailable", reason="opentelemetry-sdk missing")
+        return None
+
+    settings = get_settings()
+    if exporter is None:
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            logger.warning(
+                "otel_export_unavailable",
+                reason="opentelemetry-exporter-otlp-proto-grpc missing",
+            )
+            return None
+
+        exporter = OTLPSpanExporter(
+            endpoint=settings.otel_exporter_endpoint, insecure=True
+        )
+
+    with _otel_lock:
+        if _otel_provider is not None:
+            _otel_provider.shutdown()
+        # Not installed globally: Chroma has its own OpenTelemetry settings
+        _otel_provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.otel_service_name})
+        )
+        _otel_provider.add_span_processor(BatchSpanProcessor(exporter))
+        _otel_tracer = _otel_provider.get_tracer("app.tracing")
+    return _otel_tracer
+
+
+def _get_otel_tracer():
+    if not get_settings().otel_export_enabled:
+        return None
+    if not _otel_initialized:
+        init_otel()
+    return _otel_tracer
+
+
+def _otel_value(value: Any):
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+def export_request(
+    request, name: str, status_code: int, attributes: Dict[str, Any]
+) -> None:
+    """
+    Export a finished request and its spans (with their real start and end
+    times) as one trace. Runs after the response, off the hot path; the
+    batch processor sends them from a background thread.
+    """
+    tracer = _get_otel_tracer()
+    spans: Optional[List[SpanLog]] = getattr(request.state, "spans", None)
+    if tracer is None or spans is None:
+        return
+
+    from opentelemetry import trace
+
+    start_perf, start_ns = request.state.span_origin
+    end_ns = start_ns + int((time.perf_counter() - start_perf) * 1e9)
+    root = tracer.start_span(
+        name,
+        start_time=start_ns,
+        kind=trace.SpanKind.SERVER,
+        attributes={
+            "http.response.status_code": status_code,
+            **{k: _otel_value(v) for k, v in attributes.items() if v is not None},
+        },
+    )
+    exported = []
+    for entry in spans:
+        parent = root if entry.parent is None else exported[entry.parent]
+        span_start = start_ns + int(entry.start_ms * 1e6)
+        otel_span = tracer.start_span(
+            entry.name,
+            context=trace.set_span_in_context(parent),
+            start_time=span_start,
+            attributes={k: _otel_value(v) for k, v in entry.attributes.items()},
+        )
+        otel_span.end(end_time=span_start + int(entry.duration_ms * 1e6))
+        exported.append(otel_span)
+    root.end(end_time=end_ns)
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the exporter (app shutdown)."""
+    global _otel_provider, _otel_tracer, _otel_initialized
+    with _otel_lock:
+        if _otel_provider is not None:
+            _otel_provider.shutdown()
+        _otel_provider = _otel_tracer = None
+        _otel_initialized = False
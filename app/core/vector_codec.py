@@ -0,0 +1,43 @@
+import base64
+from typing import List, Literal, Sequence, Tuple
+
+import numpy as np
+
+VectorDType = Literal["float32", "float16"]
+
+# Explicit little-endian, whatever the server's byte order
+_NUMPY_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+
+def to_matrix(vectors: Sequence[Sequence[float]], dtype: VectorDType) -> np.ndarray:
+    """Stack equal-length vectors into a C-contiguous little-endian matrix."""
+    matrix = np.asarray(vectors, dtype=_NUMPY_DTYPES[dtype])
+    if matrix.ndim != 2:
+        raise ValueError("vectors must all have the same length")
+    return np.ascontiguousarray(matrix)
+
+
+def encode_base64_rows(
+    vectors: Sequence[Sequence[float]], dtype: VectorDType
+) -> List[str]:
+    """One base64 string per vector (raw little-endian bytes of that row)."""
+    matrix = to_matrix(vectors, dtype)
+    return [base64.b64encode(row.tobytes()).decode("ascii") for row in matrix]
+
+
+def decode_base64_row(data: str, dtype: VectorDType) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=_NUMPY_DTYPES[dtype])
+
+
+def encode_matrix_bytes(
+    vectors: Sequence[Sequence[float]], dtype: VectorDType
+) -> Tuple[bytes, Tuple[int, int]]:
+    """Row-major matrix bytes plus its (rows, columns) shape."""
+    matrix = to_matrix(vectors, dtype)
+    return matrix.tobytes(), (matrix.shape[0], matrix.shape[1])
+
+
+def decode_matrix_bytes(
+    data: bytes, shape: Tuple[int, int], dtype: VectorDType
+) -> np.ndarray:
+    return np.frombuffer(data, dtype=_NUMPY_DTYPES[dtype]).reshape(shape)
@@ -0,0 +1,245 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from chromadb.errors import NotFoundError
+from loguru import logger
+
+from app.core import chroma_client, executors, metrics
+from app.core.collection_aliases import VERSION_SEPARATOR, get_alias_store
+from app.core.config import get_settings
+from app.core.manifest import get_manifest
+from app.core.numpy_index import (
+    EXPORT_PAGE_SIZE,
+    IndexHit,
+    NumpyIndex,
+    get_index_store,
+    write_snapshot,
+)
+
+# A search result, whichever backend produced it
+SearchHit = IndexHit
+
+
+class VectorStore(ABC):
+    """
+    Nearest-neighbour search over one logical collection. Calls block, so
+    run them through `executors.run_read`. Writes always go to Chroma; other
+    backends serve reads from a snapshot of it.
+    """
+
+    backend: str
+
+    @abstractmethod
+    def query(
+        self,
+        collection_name: str,
+        embedding: Sequence[float],
+        k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchHit]: ...
+
+    async def aquery(
+        self,
+        collection_name: str,
+        embedding: Sequence[float],
+        k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchHit]:
+        """`query` from async code; runs on the read executor by default."""
+        return await executors.run_read(
+            self.query, collection_name, embedding, k, where
+        )
+
+
+_QUERY_INCLUDE = ["documents", "metadatas", "distances"]
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Approximate (HNSW) search inside Chroma. With CHROMA_ASYNC_QUERIES in
+    http mode, `aquery` awaits the server directly instead of using a thread.
+    In http mode `aquery` gives up after CHROMA_HTTP_TIMEOUT_SECONDS.
+    """
+
+    backend = "chroma"
+
+    def query(self, collection_name, embedding, k, where=None):
+        def _query():
+            collection = chroma_client.get_collection(collection_name)
+            return collection.query(
+                query_embeddings=[embedding],
+                n_results=k,
+                where=where,
+                include=_QUERY_INCLUDE,
+            )
+
+        with metrics.timed(metrics.VECTOR_QUERY_SECONDS, self.backend):
+            try:
+                results = _query()
+            except NotFoundError:
+                # Collection was recreated elsewhere (e.g. a CLI reindex): the
+                # cached handle is stale, fetch a fresh one once.
+                chroma_client.invalidate_collection(collection_name)
+                results = _query()
+        return self._hits(results)
+
+    async def aquery(self, collection_name, embedding, k, where=None):
+        settings = get_settings()
+        if settings.chroma_mode != "http":
+            return await super().aquery(collection_name, embedding, k, where)
+        return await asyncio.wait_for(
+            self._aquery_http(collection_name, embedding, k, where),
+            timeout=settings.chroma_http_timeout_seconds,
+        )
+
+    async def _aquery_http(self, collection_name, embedding, k, where):
+        if not get_settings().chroma_async_queries:
+            return await super().aquery(collection_name, embedding, k, where)
+
+        async def _query():
+            collection = await chroma_client.get_async_collection(collection_name)
+            return await collection.query(
+                query_embeddings=[embedding],
+                n_results=k,
+                where=where,
+                include=_QUERY_INCLUDE,
+            )
+
+        with metrics.timed(metrics.VECTOR_QUERY_SECONDS, self.backend):
+            try:
+                results = await _query()
+            except NotFoundError:
+                chroma_client.invalidate_collection(collection_name)
+                results = await _query()
+        return self._hits(results)
+
+    @staticmethod
+    def _hits(results) -> List[SearchHit]:
+        docs = results["documents"][0]
+        metas = results["metadatas"][0]
+        distances = results["distances"][0]
+        ids = results.get("ids", [[]])[0]
+        return [
+            SearchHit(id=id_, document=doc, metadata=meta, distance=float(dist))
+            for doc, meta, dist, id_ in zip(docs, metas, distances, ids)
+        ]
+
+
+def _collection_space(collection) -> str:
+    configuration = getattr(collection, "configuration_json", None) or {}
+    space = (configuration.get("hnsw") or {}).get("space")
+    if space is None:
+        space = (collection.metadata or {}).get("hnsw:space")
+    return space or "l2"
+
+
+def export_chroma_collection(physical: str, path: str, version: str) -> None:
+    """Snapshot a Chroma collection into a new NumPy index directory."""
+    collection = chroma_client.get_collection(physical)
+    count = collection.count()
+
+    def _pages():
+        for offset in range(0, count, EXPORT_PAGE_SIZE):
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=EXPORT_PAGE_SIZE,
+                offset=offset,
+            )
+            if not page["ids"]:
+                return
+            yield page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+
+    write_snapshot(path, _pages(), count, _collection_space(collection), version)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact search over an in-process, memory-mapped snapshot of the Chroma
+    collection. Snapshots are only built by `prepare` (after ingestion);
+    queries use the latest one and never touch the manifest. Until a
+    collection has a snapshot, its queries go to Chroma.
+    """
+
+    backend = "numpy"
+
+    def __init__(self):
+        self._missing_logged: Set[str] = set()
+
+    @staticmethod
+    def _index_store():
+        settings = get_settings()
+        return get_index_store(
+            settings.chroma_persist_dir,
+            refresh_seconds=settings.numpy_index_refresh_seconds,
+        )
+
+    def prepare(self, collection_name: str) -> NumpyIndex:
+        """Build the snapshot for the collection's current content if needed."""
+        physical = get_alias_store().resolve(collection_name)
+        version = get_manifest().version(physical)
+        return self._index_store().get(
+            physical,
+            version,
+            lambda name, path: export_chroma_collection(name, path, version),
+        )
+
+    def index(self, collection_name: str) -> Optional[NumpyIndex]:
+        """The latest prepared snapshot of the collection, if any."""
+        physical = get_alias_store().resolve(collection_name)
+        return self._index_store().latest(physical)
+
+    def query(self, collection_name, embedding, k, where=None):
+        index = self.index(collection_name)
+        if index is None:
+            if collection_name not in self._missing_logged:
+                self._missing_logged.add(collection_name)
+                logger.warning("numpy_snapshot_missing", collection=collection_name)
+            return _STORES[ChromaVectorStore.backend].query(
+                collection_name, embedding, k, where
+            )
+
+        settings = get_settings()
+        with metrics.timed(metrics.VECTOR_QUERY_SECONDS, self.backend):
+            return index.search(
+                embedding,
+                k,
+                where,
+                quantized=settings.numpy_index_quantization == "int8",
+                oversample=settings.numpy_index_oversample,
+            )
+
+
+_STORES: Dict[str, VectorStore] = {
+    ChromaVectorStore.backend: ChromaVectorStore(),
+    NumpyVectorStore.backend: NumpyVectorStore(),
+}
+
+
+def backend_for(collection_name: str) -> str:
+    """VECTOR_BACKENDS entry for the collection (or its alias), else the default."""
+    settings = get_settings()
+    alias = collection_name.split(VERSION_SEPARATOR, 1)[0]
+    return settings.vector_backends.get(
+        collection_name, settings.vector_backends.get(alias, settings.vector_backend)
+    )
+
+
+def get_vector_store(collection_name: str) -> VectorStore:
+    return _STORES[backend_for(collection_name)]
+
+
+def prepare_snapshot(collection_name: str) -> Optional[NumpyIndex]:
+    """
+    Build the NumPy snapshot (float32 and int8) right after ingestion, so the
+    first query does not pay for it. No-op for Chroma-backed collections.
+    """
+    store = get_vector_store(collection_name)
+    if not isinstance(store, NumpyVectorStore):
+        return None
+    return store.prepare(collection_name)
+
+
+def drop_snapshot(physical: str) -> None:
+    """Delete the NumPy snapshot of a physical collection, if there is one."""
+    get_index_store(get_settings().chroma_persist_dir).remove(physical)
@@ -1,14 +1,47 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from loguru import logger
 
-from app.api.routes import admin, ask, embed, health, rag_query, stream_chat
+from app.api.routes import admin, ask, embed, health, metrics, rag_query, stream_chat
+from app.core import chroma_client, executors, tokens, tracing
 from app.core.config import get_settings
+from app.core.embedding_cache import shutdown_embedding_cache
 from app.core.logger import setup_logging
+from app.core.loop_monitor import LoopLagMonitor
 from app.core.middleware import setup_middleware
+from app.services import jobs_service
 
 settings = get_settings()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    chroma_client.init_registry()
+    # May download tiktoken's BPE files, so not on the event loop
+    await executors.run_read(
+        tokens.load_encodings, [settings.chatgpt_model, settings.openai_embed_model]
+    )
+    # Loads job history and marks jobs from a previous run as interrupted
+    await jobs_service.start_job_manager()
+
+    monitor = None
+    if settings.loop_monitor_enabled:
+        monitor = LoopLagMonitor(threshold_ms=settings.loop_lag_threshold_ms)
+        monitor.start()
+
+    try:
+        yield
+    finally:
+        if monitor is not None:
+            await monitor.stop()
+        await jobs_service.shutdown_job_manager()
+        executors.shutdown_executors()
+        shutdown_embedding_cache()
+        chroma_client.shutdown_registry()
+        tracing.shutdown_tracing()
+
+
 def create_app():
     setup_logging()
     logger.info(
@@ -16,7 +49,7 @@ def create_app():
         settings.app_name,
     )
 
-    app = FastAPI(title=settings.app_name, debug=settings.debug)
+    app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
     setup_middleware(app)
 
     app.include_router(health.router)
@@ -25,6 +58,8 @@ def create_app():
     app.include_router(stream_chat.router)
     app.include_router(rag_query.router)
     app.include_router(admin.router)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
 
     return app
 
@@ -1,6 +1,7 @@
-from typing import List, Literal
+from datetime import datetime
+from typing import List, Literal, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class DocumentInfo(BaseModel):
@@ -17,3 +18,61 @@ class ReindexRequest(BaseModel):
     chunk_overlap: int = 40
     mode: Literal["fixed", "semantic"] = "fixed"
     reset: bool = True
+    embed_batch_size: Optional[int] = Field(default=None, ge=1, le=2048)
+    embed_concurrency: Optional[int] = Field(default=None, ge=1, le=32)
+    parse_workers: Optional[int] = Field(default=None, ge=1, le=64)
+
+
+class MigrateDimensionsRequest(BaseModel):
+    dimensions: int = Field(..., ge=1)
+    # False: truncate + re-normalize the stored vectors instead (no API calls)
+    reembed: bool = True
+    embed_batch_size: Optional[int] = Field(default=None, ge=1, le=2048)
+    embed_concurrency: Optional[int] = Field(default=None, ge=1, le=32)
+
+
+class CollectionVersion(BaseModel):
+    name: str
+    created_at: float
+    retired_at: Optional[float] = None
+    current: bool = False
+
+
+class CollectionVersions(BaseModel):
+    collection: str
+    current: str
+    versions: List[CollectionVersion]
+
+
+JobStatus = Literal[
+    "queued", "running", "succeeded", "failed", "cancelled", "interrupted"
+]
+
+
+class JobInfo(BaseModel):
+    id: str
+    kind: Literal["reindex", "migrate_dimensions"] = "reindex"
+    status: JobStatus = "queued"
+    collection: str
+    request: Union[ReindexRequest, MigrateDimensionsRequest]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    files_total: int = 0
+    files_done: int = 0
+    bytes_total: int = 0
+    bytes_done: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    files_skipped: int = 0
+    files_removed: int = 0
+    current_file: Optional[str] = None
+
+    chunks_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled", "interrupted")
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field
 
 
 class EmbedRequest(BaseModel):
@@ -7,3 +9,22 @@ class EmbedRequest(BaseModel):
 
 class EmbedResponse(BaseModel):
     embedding: list[float]
+
+
+class EmbedBatchRequest(BaseModel):
+    # Sent upstream in EMBED_BATCH_SIZE / EMBED_BATCH_MAX_TOKENS slices
+    texts: List[str] = Field(..., min_length=1, max_length=2048)
+    dimensions: Optional[int] = Field(default=None, ge=1)
+    # JSON output: plain float lists, or one base64 string per vector
+    encoding: Literal["float", "base64"] = "float"
+    # Element type of base64 / application/octet-stream output
+    dtype: Literal["float32", "float16"] = "float32"
+
+
+class EmbedBatchResponse(BaseModel):
+    model: str
+    count: int
+    dimensions: int
+    encoding: Literal["float", "base64"]
+    dtype: Optional[Literal["float32", "float16"]] = None
+    embeddings: Union[List[List[float]], List[str]]
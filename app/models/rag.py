@@ -20,9 +20,29 @@ class RagSource(BaseModel):
     text: str
     score: float
     metadata: ChunkMetadata
+    # Retrieved chunks merged into this source (adjacent chunks of one page)
+    chunk_ids: List[str] = Field(default_factory=list)
 
 
 class RagAnswer(BaseModel):
     answer: str
     summary: Optional[str] = None
     sources: List[RagSource]
+    # True when served from the semantic answer cache
+    cached: bool = False
+
+
+class RagStreamUsage(BaseModel):
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+
+
+class RagStreamDone(BaseModel):
+    """Payload of the final "done" event of /rag-query/stream."""
+
+    usage: Optional[RagStreamUsage] = None
+    retrieval_ms: int
+    first_token_ms: Optional[int] = None
+    total_ms: int
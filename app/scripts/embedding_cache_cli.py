@@ -0,0 +1,76 @@
+import json
+from typing import Optional
+
+import typer
+
+from app.core.config import get_settings
+from app.core.embedding_cache import EmbeddingCache
+
+app = typer.Typer(help="Inspect and prune the on-disk embedding cache.")
+
+
+def _open_cache(cache_dir: Optional[str]) -> EmbeddingCache:
+    settings = get_settings()
+    return EmbeddingCache(
+        cache_dir=cache_dir or settings.embedding_cache_dir,
+        max_entries=settings.embedding_cache_max_entries,
+        max_bytes=settings.embedding_cache_max_bytes,
+        compact_ratio=settings.embedding_cache_compact_ratio,
+    )
+
+
+@app.command()
+def stats(
+    cache_dir: Optional[str] = typer.Option(None, "--cache-dir", "-d"),
+):
+    cache = _open_cache(cache_dir)
+    try:
+        typer.echo(json.dumps(cache.stats(), indent=2))
+    finally:
+        cache.close()
+
+
+@app.command()
+def prune(
+    max_entries: Optional[int] = typer.Option(
+        None, "--max-entries", help="Keep at most this many (most recent) entries."
+    ),
+    max_bytes: Optional[int] = typer.Option(
+        None, "--max-bytes", help="Keep at most this many bytes of vectors."
+    ),
+    model: Optional[str] = typer.Option(
+        None, "--model", help="Drop every entry for this embedding model."
+    ),
+    cache_dir: Optional[str] = typer.Option(None, "--cache-dir", "-d"),
+):
+    cache = _open_cache(cache_dir)
+    try:
+        removed = 0
+        if model:
+            removed += cache.delete_model(model)
+        removed += cache.evict(max_entries, max_bytes)
+        reclaimed = cache.compact()
+        typer.echo(
+            f"Removed {removed} entries, reclaimed {reclaimed / 1_048_576:.1f} MB."
+        )
+    finally:
+        cache.close()
+
+
+@app.command()
+def clear(
+    cache_dir: Optional[str] = typer.Option(None, "--cache-dir", "-d"),
+    yes: bool = typer.Option(False, "--yes", "-y", help="Skip confirmation."),
+):
+    if not yes:
+        typer.confirm("Delete every cached embedding?", abort=True)
+    cache = _open_cache(cache_dir)
+    try:
+        cache.clear()
+        typer.echo("Embedding cache cleared.")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.core.numpy_index import NumpyIndex
+from app.core.vector_store import NumpyVectorStore
+from app.services import openai_service
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def evaluate_index(
+    index: NumpyIndex,
+    queries: np.ndarray,
+    k: int,
+    oversamples: Sequence[int],
+) -> List[dict]:
+    """
+    Compare int8 search (for each oversample factor) with exact search.
+    recall@k is the share of the exact top k that the quantized search also
+    returns, averaged over the queries.
+    """
+
+    def _timed(**kwargs):
+        latencies, results = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            hits = index.search(query, k, **kwargs)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            results.append({hit.id for hit in hits})
+        return latencies, results
+
+    exact_ms, exact_ids = _timed()
+    rows = [
+        {
+            "mode": "exact",
+            "oversample": None,
+            "recall": 1.0,
+            "p50_ms": _percentile(exact_ms, 50),
+            "p95_ms": _percentile(exact_ms, 95),
+        }
+    ]
+    for oversample in oversamples:
+        latencies, found = _timed(quantized=True, oversample=oversample)
+        recalls = [
+            len(got & want) / len(want) for got, want in zip(found, exact_ids) if want
+        ]
+        rows.append(
+            {
+                "mode": "int8",
+                "oversample": oversample,
+                "recall": float(np.mean(recalls)) if recalls else 1.0,
+                "p50_ms": _percentile(latencies, 50),
+                "p95_ms": _percentile(latencies, 95),
+            }
+        )
+    return rows
+
+
+def sample_queries(index: NumpyIndex, count: int, seed: int = 0) -> np.ndarray:
+    """Stored chunk vectors stand in for queries when no questions are given."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), size=min(count, len(index)), replace=False)
+    return np.asarray(index.vectors[np.sort(rows)], dtype=np.float32)
+
+
+def run(
+    collection: str,
+    k: int,
+    oversamples: Sequence[int],
+    num_queries: int,
+    questions_file: Optional[str],
+) -> None:
+    index = NumpyVectorStore().prepare(collection)
+    if len(index) == 0:
+        print(f"Collection '{collection}' is empty.")
+        return
+
+    if questions_file:
+        with open(questions_file, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        vectors = asyncio.run(openai_service.embed_texts(None, questions))
+        queries = np.asarray(vectors, dtype=np.float32)
+    else:
+        queries = sample_queries(index, num_queries)
+
+    float_mb = index.vectors.nbytes / 1e6
+    int8_mb = index.codes.nbytes / 1e6
+    print(f"Collection: {collection} ({len(index)} vectors, {index.space})")
+    print(f"Vectors: float32 {float_mb:.1f} MB, int8 {int8_mb:.1f} MB")
+    print(f"Queries: {len(queries)}, k={k}\n")
+
+    print(f"{'mode':<6} {'oversample':>10} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in evaluate_index(index, queries, k, oversamples):
+        oversample = "-" if row["oversample"] is None else str(row["oversample"])
+        print(
+            f"{row['mode']:<6} {oversample:>10} {row['recall']:>9.4f} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recall@k and latency of int8 search against exact search."
+    )
+    parser.add_argument("--collection", "-c", default="docs")
+    parser.add_argument("--k", type=int, default=6, help="Results per query.")
+    parser.add_argument(
+        "--oversample",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Oversample factors to evaluate (candidates = k * oversample).",
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=200,
+        help="Stored vectors sampled as queries (ignored with --questions).",
+    )
+    parser.add_argument(
+        "--questions",
+        default=None,
+        help="Text file with one question per line, embedded with OpenAI.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(
+        collection=args.collection,
+        k=args.k,
+        oversamples=args.oversample,
+        num_queries=args.queries,
+        questions_file=args.questions,
+    )
@@ -1,35 +1,39 @@
 import argparse
 import asyncio
 import glob
+import os
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-import chromadb
-
-from app.core.chroma_client import get_chroma_client
-from app.core.chunking import chunk_text, semantic_chunk_text_with_overlap
-from app.core.doc_loader import load_document_pages
+from app.core import chroma_client, embedding_dims, executors, metrics, vector_store
+from app.core.batching import estimate_tokens
+from app.core.config import get_settings
+from app.core.manifest import ManifestEntry, file_sha256, get_manifest
+from app.core.parsing import PageChunks, ParsePool, chunk_pages
 from app.models.chunk import ChunkMetadata
-from app.services.openai_service import embed_text
+from app.services import collections_service
+from app.services.embedding_service import embed_chunks
 
 CHROMA_DB_DIR = "chroma_db"
 DEFAULT_COLLECTION = "docs"
 
 
-def reset_collection(collection_name: str, client: chromadb.PersistentClient):
-    try:
-        client.delete_collection(name=collection_name)
-        print(f"Collection '{collection_name}' deleted.")
-    except Exception:
-        print(f"Collection '{collection_name}' not found, skipping delete.")
+@dataclass
+class IngestProgress:
+    files_total: int = 0
+    files_done: int = 0
+    bytes_total: int = 0
+    bytes_done: int = 0
+    chunks_embedded: int = 0
+    files_skipped: int = 0
+    files_removed: int = 0
+    current_file: Optional[str] = None
 
 
-async def embed_chunks(chunks: List[str]) -> List[List[float]]:
-    embeddings = []
-    for chunk in chunks:
-        vec = await embed_text(None, chunk)
-        embeddings.append(vec)
-    return embeddings
+ProgressCallback = Callable[[IngestProgress], None]
 
 
 def resolve_paths(patterns: List[str]) -> List[Path]:
@@ -50,26 +54,13 @@ def resolve_paths(patterns: List[str]) -> List[Path]:
     return sorted(paths)
 
 
-def iter_pages(path: Path) -> List[Tuple[int, str]]:
-    """
-    Wraps load_document_pages to return [(page_number, cleaned_text)].
-    """
-    pages = load_document_pages(str(path), file_type="auto")
-    return pages
-
-
-def build_chunks_for_file(
-    path: Path,
-    mode: str,
-    chunk_size: int,
-    chunk_overlap: int,
+def assemble_chunks(
+    path: Path, pages: List[PageChunks], first_chunk_number: int = 0
 ) -> Tuple[List[str], List[dict], List[str]]:
     """
-    For a single file:
-      - split into pages
-      - chunk each page
-      - add metadata (filename, page, chunk_number)
-      - build deterministic ids
+    Turn per-page chunks (in page order) into documents, metadata
+    (filename, page, chunk_number) and deterministic ids.
+    `first_chunk_number` continues the numbering when a file arrives in parts.
     Returns (documents, metadatas, ids)
 
     NOTE: metadatas MUST be plain dicts for Chroma.
@@ -80,29 +71,9 @@ def build_chunks_for_file(
     metadatas: List[dict] = []
     ids: List[str] = []
 
-    pages = iter_pages(path)
-    if not pages:
-        print(f"  -> No text found in {path}, skipping.")
-        return documents, metadatas, ids
-
-    chunk_counter = 0
-
-    for page_num, page_text in pages:
-        if mode == "fixed":
-            page_chunks = chunk_text(
-                page_text,
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-            )
-        elif mode == "semantic":
-            page_chunks = semantic_chunk_text_with_overlap(
-                text=page_text,
-                max_chunk_words=chunk_size,
-                overlap_words=chunk_overlap,
-            )
-        else:
-            raise ValueError(f"Unsupported mode: {mode}")
+    chunk_counter = first_chunk_number
 
+    for page_num, page_chunks, _ in pages:
         for local_idx, chunk in enumerate(page_chunks):
             # Unique id: filename + page + local chunk index
             chunk_id = f"{filename}-p{page_num}-c{local_idx}"
@@ -122,12 +93,83 @@ def build_chunks_for_file(
             ids.append(chunk_id)
             chunk_counter += 1
 
-    total_words = sum(len(t.split()) for _, t in pages)
-    print(f"  -> {filename}: {total_words} words → {len(documents)} chunks")
-
     return documents, metadatas, ids
 
 
+def build_chunks_for_file(
+    path: Path,
+    mode: str,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Tuple[List[str], List[dict], List[str]]:
+    """
+    For a single file, in this process:
+      - split into pages
+      - chunk each page
+      - add metadata (filename, page, chunk_number)
+      - build deterministic ids
+    Returns (documents, metadatas, ids)
+    """
+    pages = chunk_pages(str(path), mode, chunk_size, chunk_overlap)
+    if not pages:
+        print(f"  -> No text found in {path}, skipping.")
+    return assemble_chunks(path, pages)
+
+
+def _file_sizes(paths: List[Path]) -> Dict[Path, int]:
+    return {p: p.stat().st_size for p in paths}
+
+
+def _check_unchanged(
+    path: Path,
+    entry: Optional[ManifestEntry],
+    chunk_params: dict,
+) -> Tuple[bool, str, os.stat_result]:
+    """
+    Compare a file against its manifest entry.
+    Returns (unchanged, content_hash, stat). Hashing is skipped when size,
+    mtime and chunking parameters all match.
+    """
+    stat = path.stat()
+    if entry is not None and entry.chunk_params == chunk_params:
+        if entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return True, entry.content_hash, stat
+
+    content_hash = file_sha256(str(path))
+    unchanged = (
+        entry is not None
+        and entry.chunk_params == chunk_params
+        and entry.content_hash == content_hash
+    )
+    return unchanged, content_hash, stat
+
+
+@dataclass
+class _FileState:
+    """A changed file moving through the pipeline."""
+
+    path: Path
+    source: str
+    entry: Optional[ManifestEntry]
+    content_hash: str
+    stat: os.stat_result
+    ids: List[str] = field(default_factory=list)
+    pending_batches: int = 0
+    parsed: bool = False
+
+
+@dataclass
+class _Batch:
+    """Chunks of one or more files, embedded and written together."""
+
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[dict] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    files: List[_FileState] = field(default_factory=list)
+    tokens: int = 0
+    embeddings: Optional[List[List[float]]] = None
+
+
 async def ingest_files(
     file_patterns: List[str],
     collection_name: str = DEFAULT_COLLECTION,
@@ -135,8 +177,26 @@ async def ingest_files(
     chunk_overlap: int = 40,
     reset: bool = False,
     mode: str = "fixed",
+    embed_batch_size: Optional[int] = None,
+    embed_concurrency: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    parse_workers: Optional[int] = None,
 ):
-    paths = resolve_paths(file_patterns)
+    """
+    Ingest files as a staged pipeline:
+
+        parse+chunk --(embed queue)--> embed --(write queue)--> write
+
+    Stages run concurrently (PARSE_WORKERS / EMBED_CONCURRENCY /
+    INGEST_WRITE_CONCURRENCY tasks) and exchange batches of at most
+    `embed_batch_size` chunks and EMBED_BATCH_MAX_TOKENS estimated tokens
+    through queues of INGEST_QUEUE_SIZE batches. Chunks of all files share
+    one buffer, so many small files still make full embedding batches.
+    A full queue blocks the stage feeding it, so memory stays bounded by the
+    queue sizes, not by the corpus or by the size of one file.
+    """
+    started = time.perf_counter()
+    paths = await executors.run_read(resolve_paths, file_patterns)
     if not paths:
         raise FileNotFoundError(f"No files matched patterns: {file_patterns}")
 
@@ -144,42 +204,304 @@ async def ingest_files(
     for p in paths:
         print(f"  - {p}")
 
-    client = get_chroma_client()
+    sizes = await executors.run_write(_file_sizes, paths)
+    progress = IngestProgress(files_total=len(paths), bytes_total=sum(sizes.values()))
 
-    if reset:
-        reset_collection(collection_name, client)
+    def _report() -> None:
+        if on_progress is not None:
+            on_progress(progress)
 
-    collection = client.get_or_create_collection(name=collection_name)
+    _report()
 
-    total_chunks = 0
+    # With reset, build into a new versioned collection that only becomes
+    # visible (alias swap) once complete; queries keep hitting the old build.
+    target = collections_service.start_build(collection_name) if reset else None
+
+    # Parsing, chunking and Chroma writes are blocking: keep them on the
+    # write pool so the API event loop stays responsive during a reindex.
+    collection = await executors.run_write(
+        chroma_client.get_collection, target or collection_name, create=True
+    )
 
-    for path in paths:
-        print(f"\nIngesting file: {path}")
-        chunks, metadatas, ids = build_chunks_for_file(
-            path=path,
-            mode=mode,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
+    # The manifest tracks what is already in this physical collection, so
+    # unchanged files are skipped and stale chunks can be deleted.
+    manifest = get_manifest()
+    physical = collection.name
+    chunk_params = {
+        "mode": mode,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+    previous = await executors.run_read(manifest.entries, physical)
+    seen_sources = {str(p.resolve()) for p in paths}
+
+    settings = get_settings()
+
+    # A fresh build is embedded at the configured width; an existing
+    # collection keeps the width it has, so it never mixes widths.
+    stored = await executors.run_read(embedding_dims.stored_dimensions, collection)
+    configured = embedding_dims.configured_dimensions(collection_name)
+    dimensions = configured if stored is None else stored.request_dimensions
+    if stored is not None and (configured or stored.width) != stored.width:
+        print(
+            f"Collection '{collection_name}' stores {stored.width}-dimensional "
+            f"vectors; keeping that width (configured: {configured}). Reindex "
+            "with --reset or run migrate-dimensions to change it."
         )
+    width_recorded = stored is not None and (
+        embedding_dims.recorded_dimensions(collection) is not None
+    )
 
-        if not chunks:
-            continue
+    workers = parse_workers or settings.parse_workers
+    batch_size = embed_batch_size or settings.embed_batch_size
+    max_batch_tokens = settings.embed_batch_max_tokens
+    embed_workers = embed_concurrency or settings.embed_concurrency
+    write_workers = settings.ingest_write_concurrency
 
-        embeddings = await embed_chunks(chunks)
-        collection.add(
-            ids=ids,
-            documents=chunks,
-            embeddings=embeddings,
-            metadatas=metadatas,  # list[dict] – OK for Chroma
-        )
+    # Parsing is CPU-bound: with several workers it runs in a process pool
+    # (processes only start once a file actually needs parsing).
+    parse_pool = (
+        ParsePool(workers, settings.pdf_pages_per_task) if workers > 1 else None
+    )
+    embed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+    pending_paths = iter(paths)
+    total_chunks = 0
+    buffer = _Batch()
 
-        print(
-            f"  -> Ingested {len(chunks)} chunks "
-            f"into collection '{collection_name}'"
+    async def _iter_parts(path: Path) -> AsyncIterator[List[PageChunks]]:
+        if parse_pool is None:
+            yield await executors.run_write(
+                chunk_pages, str(path), mode, chunk_size, chunk_overlap
+            )
+            return
+        parts = parse_pool.iter_parse(path, mode, chunk_size, chunk_overlap)
+        # Closed right away on abort, so its in-flight ranges are drained
+        async with aclosing(parts) as parts:
+            async for part in parts:
+                yield part
+
+    async def _finish_file(state: _FileState) -> None:
+        # Chunks the file no longer produces (removed or shrunk pages)
+        stale_ids = (
+            sorted(set(state.entry.chunk_ids) - set(state.ids)) if state.entry else []
         )
-        total_chunks += len(chunks)
+        if stale_ids:
+            await executors.run_write(
+                metrics.timed_write, "delete", collection.delete, ids=stale_ids
+            )
+            print(f"  -> {state.path.name}: deleted {len(stale_ids)} stale chunks")
+
+        await executors.run_write(
+            manifest.put,
+            physical,
+            ManifestEntry(
+                source=state.source,
+                content_hash=state.content_hash,
+                size=state.stat.st_size,
+                mtime_ns=state.stat.st_mtime_ns,
+                chunk_params=chunk_params,
+                chunk_ids=state.ids,
+            ),
+        )
+        if state.ids:
+            print(
+                f"  -> Ingested {len(state.ids)} chunks of {state.path.name} "
+                f"into collection '{collection.name}'"
+            )
+
+        progress.files_done += 1
+        progress.bytes_done += sizes[state.path]
+        _report()
+
+    async def _flush() -> None:
+        nonlocal buffer
+        if buffer.ids:
+            batch, buffer = buffer, _Batch()
+            await embed_queue.put(batch)
+
+    async def _buffer_chunks(
+        state: _FileState,
+        documents: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+    ) -> None:
+        for document, metadata, chunk_id in zip(documents, metadatas, ids):
+            tokens = estimate_tokens(document)
+            if buffer.ids and (
+                len(buffer.ids) >= batch_size
+                or buffer.tokens + tokens > max_batch_tokens
+            ):
+                await _flush()
+            if state not in buffer.files:
+                # The file is finished once every batch holding it is written
+                buffer.files.append(state)
+                state.pending_batches += 1
+            buffer.documents.append(document)
+            buffer.metadatas.append(metadata)
+            buffer.ids.append(chunk_id)
+            buffer.tokens += tokens
+
+    async def _parse_stage() -> None:
+        for path in pending_paths:
+            source = str(path.resolve())
+            entry = previous.get(source)
+            unchanged, content_hash, stat = await executors.run_read(
+                _check_unchanged, path, entry, chunk_params
+            )
+            if unchanged:
+                if entry.mtime_ns != stat.st_mtime_ns:
+                    # Touched but identical content: just refresh size/mtime
+                    entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+                    await executors.run_write(manifest.put, physical, entry)
+                progress.files_skipped += 1
+                progress.files_done += 1
+                progress.bytes_done += sizes[path]
+                _report()
+                continue
+
+            print(f"\nIngesting file: {path}")
+            progress.current_file = str(path)
+            _report()
+
+            state = _FileState(path, source, entry, content_hash, stat)
+            words = 0
+            async with aclosing(_iter_parts(path)) as parts:
+                async for pages in parts:
+                    words += sum(page_words for _, _, page_words in pages)
+                    documents, metadatas, ids = assemble_chunks(
+                        path, pages, first_chunk_number=len(state.ids)
+                    )
+                    state.ids.extend(ids)
+                    await _buffer_chunks(state, documents, metadatas, ids)
+
+            state.parsed = True
+            if state.ids:
+                print(f"  -> {path.name}: {words} words → {len(state.ids)} chunks")
+            else:
+                print(f"  -> No text found in {path}, skipping.")
+            if state.pending_batches == 0:
+                await _finish_file(state)
+
+    async def _embed_stage() -> None:
+        while (batch := await embed_queue.get()) is not None:
+            batch.embeddings = await embed_chunks(
+                batch.documents,
+                batch_size=batch_size,
+                max_batch_tokens=max_batch_tokens,
+                concurrency=1,
+                dimensions=dimensions,
+            )
+            await write_queue.put(batch)
+
+    async def _write_stage() -> None:
+        nonlocal total_chunks, width_recorded
+        while (batch := await write_queue.get()) is not None:
+            if not width_recorded and batch.embeddings:
+                width_recorded = True
+                await executors.run_write(
+                    embedding_dims.record_dimensions,
+                    collection,
+                    embedding_dims.CollectionDimensions(
+                        width=len(batch.embeddings[0]),
+                        reduced=dimensions is not None,
+                        model=settings.openai_embed_model,
+                    ),
+                )
+            await executors.run_write(
+                metrics.timed_write,
+                "upsert",
+                collection.upsert,
+                ids=batch.ids,
+                documents=batch.documents,
+                embeddings=batch.embeddings,
+                metadatas=batch.metadatas,  # list[dict] – OK for Chroma
+            )
+            metrics.INGEST_CHUNKS.labels(collection_name).inc(len(batch.ids))
+            total_chunks += len(batch.ids)
+            progress.chunks_embedded += len(batch.ids)
+
+            finished = []
+            for state in batch.files:
+                state.pending_batches -= 1
+                if state.parsed and state.pending_batches == 0:
+                    finished.append(state)
+            for state in finished:
+                await _finish_file(state)
+            if not finished:
+                _report()
+
+    async def _close_embed_queue(parsers: List[asyncio.Task]) -> None:
+        await asyncio.gather(*parsers)
+        # The last, partly filled batch
+        await _flush()
+        for _ in range(embed_workers):
+            await embed_queue.put(None)
+
+    async def _close_when_done(
+        producers: List[asyncio.Task], queue: asyncio.Queue, consumers: int
+    ) -> None:
+        await asyncio.gather(*producers)
+        for _ in range(consumers):
+            await queue.put(None)
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            parsers = [tg.create_task(_parse_stage()) for _ in range(max(1, workers))]
+            embedders = [tg.create_task(_embed_stage()) for _ in range(embed_workers)]
+            for _ in range(write_workers):
+                tg.create_task(_write_stage())
+            tg.create_task(_close_embed_queue(parsers))
+            tg.create_task(_close_when_done(embedders, write_queue, write_workers))
+
+        # Files ingested earlier that no longer exist on disk
+        for source, entry in previous.items():
+            if source in seen_sources or os.path.exists(source):
+                continue
+            if entry.chunk_ids:
+                await executors.run_write(
+                    metrics.timed_write,
+                    "delete",
+                    collection.delete,
+                    ids=entry.chunk_ids,
+                )
+            await executors.run_write(manifest.remove, physical, source)
+            progress.files_removed += 1
+            print(f"Removed {len(entry.chunk_ids)} chunks of deleted file {source}")
+    except BaseException:
+        if target is not None:
+            print(f"Build '{target}' aborted, discarding it.")
+            await executors.run_write(collections_service.discard_build, target)
+        raise
+    finally:
+        if parse_pool is not None:
+            await executors.run_write(parse_pool.close)
+
+    if target is not None:
+        if total_chunks == 0:
+            # Never swap an empty build in front of a working collection
+            await executors.run_write(collections_service.discard_build, target)
+        else:
+            await executors.run_write(
+                collections_service.promote_build, collection_name, target
+            )
+            print(f"Collection '{collection_name}' now serves build '{target}'.")
+
+    # Also builds a missing snapshot when nothing changed; queries never do
+    index = await executors.run_write(vector_store.prepare_snapshot, collection_name)
+    if index is not None:
+        print(f"NumPy index snapshot ready ({len(index)} vectors).")
 
-    if total_chunks == 0:
+    progress.current_file = None
+    _report()
+    metrics.observe_ingest(collection_name, total_chunks, time.perf_counter() - started)
+
+    if progress.files_skipped:
+        print(f"Skipped {progress.files_skipped} unchanged files.")
+
+    if total_chunks == 0 and progress.files_skipped:
+        print("Nothing changed. Nothing ingested.")
+    elif total_chunks == 0:
         print("No chunks generated from any file. Nothing ingested.")
     else:
         print(f"\n✅ Total ingested chunks: {total_chunks}")
@@ -195,6 +517,9 @@ async def ingest_file(
     chunk_overlap: int = 40,
     reset: bool = False,
     mode: str = "fixed",
+    embed_batch_size: Optional[int] = None,
+    embed_concurrency: Optional[int] = None,
+    parse_workers: Optional[int] = None,
 ):
     return await ingest_files(
         file_patterns=[file_path],
@@ -203,6 +528,9 @@ async def ingest_file(
         chunk_overlap=chunk_overlap,
         reset=reset,
         mode=mode,
+        embed_batch_size=embed_batch_size,
+        embed_concurrency=embed_concurrency,
+        parse_workers=parse_workers,
     )
 
 
@@ -243,7 +571,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--reset",
         action="store_true",
-        help="Delete existing collection before ingesting",
+        help="Rebuild the collection from scratch (swapped in when complete)",
     )
     parser.add_argument(
         "--mode",
@@ -251,6 +579,24 @@ def parse_args() -> argparse.Namespace:
         default="fixed",
         help="Chunking mode: 'fixed' or 'semantic' (default: fixed).",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Chunks per embedding request (default: EMBED_BATCH_SIZE).",
+    )
+    parser.add_argument(
+        "--embed-concurrency",
+        type=int,
+        default=None,
+        help="Embedding requests in flight (default: EMBED_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parser processes; 1 parses in-process (default: PARSE_WORKERS).",
+    )
     return parser.parse_args()
 
 
@@ -270,5 +616,8 @@ if __name__ == "__main__":
             chunk_overlap=args.chunk_overlap,
             reset=args.reset,
             mode=args.mode,
+            embed_batch_size=args.batch_size,
+            embed_concurrency=args.embed_concurrency,
+            parse_workers=args.workers,
         )
     )
@@ -1,11 +1,16 @@
 import asyncio
-from typing import List
+from typing import List, Optional
 
 import typer
 
 from app.scripts.ingest import ingest_files
+from app.scripts.migrate_dimensions import migrate_dimensions
+from app.services import collections_service
 
-app = typer.Typer(help="RAG ingestion CLI (ingest, reindex).")
+app = typer.Typer(
+    help="RAG ingestion CLI (ingest, reindex, migrate-dimensions, versions, "
+    "rollback, gc)."
+)
 
 
 @app.command()
@@ -15,8 +20,22 @@ def ingest(
     chunk_size: int = typer.Option(200, help="Words per chunk."),
     chunk_overlap: int = typer.Option(40, help="Overlap in words."),
     mode: str = typer.Option("fixed", "--mode", "-m", help="'fixed' or 'semantic'"),
+    batch_size: Optional[int] = typer.Option(
+        None, "--batch-size", help="Chunks per embedding request."
+    ),
+    embed_concurrency: Optional[int] = typer.Option(
+        None, "--embed-concurrency", help="Embedding requests in flight."
+    ),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-w", help="Parser processes (1 = in-process)."
+    ),
     reset: bool = typer.Option(
-        False, "--reset", help="Delete existing collection before ingesting."
+        False,
+        "--reset",
+        help=(
+            "Rebuild the collection from scratch (swapped in when complete). "
+            "Without it, only new or changed files are ingested."
+        ),
     ),
 ):
     total = asyncio.run(
@@ -27,6 +46,9 @@ def ingest(
             chunk_overlap=chunk_overlap,
             reset=reset,
             mode=mode,
+            embed_batch_size=batch_size,
+            embed_concurrency=embed_concurrency,
+            parse_workers=workers,
         )
     )
     typer.echo(f"Ingested total {total} chunks.")
@@ -39,6 +61,15 @@ def reindex(
     chunk_size: int = typer.Option(200, help="Words per chunk."),
     chunk_overlap: int = typer.Option(40, help="Overlap in words."),
     mode: str = typer.Option("fixed", "--mode", "-m", help="'fixed' or 'semantic'"),
+    batch_size: Optional[int] = typer.Option(
+        None, "--batch-size", help="Chunks per embedding request."
+    ),
+    embed_concurrency: Optional[int] = typer.Option(
+        None, "--embed-concurrency", help="Embedding requests in flight."
+    ),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-w", help="Parser processes (1 = in-process)."
+    ),
 ):
     total = asyncio.run(
         ingest_files(
@@ -46,12 +77,70 @@ def reindex(
             collection_name=collection,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            reset=True,  # always reset for reindex
+            reset=True,  # always a fresh build, swapped in when complete
             mode=mode,
+            embed_batch_size=batch_size,
+            embed_concurrency=embed_concurrency,
+            parse_workers=workers,
         )
     )
     typer.echo(f"Reindexed collection '{collection}' with {total} chunks.")
 
 
+@app.command("migrate-dimensions")
+def migrate_dimensions_command(
+    dimensions: int = typer.Option(..., "--dimensions", "-d", help="New width."),
+    collection: str = typer.Option("docs", "--collection", "-c"),
+    truncate: bool = typer.Option(
+        False,
+        "--truncate",
+        help="Shorten the stored vectors instead of re-embedding (no API calls).",
+    ),
+    batch_size: Optional[int] = typer.Option(
+        None, "--batch-size", help="Chunks per embedding request."
+    ),
+    embed_concurrency: Optional[int] = typer.Option(
+        None, "--embed-concurrency", help="Embedding requests in flight."
+    ),
+):
+    physical = asyncio.run(
+        migrate_dimensions(
+            collection_name=collection,
+            dimensions=dimensions,
+            reembed=not truncate,
+            embed_batch_size=batch_size,
+            embed_concurrency=embed_concurrency,
+        )
+    )
+    typer.echo(f"Collection '{collection}' now serves build '{physical}'.")
+
+
+@app.command("versions")
+def versions(collection: str = typer.Option("docs", "--collection", "-c")):
+    for version in collections_service.list_versions(collection):
+        marker = "*" if version["current"] else " "
+        typer.echo(f"{marker} {version['name']}")
+
+
+@app.command("rollback")
+def rollback(collection: str = typer.Option("docs", "--collection", "-c")):
+    try:
+        physical = collections_service.rollback(collection)
+    except LookupError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Collection '{collection}' now serves build '{physical}'.")
+
+
+@app.command("gc")
+def gc(
+    grace_seconds: Optional[int] = typer.Option(
+        None, "--grace-seconds", help="Override COLLECTION_GC_GRACE_SECONDS."
+    ),
+):
+    deleted = collections_service.collect_garbage(grace_seconds=grace_seconds)
+    typer.echo(f"Deleted {len(deleted)} old builds.")
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.core import chroma_client, embedding_dims, executors, metrics, vector_store
+from app.core.config import get_settings
+from app.core.manifest import get_manifest
+from app.services import collections_service
+from app.services.embedding_service import embed_chunks
+
+# Chunks read from the source collection per round trip
+PAGE_SIZE = 1000
+
+
+@dataclass
+class MigrationProgress:
+    chunks_total: int = 0
+    chunks_done: int = 0
+
+
+MigrationCallback = Callable[[MigrationProgress], None]
+
+
+async def migrate_dimensions(
+    collection_name: str,
+    dimensions: int,
+    reembed: bool = True,
+    embed_batch_size: Optional[int] = None,
+    embed_concurrency: Optional[int] = None,
+    on_progress: Optional[MigrationCallback] = None,
+) -> str:
+    """
+    Rebuild `collection_name` at `dimensions` wide vectors as a new build and
+    swap the alias once it is complete. Queries keep using the old build
+    until then, so they never see mixed widths.
+
+    With `reembed` every chunk is embedded again with the `dimensions`
+    parameter; otherwise the stored vectors are truncated and re-normalized,
+    which gives the same vectors for text-embedding-3 models without any
+    API calls. Returns the name of the new physical collection.
+    """
+    settings = get_settings()
+    source = await executors.run_read(chroma_client.get_collection, collection_name)
+    stored = await executors.run_read(embedding_dims.stored_dimensions, source)
+    if stored is None:
+        raise ValueError(f"Collection '{collection_name}' is empty.")
+    if stored.width == dimensions:
+        raise ValueError(
+            f"Collection '{collection_name}' already has {dimensions} dimensions."
+        )
+    if not reembed and dimensions > stored.width:
+        raise embedding_dims.DimensionMismatchError(
+            f"Cannot truncate {stored.width}-dimensional vectors to {dimensions}; "
+            "re-embed instead."
+        )
+
+    progress = MigrationProgress(chunks_total=await executors.run_read(source.count))
+
+    def _report() -> None:
+        if on_progress is not None:
+            on_progress(progress)
+
+    _report()
+
+    target = collections_service.start_build(collection_name)
+    print(
+        f"Migrating '{collection_name}' ({source.name}, {stored.width} dims) "
+        f"to {dimensions} dims in build '{target}'"
+    )
+    try:
+        collection = await executors.run_write(
+            chroma_client.get_collection, target, create=True
+        )
+        await executors.run_write(
+            embedding_dims.record_dimensions,
+            collection,
+            embedding_dims.CollectionDimensions(
+                width=dimensions, reduced=True, model=settings.openai_embed_model
+            ),
+        )
+
+        offset = 0
+        while True:
+            page = await executors.run_read(
+                source.get,
+                include=["documents", "metadatas"]
+                + ([] if reembed else ["embeddings"]),
+                limit=PAGE_SIZE,
+                offset=offset,
+            )
+            ids = page["ids"]
+            if not ids:
+                break
+            offset += len(ids)
+
+            documents = [doc or "" for doc in page["documents"]]
+            if reembed:
+                embeddings = await embed_chunks(
+                    documents,
+                    batch_size=embed_batch_size,
+                    concurrency=embed_concurrency,
+                    dimensions=dimensions,
+                )
+            else:
+                embeddings = [
+                    embedding_dims.shorten(vector, dimensions)
+                    for vector in page["embeddings"]
+                ]
+
+            await executors.run_write(
+                metrics.timed_write,
+                "upsert",
+                collection.upsert,
+                ids=ids,
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=page["metadatas"],
+            )
+            progress.chunks_done += len(ids)
+            _report()
+
+        # Same files and chunk ids: later incremental ingests keep working
+        manifest = get_manifest()
+        for entry in (await executors.run_read(manifest.entries, source.name)).values():
+            await executors.run_write(manifest.put, target, entry)
+    except BaseException:
+        print(f"Build '{target}' aborted, discarding it.")
+        await executors.run_write(collections_service.discard_build, target)
+        raise
+
+    await executors.run_write(
+        collections_service.promote_build, collection_name, target
+    )
+    await executors.run_write(vector_store.prepare_snapshot, collection_name)
+    print(
+        f"Collection '{collection_name}' now serves build '{target}' "
+        f"({progress.chunks_done} chunks, {dimensions} dims)."
+    )
+    return target
@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+from loguru import logger
+
+from app.core import chroma_client, vector_store
+from app.core.collection_aliases import get_alias_store, new_version_name
+from app.core.config import get_settings
+from app.core.manifest import get_manifest
+from app.models.admin import CollectionVersions
+
+
+def start_build(alias: str) -> str:
+    """Name of a new, not yet visible, physical collection for `alias`."""
+    return new_version_name(alias)
+
+
+def promote_build(alias: str, physical: str) -> Optional[str]:
+    """
+    Atomically switch `alias` to a completed build, then garbage-collect
+    builds whose grace period is over. Returns the previous physical name.
+    """
+    store = get_alias_store()
+    legacy = None
+    if not store.is_alias(alias) and chroma_client.collection_exists(alias):
+        # Collection built before aliases existed: keep it as a rollback target
+        legacy = alias
+
+    previous = store.promote(alias, physical, legacy=legacy)
+    logger.info("collection_promoted", alias=alias, current=physical, previous=previous)
+
+    collect_garbage(alias)
+    return previous
+
+
+def discard_build(physical: str) -> None:
+    """Drop a failed or cancelled build so it never becomes visible."""
+    try:
+        chroma_client.delete_collection(physical)
+    except Exception:
+        logger.warning("collection_discard_failed", collection=physical)
+    get_alias_store().forget(physical)
+    get_manifest().drop_collection(physical)
+    vector_store.drop_snapshot(physical)
+
+
+def rollback(alias: str) -> str:
+    physical = get_alias_store().rollback(alias)
+    logger.info("collection_rolled_back", alias=alias, current=physical)
+    return physical
+
+
+def list_versions(alias: str) -> List[dict]:
+    return get_alias_store().versions(alias)
+
+
+def describe(alias: str) -> CollectionVersions:
+    return CollectionVersions(
+        collection=alias,
+        current=get_alias_store().resolve(alias),
+        versions=list_versions(alias),
+    )
+
+
+def collect_garbage(
+    alias: Optional[str] = None, grace_seconds: Optional[float] = None
+) -> List[str]:
+    """Delete retired builds older than the grace period."""
+    if grace_seconds is None:
+        grace_seconds = get_settings().collection_gc_grace_seconds
+
+    store = get_alias_store()
+    deleted = []
+    for physical in store.expired_versions(grace_seconds, alias=alias):
+        try:
+            chroma_client.delete_collection(physical)
+        except Exception:
+            # Already gone (e.g. deleted by another process); just forget it
+            logger.warning("collection_gc_missing", collection=physical)
+        store.forget(physical)
+        get_manifest().drop_collection(physical)
+        vector_store.drop_snapshot(physical)
+        deleted.append(physical)
+
+    if deleted:
+        logger.info("collection_gc", deleted=deleted)
+    return deleted
@@ -6,8 +6,7 @@ from app.models.admin import DocumentInfo
 
 
 def list_documents(collection_name: str = "docs") -> List[DocumentInfo]:
-    client = chroma_client.get_chroma_client()
-    collection = client.get_or_create_collection(name=collection_name)
+    collection = chroma_client.get_collection(collection_name)
 
     # If this ever gets huge, we can paginate.
     results = collection.get(include=["metadatas"], limit=10000)
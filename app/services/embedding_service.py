@@ -0,0 +1,119 @@
+import asyncio
+import random
+from typing import List, Optional
+
+import openai
+from fastapi import Request
+from loguru import logger
+
+from app.core import executors
+from app.core.batching import batch_ranges
+from app.core.config import get_settings
+from app.core.embedding_cache import get_embedding_cache
+from app.services import openai_service
+
+# Transient upstream failures worth retrying for a single batch
+RETRYABLE_EMBED_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+RETRY_BASE_DELAY_S = 1.0
+
+
+async def _embed_batch_with_retry(
+    texts: List[str],
+    max_retries: int,
+    dimensions: Optional[int] = None,
+    http_request: Optional[Request] = None,
+) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            return await openai_service.embed_texts(
+                http_request, texts, dimensions=dimensions
+            )
+        except RETRYABLE_EMBED_ERRORS as exc:
+            if attempt >= max_retries:
+                raise
+            delay = RETRY_BASE_DELAY_S * (2**attempt) + random.uniform(0, 0.5)
+            attempt += 1
+            logger.warning(
+                "embed_batch_retry",
+                texts=len(texts),
+                error=exc.__class__.__name__,
+                attempt=attempt,
+                max_retries=max_retries,
+                delay_s=round(delay, 1),
+            )
+            await asyncio.sleep(delay)
+
+
+async def embed_chunks(
+    chunks: List[str],
+    batch_size: Optional[int] = None,
+    max_batch_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    dimensions: Optional[int] = None,
+    http_request: Optional[Request] = None,
+) -> List[List[float]]:
+    """
+    Embed chunks with multi-input embedding calls, at the model's full width
+    or at `dimensions`. Used by ingestion, migrations and `/embed/batch`,
+    whose `http_request` gets the upstream calls in its log line and trace.
+
+    - Chunks are grouped by count (batch_size) and estimated tokens
+      (max_batch_tokens).
+    - At most `concurrency` batches are in flight at once.
+    - Each batch is retried on its own; the output order matches `chunks`.
+    - Chunks already in the embedding cache are not sent upstream.
+    """
+    settings = get_settings()
+    batch_size = batch_size or settings.embed_batch_size
+    max_batch_tokens = max_batch_tokens or settings.embed_batch_max_tokens
+    concurrency = concurrency or settings.embed_concurrency
+    if max_retries is None:
+        max_retries = settings.embed_max_retries
+
+    if not chunks:
+        return []
+
+    model = settings.openai_embed_model
+    cache = get_embedding_cache()
+    if cache is not None:
+        embeddings = await executors.run_read(
+            cache.get_many, chunks, model=model, dimensions=dimensions
+        )
+    else:
+        embeddings = [None] * len(chunks)
+
+    missing = [i for i, vec in enumerate(embeddings) if vec is None]
+    if cache is not None and len(missing) < len(chunks):
+        logger.debug(
+            "embed_chunks_cache_hits",
+            hits=len(chunks) - len(missing),
+            total=len(chunks),
+        )
+
+    missing_texts = [chunks[i] for i in missing]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run(start: int, end: int) -> None:
+        texts = missing_texts[start:end]
+        async with semaphore:
+            vectors = await _embed_batch_with_retry(
+                texts, max_retries, dimensions, http_request
+            )
+        if cache is not None:
+            await executors.run_write(
+                cache.put_many, texts, vectors, model=model, dimensions=dimensions
+            )
+        for idx, vec in zip(missing[start:end], vectors):
+            embeddings[idx] = vec
+
+    async with asyncio.TaskGroup() as tg:
+        for start, end in batch_ranges(missing_texts, batch_size, max_batch_tokens):
+            tg.create_task(_run(start, end))
+
+    return embeddings
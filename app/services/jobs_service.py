@@ -0,0 +1,431 @@
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core import executors
+from app.core.config import get_settings
+from app.models.admin import JobInfo, MigrateDimensionsRequest, ReindexRequest
+from app.scripts import ingest, migrate_dimensions
+
+JOBS_FILENAME = "jobs.json"
+# Progress is persisted at most this often; status changes always are
+PERSIST_INTERVAL_S = 2.0
+
+
+class JobNotFoundError(Exception):
+    pass
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobAlreadyFinishedError(Exception):
+    pass
+
+
+class JobsRunElsewhereError(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobManager:
+    """
+    Runs reindex and dimension-migration jobs as background asyncio tasks.
+
+    - At most `max_concurrent` jobs run at once; the rest wait as "queued".
+    - Job state is written to a JSON file (on the write executor) so
+      history survives restarts. Jobs that were still queued/running when
+      the process died come back as "interrupted".
+    - Only one process per store runs jobs: the first one to take the
+      store's file lock (and that has `run_jobs`). Other workers serve the
+      history read-only and refuse submissions and cancellations with
+      `JobsRunElsewhereError`; one of them takes over if the owner exits.
+    - The store is only read and written on the executors, never on the
+      event loop: `start()` takes ownership or loads the history.
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        max_concurrent: int = 1,
+        max_queued: int = 10,
+        history_limit: int = 100,
+        run_jobs: bool = True,
+    ):
+        self.store_path = store_path
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.history_limit = history_limit
+        self.run_jobs = run_jobs
+
+        self._jobs: Dict[str, JobInfo] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started_monotonic: Dict[str, float] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._last_persist = 0.0
+        self._shutting_down = False
+        self._lock_fd: Optional[int] = None
+        self._mtime_ns: Optional[int] = None
+        self._dirty = False
+        self._writer: Optional[asyncio.Task] = None
+        self._ownership_lock: Optional[asyncio.Lock] = None
+
+    async def start(self) -> None:
+        """Run jobs if no other process does; otherwise serve the history."""
+        if not await self._take_ownership():
+            await self._reload_if_changed()
+
+    # -------------------------
+    # Ownership
+    # -------------------------
+    @property
+    def is_owner(self) -> bool:
+        return self._lock_fd is not None
+
+    def _try_lock(self) -> Optional[int]:
+        os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+        fd = os.open(self.store_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    async def _take_ownership(self) -> bool:
+        """
+        Become the process that runs jobs, if no live process is. The lock is
+        held until this process exits, so a crash releases it.
+        """
+        if self.is_owner:
+            return True
+        if not self.run_jobs:
+            return False
+        if self._ownership_lock is None:
+            self._ownership_lock = asyncio.Lock()
+        # Two requests racing here would otherwise lock the file twice
+        async with self._ownership_lock:
+            if self.is_owner:
+                return True
+            fd = await executors.run_write(self._try_lock)
+            if fd is None:
+                return False
+            self._lock_fd = fd
+            await self._load()
+        logger.info("job_runner_acquired", path=self.store_path, pid=os.getpid())
+        return True
+
+    async def _require_owner(self) -> None:
+        if not await self._take_ownership():
+            raise JobsRunElsewhereError(
+                "Background jobs run in another worker process; send job "
+                "requests to the instance with JOBS_ENABLED=true and a single "
+                "worker."
+            )
+
+    def release(self) -> None:
+        """Give up the job runner lock (after `shutdown`)."""
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def _read_store(self) -> Optional[List[JobInfo]]:
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                return [JobInfo.model_validate(raw) for raw in json.load(f)]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.exception("job_history_unreadable", path=self.store_path)
+            return None
+
+    async def _load(self) -> None:
+        """Owner only: take over the history, interrupting orphaned jobs."""
+        jobs = await executors.run_read(self._read_store)
+        if jobs is None:
+            return
+
+        for job in jobs:
+            if not job.is_finished:
+                job.status = "interrupted"
+                job.error = "Server stopped before the job finished."
+                job.finished_at = job.finished_at or _now()
+            self._jobs[job.id] = job
+
+        await executors.run_write(self._write, self._snapshot())
+
+    def _read_if_changed(self) -> Optional[Tuple[int, List[JobInfo]]]:
+        try:
+            mtime_ns = os.stat(self.store_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime_ns == self._mtime_ns:
+            return None
+        jobs = self._read_store()
+        return None if jobs is None else (mtime_ns, jobs)
+
+    async def _reload_if_changed(self) -> None:
+        """Followers: pick up the owner's latest writes."""
+        changed = await executors.run_read(self._read_if_changed)
+        # Ownership may have been taken while the file was read
+        if changed is not None and not self.is_owner:
+            self._mtime_ns, jobs = changed
+            self._jobs = {job.id: job for job in jobs}
+
+    def _snapshot(self) -> list:
+        return [job.model_dump(mode="json") for job in self._jobs.values()]
+
+    def _write(self, payload: list) -> None:
+        os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+        tmp_path = self.store_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, self.store_path)
+
+    def _persist(self) -> None:
+        """
+        Schedule a write of the history on the write executor. Writes are
+        serialized and coalesced: a burst of updates costs one write.
+        """
+        self._dirty = True
+        self._last_persist = time.monotonic()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            try:
+                await executors.run_write(self._write, self._snapshot())
+            except Exception:
+                logger.exception("job_history_write_failed", path=self.store_path)
+
+    async def flush(self) -> None:
+        """Wait until the history on disk is up to date."""
+        while self._writer is not None and not self._writer.done():
+            await self._writer
+
+    def _trim_history(self) -> None:
+        finished = [j for j in self._jobs.values() if j.is_finished]
+        excess = len(self._jobs) - self.history_limit
+        for job in finished[: max(0, excess)]:
+            del self._jobs[job.id]
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    async def list_jobs(self) -> List[JobInfo]:
+        if not self.is_owner:
+            await self._reload_if_changed()
+        return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    async def get_job(self, job_id: str) -> JobInfo:
+        if not self.is_owner:
+            await self._reload_if_changed()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    async def _submit(
+        self,
+        kind: str,
+        collection: str,
+        request,
+        work: Callable[[JobInfo], Awaitable[None]],
+    ) -> JobInfo:
+        await self._require_owner()
+        pending = sum(1 for j in self._jobs.values() if not j.is_finished)
+        if pending >= self.max_concurrent + self.max_queued:
+            raise JobQueueFullError(
+                f"{pending} jobs already queued or running; try again later."
+            )
+
+        job = JobInfo(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            collection=collection,
+            request=request,
+            created_at=_now(),
+        )
+        self._jobs[job.id] = job
+        self._trim_history()
+        self._persist()
+
+        task = asyncio.create_task(self._run(job, work), name=f"{kind}-job-{job.id}")
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+
+        logger.info("job_submitted", job_id=job.id, kind=kind, collection=collection)
+        return job
+
+    async def submit_reindex(self, request: ReindexRequest) -> JobInfo:
+        async def _work(job: JobInfo) -> None:
+            await ingest.ingest_files(
+                file_patterns=request.paths,
+                collection_name=request.collection,
+                chunk_size=request.chunk_size,
+                chunk_overlap=request.chunk_overlap,
+                reset=request.reset,
+                mode=request.mode,
+                embed_batch_size=request.embed_batch_size,
+                embed_concurrency=request.embed_concurrency,
+                parse_workers=request.parse_workers,
+                on_progress=lambda p: self._on_progress(job, p),
+            )
+
+        return await self._submit("reindex", request.collection, request, _work)
+
+    async def submit_migration(
+        self, collection: str, request: MigrateDimensionsRequest
+    ) -> JobInfo:
+        async def _work(job: JobInfo) -> None:
+            await migrate_dimensions.migrate_dimensions(
+                collection_name=collection,
+                dimensions=request.dimensions,
+                reembed=request.reembed,
+                embed_batch_size=request.embed_batch_size,
+                embed_concurrency=request.embed_concurrency,
+                on_progress=lambda p: self._on_migration_progress(job, p),
+            )
+
+        return await self._submit("migrate_dimensions", collection, request, _work)
+
+    async def cancel(self, job_id: str) -> JobInfo:
+        await self._require_owner()
+        job = await self.get_job(job_id)
+        if job.is_finished:
+            raise JobAlreadyFinishedError(job_id)
+
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        logger.info("job_cancel_requested", job_id=job_id)
+        return job
+
+    async def shutdown(self) -> None:
+        self._shutting_down = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def _run(
+        self, job: JobInfo, work: Callable[[JobInfo], Awaitable[None]]
+    ) -> None:
+        try:
+            async with self._get_semaphore():
+                job.status = "running"
+                job.started_at = _now()
+                self._started_monotonic[job.id] = time.monotonic()
+                self._persist()
+
+                await work(job)
+                job.status = "succeeded"
+                job.eta_seconds = 0.0
+        except asyncio.CancelledError:
+            job.status = "interrupted" if self._shutting_down else "cancelled"
+        except Exception as exc:
+            job.status = "failed"
+            job.error = f"{exc.__class__.__name__}: {exc}"
+            logger.exception("job_failed", job_id=job.id)
+        finally:
+            job.finished_at = _now()
+            job.current_file = None
+            self._started_monotonic.pop(job.id, None)
+            self._persist()
+            logger.info(
+                "job_finished",
+                job_id=job.id,
+                status=job.status,
+                chunks_embedded=job.chunks_embedded,
+            )
+
+    def _on_progress(self, job: JobInfo, progress: "ingest.IngestProgress") -> None:
+        job.files_total = progress.files_total
+        job.files_done = progress.files_done
+        job.bytes_total = progress.bytes_total
+        job.bytes_done = progress.bytes_done
+        job.chunks_embedded = progress.chunks_embedded
+        job.files_skipped = progress.files_skipped
+        job.files_removed = progress.files_removed
+        job.current_file = progress.current_file
+
+        started = self._started_monotonic.get(job.id)
+        elapsed = time.monotonic() - started if started is not None else 0.0
+        if elapsed > 0:
+            job.chunks_per_second = round(progress.chunks_embedded / elapsed, 2)
+        if progress.bytes_done > 0 and elapsed > 0:
+            remaining = progress.bytes_total - progress.bytes_done
+            job.eta_seconds = round(elapsed * remaining / progress.bytes_done, 1)
+
+        if time.monotonic() - self._last_persist >= PERSIST_INTERVAL_S:
+            self._persist()
+
+    def _on_migration_progress(
+        self, job: JobInfo, progress: "migrate_dimensions.MigrationProgress"
+    ) -> None:
+        job.chunks_total = progress.chunks_total
+        job.chunks_embedded = progress.chunks_done
+
+        started = self._started_monotonic.get(job.id)
+        elapsed = time.monotonic() - started if started is not None else 0.0
+        if elapsed > 0:
+            job.chunks_per_second = round(progress.chunks_done / elapsed, 2)
+        if progress.chunks_done > 0 and elapsed > 0:
+            remaining = progress.chunks_total - progress.chunks_done
+            job.eta_seconds = round(elapsed * remaining / progress.chunks_done, 1)
+
+        if time.monotonic() - self._last_persist >= PERSIST_INTERVAL_S:
+            self._persist()
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        settings = get_settings()
+        _manager = JobManager(
+            store_path=os.path.join(settings.chroma_persist_dir, JOBS_FILENAME),
+            max_concurrent=settings.max_concurrent_jobs,
+            max_queued=settings.max_queued_jobs,
+            history_limit=settings.job_history_limit,
+            run_jobs=settings.jobs_enabled,
+        )
+    return _manager
+
+
+async def start_job_manager() -> None:
+    await get_job_manager().start()
+
+
+async def shutdown_job_manager() -> None:
+    if _manager is not None:
+        await _manager.shutdown()
+        _manager.release()
@@ -1,15 +1,25 @@
+import asyncio
 import time
-from typing import Optional
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import Request
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError
 
+from app.core import executors, metrics, prompts, tracing
 from app.core.config import get_settings
-from app.core.llm_telemetry import LLMCallLog
+from app.core.embedding_cache import get_embedding_cache
+from app.core.llm_telemetry import LLMCallLog, StreamTimer, prompt_cache_stats
+from app.core.micro_batcher import BatchInfo, MicroBatcher
+from app.core.single_flight import SingleFlight
 
 settings = get_settings()
 client = AsyncOpenAI(api_key=settings.api_key)
 
+# Identical calls in flight at the same time share one upstream call
+single_flight = SingleFlight(enabled=settings.single_flight_enabled)
+
 
 def _append_llm_call(
     request: Optional[Request],
@@ -21,7 +31,19 @@ def _append_llm_call(
     prompt_tokens: Optional[int] = None,
     completion_tokens: Optional[int] = None,
     total_tokens: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    queue_wait_ms: Optional[int] = None,
+    deduplicated: bool = False,
+    cached_tokens: Optional[int] = None,
+    prompt_template: Optional[str] = None,
+    **stream: Any,
 ) -> None:
+    """`stream`: the streaming fields of LLMCallLog (first_token_ms, ...)."""
+    # Chat calls only: they are the ones rendered from a prompt template
+    if prompt_template is not None and not deduplicated:
+        prompt_cache_stats.record(
+            operation, prompt_template, prompt_tokens, cached_tokens
+        )
     if request is None:
         return
     if not hasattr(request.state, "llm_calls"):
@@ -36,25 +58,110 @@ def _append_llm_call(
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=total_tokens,
+            batch_size=batch_size,
+            queue_wait_ms=queue_wait_ms,
+            deduplicated=deduplicated or None,
+            cached_tokens=cached_tokens,
+            prompt_template=prompt_template,
+            **stream,
         )
     )
 
 
-async def ask_llm(request: Request, user_prompt: str) -> str:
-    requested_model = settings.chatgpt_model
+def _usage_int(obj: Any, name: str) -> Optional[int]:
+    value = getattr(obj, name, None) if obj is not None else None
+    return value if isinstance(value, int) else None
+
+
+def _chat_usage(usage: Any) -> Dict[str, Optional[int]]:
+    """Token counts of a chat completion, including prefix-cache hits."""
+    return dict(
+        prompt_tokens=_usage_int(usage, "prompt_tokens"),
+        completion_tokens=_usage_int(usage, "completion_tokens"),
+        total_tokens=_usage_int(usage, "total_tokens"),
+        cached_tokens=_usage_int(
+            getattr(usage, "prompt_tokens_details", None), "cached_tokens"
+        ),
+    )
+
+
+def _chat_prompt(
+    user_prompt: str, system_prompt: Optional[str], prompt_template: Optional[str]
+) -> prompts.RenderedPrompt:
+    if system_prompt is None:
+        return prompts.get_prompt("chat").render(prompt=user_prompt)
+    return prompts.RenderedPrompt(
+        system=system_prompt, user=user_prompt, template_id=prompt_template or ""
+    )
+
+
+def _observe_upstream(
+    operation: str,
+    requested_model: str,
+    started: float,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    cached_tokens: Optional[int] = None,
+    **_: Any,
+) -> None:
+    """Metrics for one upstream call, however many requests shared it."""
+    metrics.observe_llm(
+        operation,
+        requested_model,
+        time.perf_counter() - started,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+    )
+
 
+def _prompt_cache_kwargs(prompt: prompts.RenderedPrompt) -> Dict[str, str]:
+    # Routes calls sharing a prefix to the same cache
+    return {"prompt_cache_key": prompt.template_id} if prompt.template_id else {}
+
+
+async def _create_chat_completion(
+    requested_model: str,
+    prompt: prompts.RenderedPrompt,
+):
     t0 = time.perf_counter()
     openai_response = await client.chat.completions.create(
         model=requested_model,
-        messages=[
-            {"role": "system", "content": "You are a concise assistant"},
-            {"role": "user", "content": user_prompt},
-        ],
+        messages=prompt.messages(),
+        **_prompt_cache_kwargs(prompt),
     )
-    latency_ms = int((time.perf_counter() - t0) * 1000)
+    _observe_upstream(
+        "chat.completions",
+        requested_model,
+        t0,
+        **_chat_usage(getattr(openai_response, "usage", None)),
+    )
+    return openai_response, int((time.perf_counter() - t0) * 1000)
 
-    usage = getattr(openai_response, "usage", None)
-    actual_model = getattr(openai_response, "model", None)
+
+async def ask_llm(
+    request: Request,
+    user_prompt: str,
+    *,
+    system_prompt: Optional[str] = None,
+    prompt_template: Optional[str] = None,
+) -> str:
+    """
+    Chat completion for `user_prompt`. `system_prompt` replaces the default
+    "chat" template's system message; callers rendering a registered
+    template pass its id as `prompt_template` for telemetry.
+    """
+    requested_model = settings.chatgpt_model
+    prompt = _chat_prompt(user_prompt, system_prompt, prompt_template)
+
+    with tracing.span(request, "chat_completion", model=requested_model) as entry:
+        (openai_response, latency_ms), shared = await single_flight.do(
+            ("chat.completions", requested_model, prompt.system, prompt.user),
+            lambda: _create_chat_completion(requested_model, prompt),
+        )
+        usage = getattr(openai_response, "usage", None)
+        actual_model = getattr(openai_response, "model", None)
+        tracing.annotate(entry, deduplicated=shared, **_chat_usage(usage))
 
     _append_llm_call(
         request,
@@ -62,59 +169,238 @@ async def ask_llm(request: Request, user_prompt: str) -> str:
         requested_model=requested_model,
         actual_model=actual_model,
         latency_ms=latency_ms,
-        prompt_tokens=getattr(usage, "prompt_tokens", None) if usage else None,
-        completion_tokens=getattr(usage, "completion_tokens", None) if usage else None,
-        total_tokens=getattr(usage, "total_tokens", None) if usage else None,
+        deduplicated=shared,
+        prompt_template=prompt.template_id or None,
+        **_chat_usage(usage),
     )
 
     return openai_response.choices[0].message.content or ""
 
 
-async def embed_text(request: Optional[Request], text: str) -> list[float]:
+@dataclass
+class _Embedding:
+    vector: List[float]
+    actual_model: Optional[str]
+    latency_ms: int
+    prompt_tokens: Optional[int]
+
+
+def _split_tokens(total: Optional[int], texts: List[str]) -> List[Optional[int]]:
+    """
+    Share a batch's token usage between its inputs, proportionally to text
+    length (largest remainder, so the shares add up to the total).
+    """
+    if total is None:
+        return [None] * len(texts)
+    weights = [max(len(t), 1) for t in texts]
+    raw = [total * w / sum(weights) for w in weights]
+    shares = [int(r) for r in raw]
+    by_remainder = sorted(range(len(raw)), key=lambda i: raw[i] - shares[i])
+    for i in by_remainder[len(by_remainder) - (total - sum(shares)) :]:
+        shares[i] += 1
+    return shares
+
+
+def _dimensions_kwargs(dimensions: Optional[int]) -> Dict[str, int]:
+    return {"dimensions": dimensions} if dimensions is not None else {}
+
+
+async def _embed_batch(
+    texts: List[str], dimensions: Optional[int] = None
+) -> List[_Embedding]:
     requested_model = settings.openai_embed_model
 
     t0 = time.perf_counter()
-    response = await client.embeddings.create(model=requested_model, input=text)
+    response = await client.embeddings.create(
+        model=requested_model, input=texts, **_dimensions_kwargs(dimensions)
+    )
     latency_ms = int((time.perf_counter() - t0) * 1000)
 
     usage = getattr(response, "usage", None)
     actual_model = getattr(response, "model", None)
+    _observe_upstream(
+        "embeddings", requested_model, t0, _usage_int(usage, "prompt_tokens")
+    )
+    shares = _split_tokens(
+        getattr(usage, "prompt_tokens", None) if usage else None, texts
+    )
+    data = sorted(response.data, key=lambda item: item.index)
+    return [
+        _Embedding(item.embedding, actual_model, latency_ms, share)
+        for item, share in zip(data, shares)
+    ]
+
+
+# One batcher per requested width: a batch is a single upstream call
+_embed_batchers: Dict[Optional[int], MicroBatcher] = {}
+_embed_batchers_loop: Optional[asyncio.AbstractEventLoop] = None
+
 
+def get_embed_batcher(dimensions: Optional[int] = None) -> Optional[MicroBatcher]:
+    """
+    Batcher for single-text embeddings of the given width on the running
+    event loop, or None when EMBED_MICROBATCH_ENABLED is false.
+    """
+    global _embed_batchers_loop
+    if not settings.embed_microbatch_enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    if _embed_batchers_loop is not loop:
+        _embed_batchers.clear()
+        _embed_batchers_loop = loop
+    batcher = _embed_batchers.get(dimensions)
+    if batcher is None:
+        batcher = MicroBatcher(
+            lambda texts: _embed_batch(texts, dimensions),
+            max_batch_size=settings.embed_microbatch_max_size,
+            max_wait_ms=settings.embed_microbatch_max_wait_ms,
+            name="embeddings",
+            # One rejected input (e.g. too long) must not fail the others
+            isolate_errors=(BadRequestError,),
+        )
+        _embed_batchers[dimensions] = batcher
+    return batcher
+
+
+async def _embed_one(
+    text: str, dimensions: Optional[int] = None
+) -> Tuple[_Embedding, Optional[BatchInfo]]:
+    batcher = get_embed_batcher(dimensions)
+    if batcher is not None:
+        # Coalesced with other callers' texts into one multi-input request
+        return await batcher.submit(text)
+
+    t0 = time.perf_counter()
+    response = await client.embeddings.create(
+        model=settings.openai_embed_model,
+        input=text,
+        **_dimensions_kwargs(dimensions),
+    )
+    latency_ms = int((time.perf_counter() - t0) * 1000)
+
+    usage = getattr(response, "usage", None)
+    _observe_upstream(
+        "embeddings",
+        settings.openai_embed_model,
+        t0,
+        _usage_int(usage, "prompt_tokens"),
+    )
+    embedding = _Embedding(
+        vector=response.data[0].embedding,
+        actual_model=getattr(response, "model", None),
+        latency_ms=latency_ms,
+        prompt_tokens=getattr(usage, "prompt_tokens", None) if usage else None,
+    )
+    return embedding, None
+
+
+async def embed_text(
+    request: Optional[Request], text: str, dimensions: Optional[int] = None
+) -> list[float]:
+    requested_model = settings.openai_embed_model
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = await executors.run_read(
+            cache.get, text, model=requested_model, dimensions=dimensions
+        )
+        if cached is not None:
+            return cached
+
+    with tracing.span(request, "embedding", model=requested_model) as entry:
+        (result, info), shared = await single_flight.do(
+            ("embeddings", requested_model, dimensions, text),
+            lambda: _embed_one(text, dimensions),
+        )
+        tracing.annotate(
+            entry,
+            deduplicated=shared,
+            batch_size=info.batch_size if info else None,
+            queue_wait_ms=info.queue_wait_ms if info else None,
+        )
+    # Every caller logs its own call, even when the work was shared
     _append_llm_call(
         request,
         operation="embeddings",
         requested_model=requested_model,
+        actual_model=result.actual_model,
+        latency_ms=result.latency_ms,
+        prompt_tokens=result.prompt_tokens,
+        total_tokens=result.prompt_tokens,
+        batch_size=info.batch_size if info else None,
+        queue_wait_ms=info.queue_wait_ms if info else None,
+        deduplicated=shared,
+    )
+
+    if cache is not None and not shared:
+        await executors.run_write(
+            cache.put,
+            text,
+            result.vector,
+            model=requested_model,
+            dimensions=dimensions,
+        )
+
+    return result.vector
+
+
+async def embed_texts(
+    request: Optional[Request], texts: list[str], dimensions: Optional[int] = None
+) -> list[list[float]]:
+    """
+    Embed several texts with a single multi-input embeddings call.
+    Vectors are returned in the same order as `texts`. `dimensions` asks the
+    model for shortened vectors (text-embedding-3 models only).
+    """
+    requested_model = settings.openai_embed_model
+
+    t0 = time.perf_counter()
+    with tracing.span(
+        request, "embedding_batch", model=requested_model, texts=len(texts)
+    ):
+        response = await client.embeddings.create(
+            model=requested_model, input=texts, **_dimensions_kwargs(dimensions)
+        )
+    latency_ms = int((time.perf_counter() - t0) * 1000)
+
+    usage = getattr(response, "usage", None)
+    actual_model = getattr(response, "model", None)
+    _observe_upstream(
+        "embeddings.batch", requested_model, t0, _usage_int(usage, "prompt_tokens")
+    )
+
+    _append_llm_call(
+        request,
+        operation="embeddings.batch",
+        requested_model=requested_model,
         actual_model=actual_model,
         latency_ms=latency_ms,
         prompt_tokens=getattr(usage, "prompt_tokens", None) if usage else None,
         total_tokens=getattr(usage, "total_tokens", None) if usage else None,
     )
 
-    return response.data[0].embedding
+    data = sorted(response.data, key=lambda item: item.index)
+    return [item.embedding for item in data]
 
 
-async def stream_chat_llm(request: Request, prompt: str):
-    requested_model = settings.chatgpt_model
-
+async def _stream_chat_upstream(
+    requested_model: str, prompt: prompts.RenderedPrompt, meta: Dict[str, Any]
+):
     t0 = time.perf_counter()
-    last_usage = None
-    last_model = None
     response = await client.chat.completions.create(
         model=requested_model,
-        messages=[
-            {"role": "system", "content": "You are a concise assistant"},
-            {"role": "user", "content": prompt},
-        ],
+        messages=prompt.messages(),
         stream=True,
         stream_options={"include_usage": True},
+        **_prompt_cache_kwargs(prompt),
     )
 
     try:
         async for chunk in response:
             if getattr(chunk, "usage", None) is not None:
-                last_usage = chunk.usage
+                meta["usage"] = chunk.usage
             if getattr(chunk, "model", None) is not None:
-                last_model = chunk.model
+                meta["model"] = chunk.model
             choices = getattr(chunk, "choices", None)
             if not choices:
                 continue
@@ -122,20 +408,66 @@ async def stream_chat_llm(request: Request, prompt: str):
             if delta and delta.content:
                 yield delta.content
     finally:
-        latency_ms = int((time.perf_counter() - t0) * 1000)
-        _append_llm_call(
-            request,
-            operation="chat.completions.stream",
-            requested_model=requested_model,
-            actual_model=last_model,
-            latency_ms=latency_ms,
-            prompt_tokens=(
-                getattr(last_usage, "prompt_tokens", None) if last_usage else None
-            ),
-            completion_tokens=(
-                getattr(last_usage, "completion_tokens", None) if last_usage else None
-            ),
-            total_tokens=(
-                getattr(last_usage, "total_tokens", None) if last_usage else None
-            ),
+        _observe_upstream(
+            "chat.completions.stream",
+            requested_model,
+            t0,
+            **_chat_usage(meta.get("usage")),
         )
+
+
+async def stream_chat_llm(
+    request: Request,
+    prompt: str,
+    *,
+    system_prompt: Optional[str] = None,
+    prompt_template: Optional[str] = None,
+):
+    requested_model = settings.chatgpt_model
+    rendered = _chat_prompt(prompt, system_prompt, prompt_template)
+
+    timer = StreamTimer()
+    disconnected = False
+    # Identical prompts streaming at the same time read one upstream stream;
+    # a late joiner first gets the tokens it missed.
+    tokens, tee, shared = single_flight.stream(
+        ("chat.completions.stream", requested_model, rendered.system, rendered.user),
+        lambda meta: _stream_chat_upstream(requested_model, rendered, meta),
+    )
+
+    with tracing.span(
+        request, "chat_stream", model=requested_model, deduplicated=shared
+    ) as entry:
+        try:
+            async with aclosing(tokens):
+                async for token in tokens:
+                    timer.tick()
+                    yield token
+        except (GeneratorExit, asyncio.CancelledError):
+            # The consumer stopped reading: the client went away mid-stream
+            disconnected = True
+            raise
+        finally:
+            latency_ms = int((time.perf_counter() - timer.started) * 1000)
+            usage = _chat_usage(tee.meta.get("usage"))
+            timing = timer.summary(usage["completion_tokens"])
+            metrics.observe_stream(
+                requested_model,
+                timer.first_token_seconds,
+                timer.gaps,
+                timer.tokens_per_second(usage["completion_tokens"]),
+                disconnected,
+            )
+            tracing.annotate(entry, **usage, first_token_ms=timing["first_token_ms"])
+            _append_llm_call(
+                request,
+                operation="chat.completions.stream",
+                requested_model=requested_model,
+                actual_model=tee.meta.get("model"),
+                latency_ms=latency_ms,
+                deduplicated=shared,
+                prompt_template=rendered.template_id or None,
+                client_disconnected=disconnected or None,
+                **usage,
+                **timing,
+            )
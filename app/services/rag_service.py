@@ -1,11 +1,23 @@
-from typing import Any, Optional, Tuple
+import json
+import time
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
 from fastapi import Request
+from loguru import logger
 
-from app.core import rag, retrieval
-from app.models.rag import RagAnswer, RagSource
+from app.core import executors, rag, retrieval, tracing
+from app.core.answer_cache import get_answer_cache
+from app.core.collection_aliases import get_alias_store
+from app.core.config import get_settings
+from app.core.manifest import get_manifest
+from app.models.chunk import TextChunk
+from app.models.rag import RagAnswer, RagSource, RagStreamDone, RagStreamUsage
 from app.services import openai_service
 
+NO_CONTEXT_ANSWER = "I couldn't find any relevant context to answer this question."
+ANSWER_MARKER = "ANSWER:"
+SUMMARY_MARKER = "SUMMARY:"
+
 
 def _parse_answer_and_summary(raw: str) -> Tuple[str, Optional[str]]:
     if not raw:
@@ -13,7 +25,7 @@ def _parse_answer_and_summary(raw: str) -> Tuple[str, Optional[str]]:
 
     text = raw.strip()
 
-    parts = text.split("SUMMARY:", 1)
+    parts = text.split(SUMMARY_MARKER, 1)
     answer_part = parts[0].strip()
     summary_part: Optional[str] = None
 
@@ -22,12 +34,140 @@ def _parse_answer_and_summary(raw: str) -> Tuple[str, Optional[str]]:
         if not summary_part:
             summary_part = None
 
-    if answer_part.upper().startswith("ANSWER:"):
-        answer_part = answer_part[len("ANSWER:") :].strip()
+    if answer_part.upper().startswith(ANSWER_MARKER):
+        answer_part = answer_part[len(ANSWER_MARKER) :].strip()
 
     return answer_part, summary_part
 
 
+def _partial_marker_len(text: str, marker: str) -> int:
+    """Length of the longest suffix of `text` that is a proper prefix of `marker`."""
+    for size in range(min(len(text), len(marker) - 1), 0, -1):
+        if text.endswith(marker[:size]):
+            return size
+    return 0
+
+
+class AnswerStreamParser:
+    """
+    Streaming counterpart of _parse_answer_and_summary.
+
+    Feed raw model deltas; get back ("answer" | "summary", text) pieces as
+    soon as they can no longer be part of a marker. Text that might still
+    turn into "SUMMARY:" (or the leading "ANSWER:") and trailing whitespace
+    are held back, so the joined pieces equal the non-streaming parse.
+    """
+
+    def __init__(self):
+        self._section: Optional[str] = None  # until the ANSWER: prefix is settled
+        self._buffer = ""
+        self._pending_ws = ""
+        self._started = {"answer": False, "summary": False}
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        self._buffer += delta
+        return self._drain(final=False)
+
+    def finish(self) -> List[Tuple[str, str]]:
+        return self._drain(final=True)
+
+    def _emit(
+        self, out: List[Tuple[str, str]], section: str, text: str, end: bool
+    ) -> None:
+        if not self._started[section]:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started[section] = True
+
+        text = self._pending_ws + text
+        piece = text.rstrip()
+        self._pending_ws = "" if end else text[len(piece) :]
+        if piece:
+            out.append((section, piece))
+
+    def _drain(self, final: bool) -> List[Tuple[str, str]]:
+        out: List[Tuple[str, str]] = []
+
+        if self._section is None:
+            head = self._buffer.lstrip()
+            if head.upper().startswith(ANSWER_MARKER):
+                self._buffer = head[len(ANSWER_MARKER) :]
+            elif ANSWER_MARKER.startswith(head.upper()) and not final:
+                return out
+            else:
+                self._buffer = head
+            self._section = "answer"
+
+        if self._section == "answer":
+            idx = self._buffer.find(SUMMARY_MARKER)
+            if idx >= 0:
+                self._emit(out, "answer", self._buffer[:idx], end=True)
+                self._buffer = self._buffer[idx + len(SUMMARY_MARKER) :]
+                self._section = "summary"
+            else:
+                keep = 0 if final else _partial_marker_len(self._buffer, SUMMARY_MARKER)
+                cut = len(self._buffer) - keep
+                self._emit(out, "answer", self._buffer[:cut], end=final)
+                self._buffer = self._buffer[cut:]
+
+        if self._section == "summary":
+            self._emit(out, "summary", self._buffer, end=final)
+            self._buffer = ""
+
+        return out
+
+
+def _pack_context(chunks: List[TextChunk]) -> rag.PackedContext:
+    settings = get_settings()
+    packed = rag.pack_context(
+        chunks,
+        max_tokens=settings.rag_context_max_tokens,
+        model=settings.chatgpt_model,
+        merge=settings.rag_context_merge_adjacent,
+    )
+    logger.debug(
+        "rag_context_packed",
+        chunks=len(chunks),
+        blocks=len(packed.blocks),
+        tokens=packed.tokens,
+    )
+    return packed
+
+
+def _to_sources(blocks: List[rag.ContextBlock]) -> List[RagSource]:
+    """One source per context block, so citation [i] is sources[i]."""
+    return [
+        RagSource(
+            id=block.chunks[0].id,
+            text=block.text,
+            score=block.score,
+            metadata=block.metadata,
+            chunk_ids=[chunk.id for chunk in block.chunks],
+        )
+        for block in blocks
+    ]
+
+
+def _answer_cache_scope(
+    filename: Optional[str],
+    metadata_filter: Optional[dict[str, Any]],
+    top_k: int,
+) -> str:
+    """
+    Cached answers are only valid for the same collection contents and the
+    same retrieval parameters. The physical build name changes on every
+    blue/green rebuild and the manifest version on every incremental ingest,
+    so old answers stop matching as soon as the data changes.
+    """
+    physical = get_alias_store().resolve(retrieval.DEFAULT_COLLECTION)
+    return json.dumps(
+        [physical, get_manifest().version(physical), filename, metadata_filter, top_k],
+        sort_keys=True,
+        default=str,
+    )
+
+
 async def rag_with_answer(
     http_request: Request,
     question: str,
@@ -35,36 +175,130 @@ async def rag_with_answer(
     filename: Optional[str] = None,
     metadata_filter: Optional[dict[str, Any]] = None,
 ) -> RagAnswer:
-    chunks = await retrieval.search_chunks(
-        http_request=http_request,
-        query=question,
-        k=top_k,
-        filename=filename,
-        metadata_filter=metadata_filter,
-    )
-    if not chunks:
-        return RagAnswer(
-            answer="I couldn't find any relevant context to answer this question.",
-            summary=None,
-            sources=[],
+    cache = get_answer_cache()
+    query_embedding: Optional[List[float]] = None
+    if cache is not None:
+        with tracing.span(http_request, "answer_cache") as entry:
+            query_embedding = await retrieval.embed_query(http_request, question)
+            scope = await executors.run_read(
+                _answer_cache_scope, filename, metadata_filter, top_k
+            )
+            cached = cache.get(scope, query_embedding)
+            tracing.annotate(entry, hit=cached is not None)
+        if cached is not None:
+            logger.info("answer_cache_hit", scope=scope)
+            return cached
+
+    with tracing.span(http_request, "retrieve", top_k=top_k) as entry:
+        chunks = await retrieval.search_chunks(
+            http_request=http_request,
+            query=question,
+            k=top_k,
+            filename=filename,
+            metadata_filter=metadata_filter,
+            query_embedding=query_embedding,
         )
+        tracing.annotate(entry, chunks=len(chunks))
+    if not chunks:
+        return RagAnswer(answer=NO_CONTEXT_ANSWER, summary=None, sources=[])
 
-    context = rag.build_context(chunks)
-    rag_prompt = rag.build_rag_prompt(context=context, question=question)
-    raw_output = await openai_service.ask_llm(http_request, rag_prompt)
+    with tracing.span(http_request, "pack_context") as entry:
+        packed = _pack_context(chunks)
+        rag_prompt = rag.build_rag_prompt(context=packed.context, question=question)
+        tracing.annotate(entry, blocks=len(packed.blocks), tokens=packed.tokens)
+    with tracing.span(http_request, "generate", prompt=rag_prompt.template_id):
+        raw_output = await openai_service.ask_llm(
+            http_request,
+            rag_prompt.user,
+            system_prompt=rag_prompt.system,
+            prompt_template=rag_prompt.template_id,
+        )
 
-    answer, summary = _parse_answer_and_summary(raw_output)
+    with tracing.span(http_request, "parse_answer"):
+        answer, summary = _parse_answer_and_summary(raw_output)
 
-    return RagAnswer(
+    result = RagAnswer(
         answer=answer.strip(),
         summary=summary,
-        sources=[
-            RagSource(
-                id=chunk.id,
-                text=chunk.text,
-                score=chunk.score,
-                metadata=chunk.metadata,
+        sources=_to_sources(packed.blocks),
+    )
+    if cache is not None:
+        cache.put(scope, query_embedding, result)
+    return result
+
+
+def _stream_usage(http_request: Optional[Request]) -> Optional[RagStreamUsage]:
+    calls = getattr(getattr(http_request, "state", None), "llm_calls", None) or []
+    for call in reversed(calls):
+        if call.operation == "chat.completions.stream":
+            return RagStreamUsage(
+                model=call.actual_model or call.requested_model,
+                prompt_tokens=call.prompt_tokens,
+                completion_tokens=call.completion_tokens,
+                total_tokens=call.total_tokens,
             )
-            for chunk in chunks
-        ],
+    return None
+
+
+async def stream_rag_answer(
+    http_request: Request,
+    question: str,
+    top_k: int,
+    filename: Optional[str] = None,
+    metadata_filter: Optional[dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Streaming RAG: yields (event, data) pairs.
+
+    - "sources" once retrieval is done, before any generation starts
+    - "answer" / "summary" with {"delta": text} as tokens arrive
+    - "done" with token usage and timings
+    """
+    t0 = time.perf_counter()
+
+    def _elapsed_ms() -> int:
+        return int((time.perf_counter() - t0) * 1000)
+
+    with tracing.span(http_request, "retrieve", top_k=top_k) as entry:
+        chunks = await retrieval.search_chunks(
+            http_request=http_request,
+            query=question,
+            k=top_k,
+            filename=filename,
+            metadata_filter=metadata_filter,
+        )
+        tracing.annotate(entry, chunks=len(chunks))
+    retrieval_ms = _elapsed_ms()
+    with tracing.span(http_request, "pack_context") as entry:
+        packed = _pack_context(chunks)
+        tracing.annotate(entry, blocks=len(packed.blocks), tokens=packed.tokens)
+    sources = _to_sources(packed.blocks)
+    yield "sources", {"sources": [s.model_dump(mode="json") for s in sources]}
+
+    first_token_ms: Optional[int] = None
+    if not chunks:
+        yield "answer", {"delta": NO_CONTEXT_ANSWER}
+    else:
+        rag_prompt = rag.build_rag_prompt(context=packed.context, question=question)
+        parser = AnswerStreamParser()
+
+        async for delta in openai_service.stream_chat_llm(
+            http_request,
+            rag_prompt.user,
+            system_prompt=rag_prompt.system,
+            prompt_template=rag_prompt.template_id,
+        ):
+            if first_token_ms is None:
+                first_token_ms = _elapsed_ms()
+            for section, text in parser.feed(delta):
+                yield section, {"delta": text}
+        for section, text in parser.finish():
+            yield section, {"delta": text}
+
+    done = RagStreamDone(
+        usage=_stream_usage(http_request),
+        retrieval_ms=retrieval_ms,
+        first_token_ms=first_token_ms,
+        total_ms=_elapsed_ms(),
     )
+    yield "done", done.model_dump()
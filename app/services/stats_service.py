@@ -0,0 +1,22 @@
+from app.core import executors
+from app.core.answer_cache import get_answer_cache
+from app.core.embedding_cache import get_embedding_cache
+from app.core.llm_telemetry import prompt_cache_stats
+from app.services import openai_service
+
+
+async def collect_stats() -> dict:
+    """Runtime counters of the in-process caches and batchers (None = disabled)."""
+    batcher = openai_service.get_embed_batcher()
+    embedding_cache = get_embedding_cache()
+    answer_cache = get_answer_cache()
+
+    return {
+        "embed_batcher": batcher.stats() if batcher else None,
+        "embedding_cache": (
+            await executors.run_read(embedding_cache.stats) if embedding_cache else None
+        ),
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "single_flight": openai_service.single_flight.stats(),
+        "prompt_cache": prompt_cache_stats.stats(),
+    }
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import random
+from typing import List, Tuple
+
+# Synthetic documents for load tests: deterministic for a seed, with a
+# distinct topic vocabulary per document so questions have a best match.
+
+_COMMON = (
+    "the a of to and in is for on with as by that this from are be at it "
+    "system data service request response value process result model"
+).split()
+_SYLLABLES = "ka lo mi nu re si ta vo ze bri gan tel mor pax dun wil sor fen".split()
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def _sentence(rng: random.Random, topic: List[str]) -> str:
+    words = [
+        rng.choice(topic) if rng.random() < 0.3 else rng.choice(_COMMON)
+        for _ in range(rng.randint(8, 18))
+    ]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_document(
+    rng: random.Random, words: int, topic: List[str]
+) -> Tuple[str, str]:
+    """(title, body) of about `words` words."""
+    title = " ".join(topic[:3]).title()
+    paragraphs, count = [], 0
+    while count < words:
+        paragraph = " ".join(_sentence(rng, topic) for _ in range(rng.randint(3, 6)))
+        paragraphs.append(paragraph)
+        count += len(paragraph.split())
+    return title, f"{title}\n\n" + "\n\n".join(paragraphs) + "\n"
+
+
+def generate_corpus(
+    out_dir: str, docs: int, words: int, questions: int, seed: int = 0
+) -> List[str]:
+    """
+    Write `docs` text files and `questions.txt` (one question per line,
+    each about one document's topic) into `out_dir`. Returns the file paths.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths, topics = [], []
+    for i in range(docs):
+        topic = [_word(rng) for _ in range(6)]
+        title, body = generate_document(rng, words, topic)
+        path = os.path.join(out_dir, f"doc_{i:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        paths.append(path)
+        topics.append((title, topic))
+
+    with open(os.path.join(out_dir, "questions.txt"), "w", encoding="utf-8") as f:
+        for _ in range(questions):
+            title, topic = rng.choice(topics)
+            f.write(f"What does {title} say about {' and '.join(topic[3:5])}?\n")
+
+    with open(os.path.join(out_dir, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {"docs": docs, "words": words, "questions": questions, "seed": seed},
+            f,
+            indent=2,
+        )
+    return paths
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic text corpus and questions."
+    )
+    parser.add_argument("--out", default="data/bench")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--words", type=int, default=800, help="Words per doc.")
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = generate_corpus(
+        args.out, args.docs, args.words, args.questions, seed=args.seed
+    )
+    print(f"Wrote {len(paths)} documents and {args.questions} questions to {args.out}")
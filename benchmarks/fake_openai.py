@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# An OpenAI-compatible stand-in for load tests: chat completions (plain and
+# streamed) and embeddings, with configurable latency, token rate and
+# injected errors. Point the app at it with
+# OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+_WORD = re.compile(r"\w+")
+_FILLER = (
+    "the service answers from the retrieved context and cites each snippet "
+    "it relies on while keeping the reply short and grounded"
+).split()
+
+
+@dataclass
+class Latency:
+    """
+    A latency distribution in milliseconds, parsed from "fixed:<ms>",
+    "uniform:<low>:<high>" or "lognormal:<median>:<sigma>".
+    """
+
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, *raw = spec.split(":")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(raw) != expected[kind]:
+            raise ValueError(
+                f"Invalid latency '{spec}': use fixed:<ms>, uniform:<low>:<high> "
+                "or lognormal:<median>:<sigma>"
+            )
+        return cls(kind, tuple(float(p) for p in raw))
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds."""
+        if self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            ms = median * rng.lognormvariate(0.0, sigma) if median > 0 else 0.0
+        else:
+            ms = self.params[0]
+        return max(ms, 0.0) / 1000
+
+
+@dataclass
+class FakeConfig:
+    # Time before a non-streamed reply, or before the first streamed token
+    chat_latency: Latency = field(default_factory=Latency)
+    embed_latency: Latency = field(default_factory=Latency)
+    # Streamed output rate (0 = as fast as possible)
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 60
+    embedding_dimensions: int = 1536
+    # Share of requests answered with `error_status` instead
+    error_rate: float = 0.0
+    error_status: int = 500
+    # When false, errors carry `x-should-retry: false` so the OpenAI client
+    # does not retry them and the injected rate is the rate callers see
+    retryable_errors: bool = False
+    seed: Optional[int] = None
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """
+    Deterministic unit vector hashing the words of `text`, so texts sharing
+    words are close and retrieval over a fake-embedded corpus is meaningful.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in _tokens(text) or [""]:
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimensions
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+
+def _completion_words(prompt: str, count: int) -> List[str]:
+    # Echo words of the prompt so replies look related to the question
+    source = _tokens(prompt)[-40:] or _FILLER
+    words = [source[i % len(source)] for i in range(max(count - 3, 2))]
+    half = len(words) // 2
+    return ["ANSWER:", *words[:half], "SUMMARY:", "-", *words[half:]]
+
+
+def create_app(config: Optional[FakeConfig] = None) -> FastAPI:
+    config = config or FakeConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="fake-openai")
+    app.state.config = config
+    app.state.requests = Counter()
+
+    def _error() -> Optional[JSONResponse]:
+        if config.error_rate <= 0 or rng.random() >= config.error_rate:
+            return None
+        headers = {} if config.retryable_errors else {"x-should-retry": "false"}
+        return JSONResponse(
+            status_code=config.error_status,
+            headers=headers,
+            content={
+                "error": {
+                    "message": "Injected error",
+                    "type": "server_error",
+                    "code": None,
+                }
+            },
+        )
+
+    def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return dict(app.state.requests)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stream = bool(body.get("stream"))
+        app.state.requests["chat.stream" if stream else "chat"] += 1
+        model = body.get("model", "gpt-fake")
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        prompt_tokens = len(_tokens(prompt))
+        words = _completion_words(prompt, config.completion_tokens)
+
+        await asyncio.sleep(config.chat_latency.sample(rng))
+        error = _error()
+        if error is not None:
+            return error
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if not stream:
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(words)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": _usage(prompt_tokens, len(words)),
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def _chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def _events() -> AsyncIterator[str]:
+            interval = 1 / config.tokens_per_second if config.tokens_per_second else 0
+            yield _chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                if i and interval:
+                    await asyncio.sleep(interval)
+                yield _chunk({"content": word if i == 0 else " " + word})
+            yield _chunk({}, finish="stop")
+            if include_usage:
+                usage = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": _usage(prompt_tokens, len(words)),
+                }
+                yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.requests["embeddings"] += 1
+        raw: Union[str, List[str]] = body.get("input", "")
+        texts = [raw] if isinstance(raw, str) else list(raw)
+        dimensions = body.get("dimensions") or config.embedding_dimensions
+        base64_encoded = body.get("encoding_format") == "base64"
+
+        await asyncio.sleep(config.embed_latency.sample(rng))
+        error = _error()
+        if error is not None:
+            return error
+
+        data = []
+        for index, text in enumerate(texts):
+            vector = fake_embedding(text, dimensions)
+            if base64_encoded:
+                # What the OpenAI client asks for by default
+                packed = np.asarray(vector, dtype="<f4").tobytes()
+                embedding: Any = base64.b64encode(packed).decode("ascii")
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(len(_tokens(t)) or 1 for t in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    return app
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Local OpenAI-compatible server for load tests."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--chat-latency",
+        default="lognormal:400:0.4",
+        help="Time to the reply / first token: fixed:<ms>, uniform:<low>:<high> "
+        "or lognormal:<median>:<sigma>.",
+    )
+    parser.add_argument("--embed-latency", default="lognormal:60:0.3")
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=50.0, help="Streamed token rate."
+    )
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of failed requests."
+    )
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument(
+        "--retryable-errors",
+        action="store_true",
+        help="Let the OpenAI client retry injected errors.",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    fake = create_app(
+        FakeConfig(
+            chat_latency=Latency.parse(args.chat_latency),
+            embed_latency=Latency.parse(args.embed_latency),
+            tokens_per_second=args.tokens_per_second,
+            completion_tokens=args.completion_tokens,
+            embedding_dimensions=args.dimensions,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            retryable_errors=args.retryable_errors,
+            seed=args.seed,
+        )
+    )
+    uvicorn.run(fake, host=args.host, port=args.port, log_level="warning")
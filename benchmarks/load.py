@@ -0,0 +1,388 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+# Load driver: fixed-concurrency runs against the API, reporting latency
+# percentiles, throughput and error rate per endpoint and concurrency, saved
+# as JSON and optionally compared with a previous run.
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    path: str
+    payload: Callable[[str], dict]
+    streaming: bool = False
+
+
+ENDPOINTS: Dict[str, Endpoint] = {
+    "rag-query": Endpoint("/rag-query", lambda q: {"question": q}),
+    "embed": Endpoint("/embed", lambda q: {"text": q}),
+    "ask": Endpoint("/ask", lambda q: {"question": q}),
+    "stream-chat": Endpoint("/stream-chat", lambda q: {"prompt": q}, streaming=True),
+}
+
+DEFAULT_QUESTIONS = [
+    "What is the retention policy for archived data?",
+    "How are requests authenticated?",
+    "Which regions does the service run in?",
+    "How do I rotate the signing keys?",
+    "What limits apply to batch uploads?",
+]
+
+
+@dataclass
+class Sample:
+    seconds: float
+    status: int
+    # Streams: time to the first body chunk
+    first_byte_seconds: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 400
+
+
+def _percentile_ms(values: Sequence[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+def summarize(samples: List[Sample], wall_seconds: float) -> dict:
+    ok = [s.seconds for s in samples if s.ok]
+    first_bytes = [s.first_byte_seconds for s in samples if s.first_byte_seconds]
+    errors = len(samples) - len(ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": _percentile_ms(ok, 50),
+        "p95_ms": _percentile_ms(ok, 95),
+        "p99_ms": _percentile_ms(ok, 99),
+        "first_byte_p50_ms": _percentile_ms(first_bytes, 50),
+        "first_byte_p95_ms": _percentile_ms(first_bytes, 95),
+    }
+
+
+async def _send(client: httpx.AsyncClient, endpoint: Endpoint, question: str) -> Sample:
+    t0 = time.perf_counter()
+    try:
+        if not endpoint.streaming:
+            resp = await client.post(endpoint.path, json=endpoint.payload(question))
+            return Sample(time.perf_counter() - t0, resp.status_code)
+        first_byte = None
+        async with client.stream(
+            "POST", endpoint.path, json=endpoint.payload(question)
+        ) as resp:
+            async for _ in resp.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - t0
+        return Sample(time.perf_counter() - t0, resp.status_code, first_byte)
+    except httpx.HTTPError:
+        # Timeouts and dropped connections count as errors
+        return Sample(time.perf_counter() - t0, 0)
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    endpoint: Endpoint,
+    questions: Sequence[str],
+    concurrency: int,
+    requests: int,
+) -> dict:
+    """`requests` calls with `concurrency` of them in flight at any time."""
+    samples: List[Sample] = []
+    next_index = 0
+
+    async def _worker():
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            samples.append(
+                await _send(client, endpoint, questions[index % len(questions)])
+            )
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - t0)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    endpoints: Sequence[str],
+    concurrency_levels: Sequence[int],
+    requests: int,
+    questions: Sequence[str],
+    warmup: int = 5,
+) -> List[dict]:
+    results = []
+    for name in endpoints:
+        endpoint = ENDPOINTS[name]
+        for _ in range(warmup):
+            await _send(client, endpoint, questions[0])
+        for concurrency in concurrency_levels:
+            row = await run_level(client, endpoint, questions, concurrency, requests)
+            results.append({"endpoint": name, "concurrency": concurrency, **row})
+            print(_format_row(results[-1]))
+    return results
+
+
+def compare(
+    results: List[dict], baseline: List[dict], max_regression: float
+) -> List[str]:
+    """
+    Regressions of `results` against `baseline` (matched by endpoint and
+    concurrency): p95 latency up, or throughput down, by more than
+    `max_regression`, or error rate up by more than one point.
+    """
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline}
+    problems = []
+    for row in results:
+        key = (row["endpoint"], row["concurrency"])
+        old = previous.get(key)
+        if old is None:
+            continue
+        label = f"{row['endpoint']} @ {row['concurrency']}"
+        if old["p95_ms"] and row["p95_ms"]:
+            if row["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+                problems.append(
+                    f"{label}: p95 {old['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms"
+                )
+        if old["throughput_rps"] and row["throughput_rps"] < old["throughput_rps"] * (
+            1 - max_regression
+        ):
+            problems.append(
+                f"{label}: throughput {old['throughput_rps']:.1f} -> "
+                f"{row['throughput_rps']:.1f} req/s"
+            )
+        if row["error_rate"] > old["error_rate"] + 0.01:
+            problems.append(
+                f"{label}: error rate {old['error_rate']:.2%} -> "
+                f"{row['error_rate']:.2%}"
+            )
+    return problems
+
+
+def _format_row(row: dict) -> str:
+    def _ms(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    return (
+        f"{row['endpoint']:<12} {row['concurrency']:>5} {row['requests']:>6} "
+        f"{row['throughput_rps']:>9.1f} {_ms(row['p50_ms']):>9} "
+        f"{_ms(row['p95_ms']):>9} {_ms(row['p99_ms']):>9} "
+        f"{_ms(row['first_byte_p50_ms']):>9} {row['error_rate']:>7.2%}"
+    )
+
+
+HEADER = (
+    f"{'endpoint':<12} {'conc':>5} {'reqs':>6} {'req/s':>9} {'p50 ms':>9} "
+    f"{'p95 ms':>9} {'p99 ms':>9} {'ttfb ms':>9} {'errors':>7}"
+)
+
+
+# -------------------------
+# Local stack: fake OpenAI server + the app, on free ports
+# -------------------------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up")
+            time.sleep(0.2)
+
+
+@contextmanager
+def local_stack(
+    fake_args: Sequence[str], corpus_dir: Optional[str], workers: int
+) -> Iterator[str]:
+    """
+    Start the fake OpenAI server and the app wired to it, ingesting
+    `corpus_dir` first; yields the app's base URL. Caches are off unless
+    set in the environment, so every request does the full work.
+    """
+    fake_port, app_port = _free_port(), _free_port()
+    env = {
+        "OPENAI_API_KEY": "fake",
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "ANSWER_CACHE_ENABLED": "false",
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        # Never the real index: ingestion below resets the collection
+        "CHROMA_MODE": "embedded",
+        "CHROMA_PERSIST_DIR": tempfile.mkdtemp(prefix="bench-chroma-"),
+    }
+    processes = []
+    try:
+        fake = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_openai"]
+            + ["--port", str(fake_port), *fake_args]
+        )
+        processes.append(fake)
+        _wait_until_up(f"http://127.0.0.1:{fake_port}/stats", fake)
+
+        if corpus_dir:
+            files = sorted(glob.glob(os.path.join(corpus_dir, "doc_*.txt")))
+            subprocess.run(
+                [sys.executable, "-m", "app.scripts.ingestion_cli", "ingest"]
+                + [*files, "--reset"],
+                env=env,
+                check=True,
+            )
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app"]
+            + ["--port", str(app_port), "--workers", str(workers)]
+            + ["--log-level", "warning"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        processes.append(server)
+        _wait_until_up(f"http://127.0.0.1:{app_port}/health", server)
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def _load_questions(path: Optional[str]) -> List[str]:
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()] or DEFAULT_QUESTIONS
+
+
+async def _drive(base_url: str, args: argparse.Namespace) -> List[dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        print(HEADER)
+        return await run_load(
+            client,
+            args.endpoints,
+            args.concurrency,
+            args.requests,
+            _load_questions(args.questions),
+            warmup=args.warmup,
+        )
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.spawn:
+        fake_args = [
+            "--chat-latency",
+            args.chat_latency,
+            "--embed-latency",
+            args.embed_latency,
+            "--tokens-per-second",
+            str(args.tokens_per_second),
+            "--error-rate",
+            str(args.error_rate),
+            "--seed",
+            "0",
+        ]
+        with local_stack(fake_args, args.corpus, args.workers) as base_url:
+            results = asyncio.run(_drive(base_url, args))
+    else:
+        results = asyncio.run(_drive(args.base_url, args))
+
+    if args.out:
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "config": {
+                k: v for k, v in vars(args).items() if k not in ("out", "compare")
+            },
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        problems = compare(results, baseline, args.max_regression)
+        if problems:
+            print(f"\nRegressions against {args.compare}:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Fixed-concurrency load test of the API endpoints."
+    )
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        choices=sorted(ENDPOINTS),
+        default=["rag-query", "embed", "ask", "stream-chat"],
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Requests per concurrency level."
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--questions", default=None, help="Text file with one question per line."
+    )
+    parser.add_argument("--out", default=None, help="Write results as JSON.")
+    parser.add_argument(
+        "--compare", default=None, help="Results JSON of a previous run."
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Tolerated p95 / throughput change against --compare.",
+    )
+
+    stack = parser.add_argument_group("local stack (--spawn)")
+    stack.add_argument(
+        "--spawn",
+        action="store_true",
+        help="Start the fake OpenAI server and the app instead of --base-url.",
+    )
+    stack.add_argument("--corpus", default=None, help="Directory to ingest first.")
+    stack.add_argument("--workers", type=int, default=1, help="uvicorn workers.")
+    stack.add_argument("--chat-latency", default="lognormal:400:0.4")
+    stack.add_argument("--embed-latency", default="lognormal:60:0.3")
+    stack.add_argument("--tokens-per-second", type=float, default=50.0)
+    stack.add_argument("--error-rate", type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,368 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from app.core.chunking import chunk_text, semantic_chunk_text_with_overlap
+from app.core.doc_loader import clean_text, load_document_pages
+from benchmarks.corpus import generate_document
+
+# Throughput and peak memory of the ingestion text path (loading, cleaning,
+# chunking) over generated corpora, compared against a stored baseline.
+
+MB = 1024 * 1024
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(__file__), "baselines", "text_pipeline.json"
+)
+_SIZE = re.compile(r"^(\d+(?:\.\d+)?)\s*(KB|MB|GB)$", re.IGNORECASE)
+_UNITS = {"KB": 1024, "MB": MB, "GB": 1024 * MB}
+
+
+def parse_size(spec: str) -> int:
+    match = _SIZE.match(spec.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid size '{spec}', e.g. 512KB, 1GB")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def _size_label(size: int) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+# -------------------------
+# Corpora
+# -------------------------
+def _paragraph_pool(seed: int, count: int = 500) -> List[str]:
+    """
+    Raw paragraphs shaped like extracted text: hard line breaks, stray
+    spaces and some CRLF endings, for clean_text to undo.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(count):
+        topic = ["".join(rng.choices("aeioukmnrstlv", k=6)) for _ in range(6)]
+        _, body = generate_document(rng, rng.randint(40, 160), topic)
+        words = body.split()[3:]
+        lines, i = [], 0
+        while i < len(words):
+            width = rng.randint(8, 14)
+            line = " ".join(words[i : i + width])
+            if rng.random() < 0.2:
+                line = "  " + line.replace(" ", "   ", 1) + " "
+            lines.append(line)
+            i += width
+        newline = "\r\n" if rng.random() < 0.1 else "\n"
+        pool.append(newline.join(lines))
+    return pool
+
+
+def generate_text_file(path: str, size: int, seed: int = 0) -> str:
+    """Write about `size` bytes of raw text to `path` (reused if present)."""
+    if os.path.exists(path) and os.path.getsize(path) >= size:
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pool = _paragraph_pool(seed)
+    rng = random.Random(seed)
+    written = 0
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        while written < size:
+            # Pool order is reshuffled per pass so paragraphs do not repeat
+            # at a fixed period
+            order = list(range(len(pool)))
+            rng.shuffle(order)
+            for index in order:
+                block = pool[index] + ("\n\n" if index % 7 else "\n  \n")
+                f.write(block)
+                written += len(block.encode("utf-8"))
+                if written >= size:
+                    break
+    os.replace(tmp, path)
+    return path
+
+
+def _pdf_string(text: str) -> bytes:
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + escaped.encode("latin-1", "replace") + b")"
+
+
+def generate_pdf_file(
+    path: str, pages: int, seed: int = 0, lines_per_page: int = 50
+) -> str:
+    """
+    Write a `pages`-page text PDF (Helvetica, ~10 words per line) without a
+    PDF library: one content stream per page, xref table by hand.
+    """
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    words = " ".join(_paragraph_pool(seed, count=200)).split()
+    rng = random.Random(seed)
+
+    offsets: List[int] = []
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+
+        def _object(number: int, body: bytes) -> None:
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        # 1: catalog, 2: page tree, 3: font, then (page, contents) pairs
+        first_page = 4
+        kids = b" ".join(b"%d 0 R" % (first_page + 2 * i) for i in range(pages))
+        _object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        _object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages))
+        _object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for i in range(pages):
+            page, contents = first_page + 2 * i, first_page + 2 * i + 1
+            start = rng.randrange(len(words))
+            lines = [
+                " ".join(words[(start + j * 10 + k) % len(words)] for k in range(10))
+                for j in range(lines_per_page)
+            ]
+            stream = (
+                b"BT /F1 10 Tf 40 760 Td 14 TL "
+                + b" ".join(_pdf_string(line) + b" Tj T*" for line in lines)
+                + b" ET"
+            )
+            _object(
+                page,
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                % contents,
+            )
+            _object(
+                contents,
+                b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+            )
+
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(offsets) + 1, xref)
+        )
+    os.replace(tmp, path)
+    return path
+
+
+# -------------------------
+# Measurement
+# -------------------------
+@dataclass
+class Case:
+    name: str
+    input: str
+    # Bytes of text the case processes, for MB/s
+    size: int
+    run: Callable[[], object]
+    pages: Optional[int] = None
+
+
+def _best_seconds(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _peak_mb(run: Callable[[], object]) -> float:
+    # A separate run: tracemalloc slows allocation-heavy code a lot
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / MB, 2)
+
+
+def measure(case: Case, repeat: int, memory: bool = True) -> dict:
+    seconds = _best_seconds(case.run, repeat)
+    row = {
+        "case": case.name,
+        "input": case.input,
+        "size_mb": round(case.size / MB, 3),
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(case.size / MB / seconds, 2),
+        "peak_mb": _peak_mb(case.run) if memory else None,
+    }
+    if case.pages is not None:
+        row["pages_per_s"] = round(case.pages / seconds, 1)
+    return row
+
+
+def text_cases(path: str, label: str) -> List[Case]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        raw = f.read()
+    cleaned = clean_text(raw)
+    size = len(raw.encode("utf-8"))
+    cleaned_size = len(cleaned.encode("utf-8"))
+    return [
+        Case("load_document_pages", label, size, lambda: load_document_pages(path)),
+        Case("clean_text", label, size, lambda: clean_text(raw)),
+        Case("chunk_text", label, cleaned_size, lambda: chunk_text(cleaned, 200, 40)),
+        Case(
+            "semantic_chunk_text_with_overlap",
+            label,
+            cleaned_size,
+            lambda: semantic_chunk_text_with_overlap(cleaned, 300, 50),
+        ),
+    ]
+
+
+def pdf_case(path: str, pages: int) -> Case:
+    # MB/s of extracted text; pages/s is the more natural PDF figure
+    extracted = load_document_pages(path)
+    size = sum(len(text.encode("utf-8")) for _, text in extracted)
+    return Case(
+        "load_document_pages",
+        f"pdf:{pages}p",
+        size,
+        lambda: load_document_pages(path),
+        pages=pages,
+    )
+
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> List[str]:
+    """Cases whose MB/s dropped more than `threshold` below the baseline."""
+    previous = {(r["case"], r["input"]): r for r in baseline}
+    problems = []
+    for row in results:
+        old = previous.get((row["case"], row["input"]))
+        if old is None or not old["mb_per_s"]:
+            continue
+        change = row["mb_per_s"] / old["mb_per_s"] - 1
+        if change < -threshold:
+            problems.append(
+                f"{row['case']} [{row['input']}]: {old['mb_per_s']:.1f} -> "
+                f"{row['mb_per_s']:.1f} MB/s ({change:+.0%})"
+            )
+    return problems
+
+
+def run(args: argparse.Namespace) -> int:
+    cases: List[Case] = []
+    for size in args.sizes:
+        label = f"txt:{_size_label(size)}"
+        path = os.path.join(args.data_dir, f"text_{_size_label(size)}_{args.seed}.txt")
+        cases.extend(text_cases(generate_text_file(path, size, args.seed), label))
+    for pages in args.pdf_pages:
+        path = os.path.join(args.data_dir, f"pages_{pages}_{args.seed}.pdf")
+        cases.append(pdf_case(generate_pdf_file(path, pages, args.seed), pages))
+
+    print(
+        f"{'case':<34} {'input':<11} {'MB':>8} {'MB/s':>9} {'peak MB':>9} "
+        f"{'pages/s':>8}"
+    )
+    results = []
+    for case in cases:
+        row = measure(case, args.repeat, memory=not args.no_memory)
+        results.append(row)
+        peak = "-" if row["peak_mb"] is None else f"{row['peak_mb']:.1f}"
+        pages = f"{row['pages_per_s']:.0f}" if "pages_per_s" in row else "-"
+        print(
+            f"{row['case']:<34} {row['input']:<11} {row['size_mb']:>8.2f} "
+            f"{row['mb_per_s']:>9.1f} {peak:>9} {pages:>8}"
+        )
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {
+            "sizes": [_size_label(s) for s in args.sizes],
+            "pdf_pages": args.pdf_pages,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.out}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    problems = compare(results, baseline, args.threshold)
+    if problems:
+        print(f"\nThroughput regressions against {args.baseline}:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Throughput and peak memory of text loading and chunking."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_size,
+        nargs="*",
+        default=[parse_size("1MB"), parse_size("16MB")],
+        help="Generated text corpora, e.g. 1MB 100MB 1GB.",
+    )
+    parser.add_argument(
+        "--pdf-pages",
+        type=int,
+        nargs="*",
+        default=[2000],
+        help="Generated PDFs, by page count.",
+    )
+    parser.add_argument("--data-dir", default="data/bench/text")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per case; the best counts."
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the peak-memory runs."
+    )
+    parser.add_argument("--out", default=None, help="Also write results here.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store these results as the baseline instead of comparing.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Tolerated MB/s drop against the baseline.",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
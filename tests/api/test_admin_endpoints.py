@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -51,8 +54,29 @@ async def test_get_documents_endpoint(monkeypatch):
     assert first["pages"] == [1, 2, 3]
 
 
-@pytest.mark.asyncio
-async def test_reindex_endpoint(monkeypatch):
+def _fresh_job_manager(monkeypatch, tmp_path):
+    from app.services import jobs_service
+
+    manager = jobs_service.JobManager(store_path=str(tmp_path / "jobs.json"))
+    monkeypatch.setattr(jobs_service, "_manager", manager)
+    return manager
+
+
+def _wait_for_job(test_client, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = test_client.get(f"/admin/jobs/{job_id}").json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}: {job}")
+
+
+def test_reindex_endpoint_runs_job_in_background(monkeypatch, tmp_path):
+    from app.scripts import ingest
+
+    _fresh_job_manager(monkeypatch, tmp_path)
+
     # Fake ingest_files from app.scripts.ingest
     async def fake_ingest_files(
         file_patterns,
@@ -61,21 +85,31 @@ async def test_reindex_endpoint(monkeypatch):
         chunk_overlap: int,
         reset: bool,
         mode: str,
+        embed_batch_size=None,
+        embed_concurrency=None,
+        on_progress=None,
+        parse_workers=None,
     ):
         # basic sanity checks on arguments passed from endpoint
         assert collection_name == "docs"
         assert reset is True
         assert mode in ("fixed", "semantic")
         assert file_patterns == ["data/docs/*.pdf"]
+        assert embed_batch_size == 64
+        assert embed_concurrency is None
+
+        on_progress(
+            ingest.IngestProgress(
+                files_total=2,
+                files_done=2,
+                bytes_total=100,
+                bytes_done=100,
+                chunks_embedded=42,
+            )
+        )
         return 42
 
-    from app.api.routes import admin
-
-    monkeypatch.setattr(
-        admin,
-        "ingest_files",
-        fake_ingest_files,
-    )
+    monkeypatch.setattr(ingest, "ingest_files", fake_ingest_files)
 
     body = {
         "paths": ["data/docs/*.pdf"],
@@ -84,11 +118,136 @@ async def test_reindex_endpoint(monkeypatch):
         "chunk_overlap": 40,
         "mode": "semantic",
         "reset": True,
+        "embed_batch_size": 64,
     }
 
-    resp = client.post("/admin/reindex", json=body)
+    with TestClient(app) as test_client:
+        resp = test_client.post("/admin/reindex", json=body)
+        assert resp.status_code == 202
+
+        data = resp.json()
+        assert data["collection"] == "docs"
+        assert data["status"] in ("queued", "running", "succeeded")
+
+        job = _wait_for_job(test_client, data["id"], {"succeeded", "failed"})
+        listed = test_client.get("/admin/jobs").json()
+
+    assert job["status"] == "succeeded"
+    assert job["files_done"] == 2
+    assert job["chunks_embedded"] == 42
+    assert job["finished_at"] is not None
+    assert [j["id"] for j in listed] == [data["id"]]
+
+
+def test_cancel_running_reindex_job(monkeypatch, tmp_path):
+    from app.scripts import ingest
+
+    _fresh_job_manager(monkeypatch, tmp_path)
+
+    async def slow_ingest_files(**kwargs):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(ingest, "ingest_files", slow_ingest_files)
+
+    with TestClient(app) as test_client:
+        job_id = test_client.post("/admin/reindex", json={"paths": ["x.txt"]}).json()[
+            "id"
+        ]
+        _wait_for_job(test_client, job_id, {"running"})
+
+        resp = test_client.post(f"/admin/jobs/{job_id}/cancel")
+        assert resp.status_code == 202
+
+        job = _wait_for_job(test_client, job_id, {"cancelled"})
+        again = test_client.post(f"/admin/jobs/{job_id}/cancel")
+
+    assert job["finished_at"] is not None
+    assert again.status_code == 409
+
+
+def test_get_unknown_job_returns_404(monkeypatch, tmp_path):
+    _fresh_job_manager(monkeypatch, tmp_path)
+
+    resp = client.get("/admin/jobs/does-not-exist")
+    assert resp.status_code == 404
+
+
+def test_collection_versions_and_rollback(monkeypatch, tmp_path):
+    from app.core import collection_aliases
+
+    store = collection_aliases.AliasStore(str(tmp_path))
+    monkeypatch.setattr(
+        "app.services.collections_service.get_alias_store", lambda: store
+    )
+    store.promote("docs", "docs__v1")
+    store.promote("docs", "docs__v2")
+
+    resp = client.get("/admin/collections/docs/versions")
     assert resp.status_code == 200
+    assert resp.json()["current"] == "docs__v2"
+    assert [v["name"] for v in resp.json()["versions"]] == ["docs__v1", "docs__v2"]
 
-    data = resp.json()
-    assert data["collection"] == "docs"
-    assert data["total_chunks"] == 42
+    resp = client.post("/admin/collections/docs/rollback")
+    assert resp.status_code == 200
+    assert resp.json()["current"] == "docs__v1"
+
+    resp = client.post("/admin/collections/other/rollback")
+    assert resp.status_code == 409
+
+
+def test_documents_of_missing_collection_returns_503():
+    resp = client.get("/admin/documents", params={"collection": "never-built"})
+
+    assert resp.status_code == 503
+    assert "never-built" in resp.json()["detail"]
+
+
+def test_stats_endpoint_reports_disabled_components_as_null(
+    no_answer_cache, no_embedding_cache, no_embed_microbatch
+):
+    resp = client.get("/admin/stats")
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["embed_batcher"] is None
+    assert body["embedding_cache"] is None
+    assert body["answer_cache"] is None
+    assert body["single_flight"]["in_flight"] == 0
+
+
+def test_migrate_dimensions_endpoint_runs_job_in_background(monkeypatch, tmp_path):
+    from app.scripts import migrate_dimensions
+
+    manager = _fresh_job_manager(monkeypatch, tmp_path)
+
+    async def fake_migrate(collection_name, dimensions, reembed, on_progress, **_):
+        assert (collection_name, dimensions, reembed) == ("docs", 256, False)
+        on_progress(
+            migrate_dimensions.MigrationProgress(chunks_total=10, chunks_done=10)
+        )
+        return "docs__v1"
+
+    monkeypatch.setattr(migrate_dimensions, "migrate_dimensions", fake_migrate)
+
+    with TestClient(app) as test_client:
+        resp = test_client.post(
+            "/admin/collections/docs/migrate-dimensions",
+            json={"dimensions": 256, "reembed": False},
+        )
+        assert resp.status_code == 202
+        assert resp.json()["kind"] == "migrate_dimensions"
+
+        job = _wait_for_job(test_client, resp.json()["id"], {"succeeded", "failed"})
+        assert job["status"] == "succeeded", job
+        assert job["chunks_total"] == job["chunks_embedded"] == 10
+
+    # History reloads with the right request type
+    async def _reload():
+        reloaded = type(manager)(store_path=manager.store_path)
+        await reloaded.start()
+        try:
+            return await reloaded.get_job(job["id"])
+        finally:
+            reloaded.release()
+
+    assert asyncio.run(_reload()).request.dimensions == 256
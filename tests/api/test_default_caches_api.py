@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.core import retrieval, vector_store
+from app.main import app
+from app.services import openai_service
+
+# The answer cache, the embedding cache and the embedding micro-batcher are
+# all on, as in production: only the OpenAI client and the vector store are
+# faked.
+
+
+class _FakeStore:
+    backend = "fake"
+
+    async def aquery(self, collection_name, embedding, k, where):
+        return [
+            vector_store.SearchHit(
+                id="doc1",
+                document="FastAPI is a web framework.",
+                distance=0.1,
+                metadata={"source": "docs.md", "filename": "docs.md"},
+            )
+        ]
+
+
+def _fake_openai(monkeypatch):
+    async def create_embeddings(model, input, **_):
+        texts = [input] if isinstance(input, str) else input
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(t)), 1.0])
+            for i, t in enumerate(texts)
+        ]
+        return SimpleNamespace(data=data, model=model, usage=None)
+
+    choice = SimpleNamespace(
+        message=SimpleNamespace(
+            content="ANSWER:\nA web framework [0].\nSUMMARY:\n- web"
+        )
+    )
+    fake_client = SimpleNamespace(
+        embeddings=SimpleNamespace(create=AsyncMock(side_effect=create_embeddings)),
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(
+                create=AsyncMock(
+                    return_value=SimpleNamespace(
+                        choices=[choice], model="chat-model", usage=None
+                    )
+                )
+            )
+        ),
+    )
+    monkeypatch.setattr(openai_service, "client", fake_client)
+    monkeypatch.setattr(retrieval, "_collection_dimensions", lambda _name: None)
+    monkeypatch.setattr(vector_store, "get_vector_store", lambda _name: _FakeStore())
+    return fake_client
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+@pytest.mark.asyncio
+async def test_embed_batches_concurrent_requests_and_caches_them(monkeypatch):
+    fake_client = _fake_openai(monkeypatch)
+
+    async with _client() as client:
+        first = await asyncio.gather(
+            client.post("/embed", json={"text": "a"}),
+            client.post("/embed", json={"text": "bb"}),
+        )
+        again = await client.post("/embed", json={"text": "bb"})
+        stats = (await client.get("/admin/stats")).json()
+
+    assert [r.json()["embedding"] for r in first] == [[1.0, 1.0], [2.0, 1.0]]
+    assert again.json()["embedding"] == [2.0, 1.0]
+    # Both texts went upstream in one call; the repeat came from the cache
+    (call,) = fake_client.embeddings.create.await_args_list
+    assert sorted(call.kwargs["input"]) == ["a", "bb"]
+    assert stats["embed_batcher"]["batches"] == 1
+    assert stats["embed_batcher"]["items"] == 2
+    assert stats["embedding_cache"]["hits"] == 1
+    assert stats["embedding_cache"]["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rag_query_is_answered_from_the_answer_cache(monkeypatch):
+    fake_client = _fake_openai(monkeypatch)
+    question = {"question": "What is FastAPI?", "top_k": 3}
+
+    async with _client() as client:
+        first = await client.post("/rag-query", json=question)
+        second = await client.post("/rag-query", json=question)
+        stats = (await client.get("/admin/stats")).json()
+
+    assert first.status_code == 200, first.text
+    assert first.json()["answer"] == "A web framework [0]."
+    assert first.json()["cached"] is False
+    assert second.json() == {**first.json(), "cached": True}
+    fake_client.chat.completions.create.assert_awaited_once()
+    # The question was embedded once, through the batcher; the second
+    # lookup hit the embedding cache
+    fake_client.embeddings.create.assert_awaited_once()
+    assert stats["embed_batcher"]["items"] == 1
+    assert stats["embedding_cache"]["hits"] == 1
+    assert stats["answer_cache"]["hits"] == 1
+    assert stats["answer_cache"]["misses"] == 1
@@ -1,5 +1,7 @@
+import pytest
 from fastapi.testclient import TestClient
 
+from app.core import vector_codec
 from app.main import app
 
 client = TestClient(app)
@@ -20,3 +22,108 @@ def test_embed_endpoint(monkeypatch):
 
     data = response.json()
     assert data.get("embedding") == [0.1, 0.2, 0.3]
+
+
+def test_embed_refuses_text_over_the_token_limit(monkeypatch):
+    from app.core.config import get_settings
+
+    async def mock_embed_text(_request, text: str):
+        raise AssertionError("must not be embedded")
+
+    monkeypatch.setattr("app.services.openai_service.embed_text", mock_embed_text)
+    monkeypatch.setattr(get_settings(), "embed_max_input_tokens", 5)
+
+    response = client.post("/embed", json={"text": "word " * 50})
+
+    assert response.status_code == 413
+    assert "at most 5" in response.json()["detail"]
+
+
+def _mock_embed_texts(monkeypatch, seen):
+    async def mock_embed_texts(_request, texts, dimensions=None):
+        seen.append((list(texts), dimensions))
+        return [[float(len(t)), 0.5, -1.0] for t in texts]
+
+    monkeypatch.setattr("app.services.openai_service.embed_texts", mock_embed_texts)
+
+
+def test_embed_batch_json_floats(monkeypatch):
+    seen = []
+    _mock_embed_texts(monkeypatch, seen)
+
+    response = client.post("/embed/batch", json={"texts": ["a", "bb"]})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["count"] == 2
+    assert data["dimensions"] == 3
+    assert data["encoding"] == "float"
+    assert data["embeddings"] == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+    assert seen == [(["a", "bb"], None)]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_embed_batch_base64(monkeypatch, dtype):
+    seen = []
+    _mock_embed_texts(monkeypatch, seen)
+
+    response = client.post(
+        "/embed/batch",
+        json={
+            "texts": ["a", "bb"],
+            "encoding": "base64",
+            "dtype": dtype,
+            "dimensions": 3,
+        },
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["encoding"] == "base64"
+    assert data["dtype"] == dtype
+    rows = [vector_codec.decode_base64_row(row, dtype) for row in data["embeddings"]]
+    assert [row.tolist() for row in rows] == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+    assert seen == [(["a", "bb"], 3)]
+
+
+def test_embed_batch_octet_stream(monkeypatch):
+    _mock_embed_texts(monkeypatch, [])
+
+    response = client.post(
+        "/embed/batch",
+        json={"texts": ["a", "bb"], "dtype": "float16"},
+        headers={"Accept": "application/octet-stream"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["x-embedding-shape"] == "2,3"
+    assert response.headers["x-embedding-dtype"] == "float16"
+
+    matrix = vector_codec.decode_matrix_bytes(response.content, (2, 3), "float16")
+    assert matrix.tolist() == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+
+
+def test_embed_batch_rejects_empty_list():
+    response = client.post("/embed/batch", json={"texts": []})
+    assert response.status_code == 422
+
+
+def test_embed_batch_splits_by_token_budget_and_uses_the_cache(monkeypatch, tmp_path):
+    from app.core.config import get_settings
+    from app.core.embedding_cache import EmbeddingCache
+    from app.services import embedding_service
+
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("cached", [7.0, 0.5, -1.0], model=get_settings().openai_embed_model)
+    monkeypatch.setattr(embedding_service, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(get_settings(), "embed_batch_max_tokens", 3)
+    seen = []
+    _mock_embed_texts(monkeypatch, seen)
+
+    texts = ["one two three", "four five six", "cached"]
+    response = client.post("/embed/batch", json={"texts": texts})
+
+    assert response.status_code == 200
+    assert response.json()["embeddings"][2] == [7.0, 0.5, -1.0]
+    assert seen == [(["one two three"], None), (["four five six"], None)]
+    cache.close()
@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_metrics_endpoint_reports_request_latency_by_route():
+    assert client.get("/health").status_code == 200
+    assert client.get("/no-such-route").status_code == 404
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",'
+        'status="200"}'
+    ) in body
+    assert 'route="unmatched",status="404"' in body
+    for name in (
+        "llm_request_duration_seconds",
+        "vector_query_duration_seconds",
+        "chroma_write_duration_seconds",
+        "ingest_chunks_per_second",
+    ):
+        assert f"# TYPE {name} histogram" in body
@@ -1,3 +1,4 @@
+import json
 from typing import Any
 
 from fastapi.testclient import TestClient
@@ -8,7 +9,7 @@ from app.models.chunk import ChunkMetadata, TextChunk
 client = TestClient(app)
 
 
-def test_rag_query_basic(monkeypatch):
+def test_rag_query_basic(monkeypatch, no_answer_cache):
     # mock search_chunks
 
     async def fake_search_chunks(
@@ -17,6 +18,7 @@ def test_rag_query_basic(monkeypatch):
         filename: str,
         metadata_filter: dict[str, Any],
         k: int = 4,
+        query_embedding=None,
     ):
         return [
             TextChunk(
@@ -29,7 +31,7 @@ def test_rag_query_basic(monkeypatch):
         ]
 
     # mock chat_completion
-    async def fake_chat_completion(_request, prompt: str) -> str:
+    async def fake_chat_completion(_request, prompt: str, **_) -> str:
         assert "FastAPI" in prompt
         assert "Question:" in prompt
         return (
@@ -52,3 +54,68 @@ def test_rag_query_basic(monkeypatch):
     assert "answer" in body
     assert "FastAPI" in body["answer"]
     assert len(body["sources"]) == 1
+
+
+def _read_sse(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_rag_query_stream_emits_sources_first(monkeypatch):
+    async def fake_search_chunks(http_request, query, k=4, **_):
+        return [
+            TextChunk(
+                id="doc1",
+                text="FastAPI is a modern web framework.",
+                score=0.9,
+                metadata=ChunkMetadata(source="docs.md", filename="docs.md"),
+            )
+        ]
+
+    async def fake_stream_chat_llm(_request, prompt: str, **_):
+        yield "ANSWER: FastAPI is "
+        yield "a framework.\nSUMMARY: - web"
+
+    from app.core import retrieval
+    from app.services import openai_service
+
+    monkeypatch.setattr(retrieval, "search_chunks", fake_search_chunks)
+    monkeypatch.setattr(openai_service, "stream_chat_llm", fake_stream_chat_llm)
+
+    with client.stream(
+        "POST", "/rag-query/stream", json={"question": "What is FastAPI?"}
+    ) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = _read_sse(resp.read().decode())
+
+    assert [name for name, _ in events] == [
+        "sources",
+        "answer",
+        "answer",
+        "summary",
+        "done",
+    ]
+    assert events[0][1]["sources"][0]["metadata"]["filename"] == "docs.md"
+    assert "".join(d["delta"] for n, d in events if n == "answer") == (
+        "FastAPI is a framework."
+    )
+
+
+def test_rag_query_stream_reports_errors_as_event(monkeypatch):
+    async def failing_search_chunks(http_request, query, k=4, **_):
+        raise RuntimeError("vector store down")
+
+    from app.core import retrieval
+
+    monkeypatch.setattr(retrieval, "search_chunks", failing_search_chunks)
+
+    with client.stream(
+        "POST", "/rag-query/stream", json={"question": "What is FastAPI?"}
+    ) as resp:
+        events = _read_sse(resp.read().decode())
+
+    assert events == [("error", {"detail": "Internal server error"})]
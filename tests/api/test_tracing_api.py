@@ -0,0 +1,128 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from app.core import retrieval, tracing, vector_store
+from app.core.config import get_settings
+from app.main import app
+from app.services import openai_service
+
+client = TestClient(app)
+
+
+class _FakeStore:
+    backend = "fake"
+
+    async def aquery(self, collection_name, embedding, k, where):
+        return [
+            vector_store.SearchHit(
+                id="doc1",
+                document="FastAPI is a web framework.",
+                distance=0.1,
+                metadata={"source": "docs.md", "filename": "docs.md"},
+            )
+        ]
+
+
+def _fake_rag_pipeline(monkeypatch):
+    async def fake_embed_text(_request, text, dimensions=None):
+        return [1.0, 0.0]
+
+    fake_choice = MagicMock()
+    fake_choice.message.content = "ANSWER:\nA web framework [0].\nSUMMARY:\n- web"
+    fake_response = MagicMock(choices=[fake_choice], model="chat-model", usage=None)
+    fake_client = MagicMock()
+    fake_client.chat.completions.create = AsyncMock(return_value=fake_response)
+
+    monkeypatch.setattr(retrieval, "_collection_dimensions", lambda _name: None)
+    monkeypatch.setattr(retrieval.openai_service, "embed_text", fake_embed_text)
+    monkeypatch.setattr(vector_store, "get_vector_store", lambda _name: _FakeStore())
+    monkeypatch.setattr(openai_service, "client", fake_client)
+
+
+def test_rag_query_spans_are_logged_and_sent_as_server_timing(
+    monkeypatch, no_answer_cache
+):
+    # Without the answer cache the query is embedded inside "retrieve"
+    _fake_rag_pipeline(monkeypatch)
+
+    records = []
+    sink_id = logger.add(lambda msg: records.append(msg.record))
+    try:
+        resp = client.post(
+            "/rag-query", json={"question": "What is FastAPI?", "top_k": 3}
+        )
+    finally:
+        logger.remove(sink_id)
+
+    assert resp.status_code == 200
+    timing = resp.headers["Server-Timing"]
+    for stage in ("retrieve", "embed_query", "vector_query", "chat_completion"):
+        assert f"{stage};dur=" in timing
+    assert "total;dur=" in timing
+
+    (record,) = [r for r in records if r["message"] == "request_completed"]
+    spans = record["extra"]["spans"]
+    names = [s["name"] for s in spans]
+    assert names == [
+        "retrieve",
+        "embed_query",
+        "vector_query",
+        "pack_context",
+        "generate",
+        "chat_completion",
+        "parse_answer",
+    ]
+    by_name = {s["name"]: s for s in spans}
+    assert by_name["embed_query"]["parent"] == names.index("retrieve")
+    assert by_name["chat_completion"]["parent"] == names.index("generate")
+    assert by_name["vector_query"]["attributes"] == {
+        "backend": "fake",
+        "k": 3,
+        "hits": 1,
+    }
+    assert by_name["chat_completion"]["attributes"]["deduplicated"] is False
+
+
+def test_tracing_can_be_disabled(monkeypatch):
+    _fake_rag_pipeline(monkeypatch)
+    monkeypatch.setattr(get_settings(), "tracing_enabled", False)
+
+    resp = client.post("/rag-query", json={"question": "What is FastAPI?"})
+
+    assert resp.status_code == 200
+    assert resp.headers["Server-Timing"].startswith("total;dur=")
+
+
+def test_spans_are_exported_as_one_otel_trace(monkeypatch):
+    # The OTel SDK is an optional install (requirements-otel.txt)
+    in_memory = pytest.importorskip(
+        "opentelemetry.sdk.trace.export.in_memory_span_exporter"
+    )
+    InMemorySpanExporter = in_memory.InMemorySpanExporter
+    _fake_rag_pipeline(monkeypatch)
+    monkeypatch.setattr(get_settings(), "otel_export_enabled", True)
+    exporter = InMemorySpanExporter()
+    tracing.init_otel(exporter)
+    try:
+        resp = client.post("/rag-query", json={"question": "What is FastAPI?"})
+    finally:
+        # Flushes the batch processor
+        tracing.shutdown_tracing()
+
+    assert resp.status_code == 200
+
+    exported = {s.name: s for s in exporter.get_finished_spans()}
+    root = exported["POST /rag-query"]
+    assert root.parent is None
+    assert root.attributes["http.response.status_code"] == 200
+    assert {s.context.trace_id for s in exported.values()} == {root.context.trace_id}
+    assert exported["retrieve"].parent.span_id == root.context.span_id
+    assert (
+        exported["vector_query"].parent.span_id == exported["retrieve"].context.span_id
+    )
+    assert exported["vector_query"].attributes["backend"] == "fake"
+    assert root.start_time <= exported["retrieve"].start_time
+    assert exported["parse_answer"].end_time <= root.end_time
@@ -0,0 +1,95 @@
+import random
+
+import httpx
+import numpy as np
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from benchmarks.fake_openai import FakeConfig, Latency, create_app, fake_embedding
+
+
+def _client(config: FakeConfig) -> AsyncOpenAI:
+    transport = httpx.ASGITransport(app=create_app(config))
+    return AsyncOpenAI(
+        api_key="fake",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=transport),
+        max_retries=0,
+    )
+
+
+def test_latency_specs_parse_and_sample():
+    rng = random.Random(0)
+    assert Latency.parse("fixed:250").sample(rng) == 0.25
+    low, high = 0.01, 0.02
+    assert low <= Latency.parse("uniform:10:20").sample(rng) <= high
+    samples = [Latency.parse("lognormal:100:0.5").sample(rng) for _ in range(2000)]
+    assert 0.09 < float(np.median(samples)) < 0.11
+    with pytest.raises(ValueError):
+        Latency.parse("gamma:1")
+
+
+def test_fake_embeddings_are_deterministic_unit_vectors():
+    a = np.array(fake_embedding("refund policy for orders", 64))
+    b = np.array(fake_embedding("the refund policy", 64))
+    c = np.array(fake_embedding("kubernetes node pools", 64))
+
+    assert np.linalg.norm(a) == pytest.approx(1.0)
+    assert a.tolist() == fake_embedding("refund policy for orders", 64)
+    assert a @ b > a @ c
+
+
+@pytest.mark.asyncio
+async def test_openai_client_reads_chat_and_embeddings():
+    client = _client(FakeConfig(completion_tokens=10, embedding_dimensions=32))
+
+    reply = await client.chat.completions.create(
+        model="gpt-test", messages=[{"role": "user", "content": "hello there"}]
+    )
+    assert reply.choices[0].message.content.startswith("ANSWER:")
+    assert "SUMMARY:" in reply.choices[0].message.content
+    assert reply.usage.completion_tokens == 10
+
+    # The client asks for base64 by default and decodes it
+    embeddings = await client.embeddings.create(
+        model="text-embedding-3-small", input=["one", "two words"]
+    )
+    assert [len(item.embedding) for item in embeddings.data] == [32, 32]
+    assert embeddings.data[1].embedding == pytest.approx(
+        fake_embedding("two words", 32), abs=1e-6
+    )
+    shortened = await client.embeddings.create(
+        model="text-embedding-3-small", input="one", dimensions=8
+    )
+    assert len(shortened.data[0].embedding) == 8
+
+
+@pytest.mark.asyncio
+async def test_streamed_chat_sends_tokens_then_usage():
+    client = _client(FakeConfig(completion_tokens=8, tokens_per_second=0))
+
+    stream = await client.chat.completions.create(
+        model="gpt-test",
+        messages=[{"role": "user", "content": "stream please"}],
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    content, usage = [], None
+    async for chunk in stream:
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            content.append(chunk.choices[0].delta.content)
+
+    assert len(content) == 8
+    assert "".join(content).startswith("ANSWER:")
+    assert usage.completion_tokens == 8
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_reach_the_caller():
+    client = _client(FakeConfig(error_rate=1.0, error_status=503))
+
+    with pytest.raises(openai.InternalServerError):
+        await client.embeddings.create(model="text-embedding-3-small", input="x")
@@ -0,0 +1,102 @@
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from app.main import app
+from app.scripts.ingest import ingest_files
+from app.services import openai_service
+from benchmarks import load
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_openai import FakeConfig, create_app
+
+
+def test_summarize_reports_percentiles_and_errors():
+    samples = [load.Sample(i / 1000, 200) for i in range(1, 101)]
+    samples += [load.Sample(0.5, 500), load.Sample(0.5, 0)]
+
+    row = load.summarize(samples, wall_seconds=2.0)
+
+    assert row["requests"] == 102
+    assert row["errors"] == 2
+    assert row["error_rate"] == pytest.approx(2 / 102, abs=1e-4)
+    assert row["throughput_rps"] == 50.0
+    assert row["p50_ms"] == pytest.approx(50.5)
+    assert row["p99_ms"] == pytest.approx(99.01)
+    assert row["first_byte_p50_ms"] is None
+
+
+def test_compare_flags_regressions_only_past_the_threshold():
+    def row(p95, rps, errors=0.0):
+        return {
+            "endpoint": "ask",
+            "concurrency": 8,
+            "p95_ms": p95,
+            "throughput_rps": rps,
+            "error_rate": errors,
+        }
+
+    assert load.compare([row(110, 95)], [row(100, 100)], 0.2) == []
+    problems = load.compare([row(130, 70, 0.05)], [row(100, 100)], 0.2)
+    assert [p.split(":")[1].split()[0] for p in problems] == [
+        "p95",
+        "throughput",
+        "error",
+    ]
+
+
+def test_corpus_is_deterministic(tmp_path):
+    first = generate_corpus(str(tmp_path / "a"), docs=3, words=50, questions=4)
+    second = generate_corpus(str(tmp_path / "b"), docs=3, words=50, questions=4)
+
+    assert len(first) == 3
+    for a, b in zip(first, second):
+        assert open(a).read() == open(b).read()
+    assert len(open(first[0]).read().split()) >= 50
+    questions = (tmp_path / "a" / "questions.txt").read_text().splitlines()
+    assert len(questions) == 4
+    assert json.loads((tmp_path / "a" / "corpus.json").read_text())["docs"] == 3
+
+
+@pytest.mark.asyncio
+async def test_load_run_against_app_backed_by_fake_openai(monkeypatch, tmp_path):
+    fake = httpx.ASGITransport(
+        app=create_app(FakeConfig(embedding_dimensions=16, tokens_per_second=0))
+    )
+    monkeypatch.setattr(
+        openai_service,
+        "client",
+        AsyncOpenAI(
+            api_key="fake",
+            base_url="http://fake/v1",
+            http_client=httpx.AsyncClient(transport=fake),
+        ),
+    )
+    # /rag-query answers 503 until the collection exists
+    paths = generate_corpus(str(tmp_path), docs=2, words=60, questions=1)
+    await ingest_files(paths, collection_name="docs")
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://app"
+    ) as client:
+        results = await load.run_load(
+            client,
+            ["ask", "embed", "stream-chat", "rag-query"],
+            concurrency_levels=[1, 4],
+            requests=8,
+            questions=load.DEFAULT_QUESTIONS,
+            warmup=1,
+        )
+
+    assert [(r["endpoint"], r["concurrency"]) for r in results] == [
+        (name, c)
+        for name in ("ask", "embed", "stream-chat", "rag-query")
+        for c in (1, 4)
+    ]
+    for row in results:
+        assert row["requests"] == 8
+        assert row["error_rate"] == 0.0, row
+        assert row["p50_ms"] is not None
+    stream_rows = [r for r in results if r["endpoint"] == "stream-chat"]
+    assert all(r["first_byte_p50_ms"] is not None for r in stream_rows)
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from app.core.doc_loader import load_document_pages
+from benchmarks import text_pipeline
+
+
+def test_parse_size():
+    assert text_pipeline.parse_size("512KB") == 512 * 1024
+    assert text_pipeline.parse_size("1gb") == 1024**3
+    assert text_pipeline.parse_size("1.5MB") == int(1.5 * 1024**2)
+    with pytest.raises(Exception):
+        text_pipeline.parse_size("12 parsecs")
+
+
+def test_generated_text_needs_cleaning(tmp_path):
+    path = text_pipeline.generate_text_file(str(tmp_path / "t.txt"), 64 * 1024)
+
+    raw = open(path, encoding="utf-8").read()
+    assert len(raw.encode("utf-8")) >= 64 * 1024
+    assert "   " in raw
+    ((page, cleaned),) = load_document_pages(path)
+    assert page == 1
+    assert "  " not in cleaned
+    assert len(cleaned) < len(raw)
+
+
+def test_generated_pdf_is_readable_page_by_page(tmp_path):
+    path = text_pipeline.generate_pdf_file(str(tmp_path / "p.pdf"), pages=4)
+
+    pages = load_document_pages(path)
+
+    assert [number for number, _ in pages] == [1, 2, 3, 4]
+    assert all(len(text.split()) >= 400 for _, text in pages)
+
+
+def test_compare_flags_throughput_drops_past_threshold():
+    baseline = [
+        {"case": "clean_text", "input": "txt:1MB", "mb_per_s": 20.0},
+        {"case": "chunk_text", "input": "txt:1MB", "mb_per_s": 20.0},
+    ]
+    results = [
+        {"case": "clean_text", "input": "txt:1MB", "mb_per_s": 18.0},
+        {"case": "chunk_text", "input": "txt:1MB", "mb_per_s": 15.0},
+        {"case": "chunk_text", "input": "txt:2MB", "mb_per_s": 1.0},
+    ]
+
+    (problem,) = text_pipeline.compare(results, baseline, threshold=0.15)
+
+    assert problem.startswith("chunk_text [txt:1MB]")
+
+
+def test_run_saves_baseline_then_passes_against_it(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    argv = [
+        "--sizes",
+        "64KB",
+        "--pdf-pages",
+        "2",
+        "--repeat",
+        "1",
+        "--data-dir",
+        str(tmp_path / "data"),
+        "--baseline",
+        str(baseline),
+    ]
+
+    assert text_pipeline.run(text_pipeline.parse_args(argv + ["--save-baseline"])) == 0
+    report = json.loads(baseline.read_text())
+    cases = {(r["case"], r["input"]) for r in report["results"]}
+    assert cases == {
+        ("load_document_pages", "txt:64KB"),
+        ("clean_text", "txt:64KB"),
+        ("chunk_text", "txt:64KB"),
+        ("semantic_chunk_text_with_overlap", "txt:64KB"),
+        ("load_document_pages", "pdf:2p"),
+    }
+    assert all(r["mb_per_s"] > 0 and r["peak_mb"] > 0 for r in report["results"])
+
+    # An impossibly fast baseline makes the next run fail
+    for row in report["results"]:
+        row["mb_per_s"] *= 1000
+    baseline.write_text(json.dumps(report))
+    assert text_pipeline.run(text_pipeline.parse_args(argv)) == 1
+    assert "Throughput regressions" in capsys.readouterr().out
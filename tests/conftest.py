@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+import pytest
+
+# Keep the test suite hermetic: no writes into ./chroma_db or
+# ./embedding_cache. Caches, micro-batching and parse workers keep their
+# production defaults; tests that need one off ask for the fixtures below.
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="chroma-test-"))
+os.environ.setdefault(
+    "EMBEDDING_CACHE_DIR", tempfile.mkdtemp(prefix="embedding-cache-test-")
+)
+
+from app.core.answer_cache import get_answer_cache  # noqa: E402
+from app.core.config import get_settings  # noqa: E402
+from app.core.embedding_cache import shutdown_embedding_cache  # noqa: E402
+
+
+def _reset_caches() -> None:
+    shutdown_embedding_cache()
+    get_answer_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches(tmp_path_factory, monkeypatch):
+    """Every test starts with empty caches, so none sees another's entries."""
+    cache_dir = tmp_path_factory.mktemp("embedding-cache")
+    monkeypatch.setattr(get_settings(), "embedding_cache_dir", str(cache_dir))
+    _reset_caches()
+    yield
+    _reset_caches()
+
+
+@pytest.fixture
+def no_answer_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "answer_cache_enabled", False)
+    get_answer_cache.cache_clear()
+
+
+@pytest.fixture
+def no_embedding_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "embedding_cache_enabled", False)
+    shutdown_embedding_cache()
+
+
+@pytest.fixture
+def no_embed_microbatch(monkeypatch):
+    monkeypatch.setattr(get_settings(), "embed_microbatch_enabled", False)
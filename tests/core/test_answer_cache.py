@@ -0,0 +1,82 @@
+from app.core import answer_cache
+from app.core.answer_cache import SemanticAnswerCache
+from app.models.rag import RagAnswer
+
+
+def _answer(text: str) -> RagAnswer:
+    return RagAnswer(answer=text, sources=[])
+
+
+def test_hit_above_threshold_and_miss_below():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, threshold=0.9)
+    cache.put("scope", [1.0, 0.0], _answer("first"))
+
+    hit = cache.get("scope", [0.99, 0.05])
+    assert hit.answer == "first"
+    assert hit.cached is True
+    assert cache.get("scope", [0.0, 1.0]) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_closest_entry_wins():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, threshold=0.5)
+    cache.put("scope", [1.0, 0.0], _answer("x"))
+    cache.put("scope", [0.0, 1.0], _answer("y"))
+
+    assert cache.get("scope", [0.2, 0.9]).answer == "y"
+
+
+def test_scopes_are_isolated():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, threshold=0.9)
+    cache.put("docs@v1", [1.0, 0.0], _answer("old build"))
+
+    assert cache.get("docs@v2", [1.0, 0.0]) is None
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, threshold=0.9)
+    cache.put("scope", [1.0, 0.0], _answer("a"))
+
+    now[0] += 61
+    assert cache.get("scope", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(max_entries=2, ttl_seconds=60, threshold=0.99)
+    cache.put("scope", [1.0, 0.0, 0.0], _answer("a"))
+    cache.put("scope", [0.0, 1.0, 0.0], _answer("b"))
+    assert cache.get("scope", [1.0, 0.0, 0.0]).answer == "a"  # a is now recent
+
+    cache.put("scope", [0.0, 0.0, 1.0], _answer("c"))
+
+    assert cache.get("scope", [0.0, 1.0, 0.0]) is None
+    assert cache.get("scope", [1.0, 0.0, 0.0]).answer == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_rows_stay_consistent_through_removal_and_growth():
+    cache = SemanticAnswerCache(max_entries=100, ttl_seconds=60, threshold=0.999)
+    basis = [[1.0 if i == j else 0.0 for j in range(40)] for i in range(40)]
+    for i, vector in enumerate(basis):
+        cache.put("scope", vector, _answer(str(i)))
+
+    # Removing the first row moves the last one into its slot
+    cache._remove(next(iter(cache._order)))
+    assert cache.get("scope", basis[0]) is None
+    assert all(cache.get("scope", basis[i]).answer == str(i) for i in range(1, 40))
+    assert cache.stats()["entries"] == 39
+
+
+def test_new_embedding_width_replaces_the_scope():
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, threshold=0.9)
+    cache.put("scope", [1.0, 0.0], _answer("narrow"))
+
+    assert cache.get("scope", [1.0, 0.0, 0.0]) is None
+    cache.put("scope", [1.0, 0.0, 0.0], _answer("wide"))
+
+    assert cache.get("scope", [1.0, 0.0, 0.0]).answer == "wide"
+    assert cache.stats()["entries"] == 1
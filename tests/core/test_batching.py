@@ -0,0 +1,47 @@
+import pytest
+
+from app.core.batching import batch_ranges, estimate_tokens
+
+
+def test_estimate_tokens_is_at_least_one():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 40) == 10
+
+
+def test_batch_ranges_splits_by_item_count():
+    texts = ["word"] * 5
+
+    assert batch_ranges(texts, max_items=2, max_tokens=1000) == [
+        (0, 2),
+        (2, 4),
+        (4, 5),
+    ]
+
+
+def test_batch_ranges_splits_by_token_budget():
+    # 40 chars ~= 10 tokens each
+    texts = ["a" * 40] * 4
+
+    assert batch_ranges(texts, max_items=100, max_tokens=25) == [(0, 2), (2, 4)]
+
+
+def test_batch_ranges_keeps_oversized_text_in_its_own_batch():
+    texts = ["a" * 4, "a" * 400, "a" * 4]
+
+    assert batch_ranges(texts, max_items=100, max_tokens=10) == [
+        (0, 1),
+        (1, 2),
+        (2, 3),
+    ]
+
+
+def test_batch_ranges_empty_input():
+    assert batch_ranges([], max_items=10, max_tokens=10) == []
+
+
+def test_batch_ranges_invalid_params():
+    with pytest.raises(ValueError):
+        batch_ranges(["a"], max_items=0, max_tokens=10)
+
+    with pytest.raises(ValueError):
+        batch_ranges(["a"], max_items=10, max_tokens=0)
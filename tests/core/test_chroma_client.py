@@ -0,0 +1,59 @@
+import pytest
+
+from app.core.chroma_client import ChromaRegistry, CollectionUnavailableError
+
+
+def test_registry_reuses_client_per_path(tmp_path):
+    registry = ChromaRegistry()
+    try:
+        first = registry.get_client(str(tmp_path / "a"))
+        second = registry.get_client(str(tmp_path / "a"))
+        other = registry.get_client(str(tmp_path / "b"))
+
+        assert first is second
+        assert other is not first
+    finally:
+        registry.close()
+
+
+def test_registry_caches_collection_handles(tmp_path):
+    registry = ChromaRegistry()
+    db_path = str(tmp_path)
+    try:
+        first = registry.get_collection("docs", db_path, create=True)
+        second = registry.get_collection("docs", db_path)
+
+        assert first is second
+    finally:
+        registry.close()
+
+
+def test_delete_collection_invalidates_cached_handle(tmp_path):
+    registry = ChromaRegistry()
+    db_path = str(tmp_path)
+    try:
+        old = registry.get_collection("docs", db_path, create=True)
+        old.add(ids=["a"], embeddings=[[0.1, 0.2]], documents=["a"])
+
+        registry.delete_collection("docs", db_path)
+        with pytest.raises(CollectionUnavailableError):
+            registry.get_collection("docs", db_path)
+        new = registry.get_collection("docs", db_path, create=True)
+
+        assert new is not old
+        assert new.id != old.id
+        assert new.count() == 0
+    finally:
+        registry.close()
+
+
+def test_reads_never_create_collections(tmp_path):
+    registry = ChromaRegistry()
+    db_path = str(tmp_path)
+    try:
+        with pytest.raises(CollectionUnavailableError, match="missing"):
+            registry.get_collection("missing", db_path)
+
+        assert not registry.collection_exists("missing", db_path)
+    finally:
+        registry.close()
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+import chromadb
+import httpx
+import pytest
+
+from app.core import chroma_client, retrieval, vector_store
+from app.core.collection_aliases import (
+    ALIAS_COLLECTION,
+    ServerAliasStore,
+    get_alias_store,
+)
+from app.core.config import get_settings
+from app.scripts import ingest
+from app.services import collections_service, openai_service
+from app.services.documents_service import list_documents
+
+
+def _chroma_executable():
+    local = os.path.join(os.path.dirname(sys.executable), "chroma")
+    return local if os.path.exists(local) else shutil.which("chroma")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def chroma_server(tmp_path_factory):
+    """A local `chroma run` server; the module is skipped when none starts."""
+    executable = _chroma_executable()
+    if executable is None:
+        pytest.skip("chroma CLI not installed")
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [executable, "run", "--path", str(tmp_path_factory.mktemp("chroma-srv"))]
+        + ["--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/api/v2/heartbeat", timeout=1)
+                break
+            except httpx.HTTPError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    pytest.skip("chroma server did not start")
+                time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@pytest.fixture
+def http_mode(monkeypatch, chroma_server):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "chroma_mode", "http")
+    monkeypatch.setattr(settings, "chroma_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "chroma_port", chroma_server)
+    monkeypatch.setattr(settings, "chroma_http_max_connections", 4)
+    yield settings
+    chroma_client.invalidate_collection()
+
+
+async def _fake_embed_texts(_request, texts, dimensions=None):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+async def _fake_embed_text(_request, text, dimensions=None):
+    return [float(len(text)), 1.0]
+
+
+def test_http_client_is_shared(http_mode):
+    client = chroma_client.get_chroma_client()
+
+    assert client.heartbeat() > 0
+    assert chroma_client.get_chroma_client() is client
+
+
+@pytest.mark.asyncio
+async def test_http_queries_give_up_after_the_timeout(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "chroma_mode", "http")
+    monkeypatch.setattr(settings, "chroma_http_timeout_seconds", 0.01)
+    store = vector_store.ChromaVectorStore()
+
+    async def _hang(*_args):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(store, "_aquery_http", _hang)
+    with pytest.raises(asyncio.TimeoutError):
+        await store.aquery("docs", [1.0, 0.0], 1)
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_share_aliases_through_the_server(
+    monkeypatch, tmp_path, http_mode
+):
+    monkeypatch.setattr(openai_service, "embed_texts", _fake_embed_texts)
+    doc = tmp_path / "doc.txt"
+    doc.write_text("first version", encoding="utf-8")
+
+    await ingest.ingest_files([str(doc)], collection_name="shared", reset=True)
+    first = get_alias_store().resolve("shared")
+    doc.write_text("second, longer version", encoding="utf-8")
+    await ingest.ingest_files([str(doc)], collection_name="shared", reset=True)
+    second = get_alias_store().resolve("shared")
+    assert first != second
+
+    # Another replica, with nothing on its own disk, sees the same build
+    replica = ServerAliasStore(chroma_client.get_chroma_client)
+    assert replica.resolve("shared") == second
+    remote = chromadb.HttpClient(host="127.0.0.1", port=http_mode.chroma_port)
+    assert "shared" in remote.get_collection(ALIAS_COLLECTION).get()["ids"]
+
+    assert collections_service.rollback("shared") == first
+    assert ServerAliasStore(chroma_client.get_chroma_client).resolve("shared") == first
+    assert collections_service.collect_garbage("shared", grace_seconds=0) == [second]
+
+
+def test_server_aliases_refresh_in_the_background(http_mode):
+    writer = ServerAliasStore(chroma_client.get_chroma_client)
+    reader = ServerAliasStore(chroma_client.get_chroma_client, refresh_seconds=0)
+    writer.promote("refreshed", "refreshed__v1")
+    assert reader.resolve("refreshed") == "refreshed__v1"
+
+    writer.promote("refreshed", "refreshed__v2")
+    deadline = time.monotonic() + 5
+    while reader.resolve("refreshed") != "refreshed__v2":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_ingest_search_and_list_work_against_server(
+    monkeypatch, tmp_path, http_mode
+):
+    monkeypatch.setattr(openai_service, "embed_texts", _fake_embed_texts)
+    monkeypatch.setattr(retrieval.openai_service, "embed_text", _fake_embed_text)
+    short = tmp_path / "short.txt"
+    short.write_text("tiny", encoding="utf-8")
+    long = tmp_path / "long.txt"
+    long.write_text("a noticeably longer document", encoding="utf-8")
+
+    with pytest.raises(chroma_client.CollectionUnavailableError):
+        await retrieval.search_chunks(None, "tiny", "httpdocs", k=1)
+
+    await ingest.ingest_files([str(short), str(long)], collection_name="httpdocs")
+
+    # The chunks live in the server, not in the local persist dir
+    remote = chromadb.HttpClient(host="127.0.0.1", port=http_mode.chroma_port)
+    assert remote.get_collection("httpdocs").count() == 2
+
+    chunks = await retrieval.search_chunks(None, "tinY", "httpdocs", k=1)
+    assert chunks[0].metadata.filename == "short.txt"
+
+    documents = list_documents("httpdocs")
+    assert sorted(doc.filename for doc in documents) == ["long.txt", "short.txt"]
+
+    threaded = await retrieval.search_chunks(None, "tinY", "httpdocs", k=2)
+    monkeypatch.setattr(http_mode, "chroma_async_queries", True)
+    awaited = await retrieval.search_chunks(None, "tinY", "httpdocs", k=2)
+    assert [c.id for c in awaited] == [c.id for c in threaded]
@@ -0,0 +1,86 @@
+import pytest
+
+from app.core import collection_aliases
+from app.core.collection_aliases import AliasStore, new_version_name
+
+
+def test_resolve_without_alias_returns_name(tmp_path):
+    store = AliasStore(str(tmp_path))
+
+    assert store.resolve("docs") == "docs"
+    assert store.is_alias("docs") is False
+
+
+def test_promote_switches_current_and_retires_previous(tmp_path):
+    store = AliasStore(str(tmp_path))
+
+    assert store.promote("docs", "docs__v1") is None
+    assert store.promote("docs", "docs__v2") == "docs__v1"
+
+    assert store.resolve("docs") == "docs__v2"
+    versions = {v["name"]: v for v in store.versions("docs")}
+    assert versions["docs__v2"]["current"] is True
+    assert versions["docs__v1"]["retired_at"] is not None
+
+
+def test_promote_keeps_legacy_collection_as_rollback_target(tmp_path):
+    store = AliasStore(str(tmp_path))
+
+    previous = store.promote("docs", "docs__v1", legacy="docs")
+
+    assert previous == "docs"
+    assert store.rollback("docs") == "docs"
+    assert store.resolve("docs") == "docs"
+
+
+def test_rollback_returns_to_previous_build(tmp_path):
+    store = AliasStore(str(tmp_path))
+    store.promote("docs", "docs__v1")
+    store.promote("docs", "docs__v2")
+
+    assert store.rollback("docs") == "docs__v1"
+    assert store.resolve("docs") == "docs__v1"
+    # Rolling back again goes forward to the build we just left
+    assert store.rollback("docs") == "docs__v2"
+
+
+def test_rollback_without_previous_version_raises(tmp_path):
+    store = AliasStore(str(tmp_path))
+    store.promote("docs", "docs__v1")
+
+    with pytest.raises(LookupError):
+        store.rollback("docs")
+    with pytest.raises(LookupError):
+        store.rollback("unknown")
+
+
+def test_expired_versions_respect_grace_period(tmp_path, monkeypatch):
+    store = AliasStore(str(tmp_path))
+    clock = [1000.0]
+    monkeypatch.setattr(collection_aliases, "_now", lambda: clock[0])
+
+    store.promote("docs", "docs__v1")
+    store.promote("docs", "docs__v2")
+
+    assert store.expired_versions(grace_seconds=60) == []
+
+    clock[0] += 61
+    assert store.expired_versions(grace_seconds=60) == ["docs__v1"]
+
+    store.forget("docs__v1")
+    assert [v["name"] for v in store.versions("docs")] == ["docs__v2"]
+
+
+def test_changes_are_visible_to_other_store_instances(tmp_path):
+    writer = AliasStore(str(tmp_path))
+    reader = AliasStore(str(tmp_path))
+
+    writer.promote("docs", "docs__v1")
+    assert reader.resolve("docs") == "docs__v1"
+
+    writer.promote("docs", "docs__v2")
+    assert reader.resolve("docs") == "docs__v2"
+
+
+def test_new_version_name_is_prefixed_by_alias():
+    assert new_version_name("docs").startswith("docs__v")
@@ -97,3 +97,18 @@ def test_load_document_pages_for_pdf_sample_if_present():
     assert first_page_text.strip() != ""
 
     assert any("FastAPI" in text for _, text in pages)
+
+
+def test_load_document_pages_page_range_matches_full_load():
+    project_tests_dir = Path(__file__).parents[1]  # .../tests
+    pdf_path = project_tests_dir / "data" / "test_fastapi_multipage.pdf"
+
+    if not pdf_path.exists():
+        pytest.skip("Sample PDF not found at tests/data/test_fastapi_multipage.pdf")
+
+    full = load_document_pages(str(pdf_path))
+    split = load_document_pages(str(pdf_path), page_range=(0, 1)) + (
+        load_document_pages(str(pdf_path), page_range=(1, 100))
+    )
+
+    assert split == full
@@ -0,0 +1,294 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from app.core import embedding_cache
+from app.core.embedding_cache import EmbeddingCache, cache_key
+
+
+def test_cache_key_ignores_whitespace_but_not_model_or_dimensions():
+    assert cache_key("hello   world\n", "m1") == cache_key("hello world", "m1")
+    assert cache_key("hello world", "m1") != cache_key("hello world", "m2")
+    assert cache_key("hello world", "m1") != cache_key("hello world", "m1", 256)
+
+
+def test_put_then_get_roundtrip_and_counters(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=10)
+
+    assert cache.get("alpha", model="m") is None
+
+    cache.put_many(["alpha", "beta"], [[0.5, 1.0], [2.0, -1.5]], model="m")
+
+    assert cache.get_many(["beta", "gamma", "alpha"], model="m") == [
+        [2.0, -1.5],
+        None,
+        [0.5, 1.0],
+    ]
+    assert cache.hits == 2
+    assert cache.misses == 2
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    cache.close()
+
+
+def test_cache_persists_across_instances(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("alpha", [1.0, 2.0], model="m")
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get("alpha", model="m") == [1.0, 2.0]
+    reopened.close()
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+
+    cache.put("a", [1.0], model="m")
+    cache.put("b", [2.0], model="m")
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get("a", model="m") == [1.0]
+    cache.put("c", [3.0], model="m")
+
+    assert cache.get("a", model="m") == [1.0]
+    assert cache.get("b", model="m") is None
+    assert cache.get("c", model="m") == [3.0]
+    assert cache.evictions == 1
+    cache.close()
+
+
+def test_eviction_bounds_vector_bytes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=3 * 4 * 4, compact_ratio=1)
+
+    cache.put_many(["a", "b"], [[1.0] * 4, [2.0] * 4], model="m")
+    assert cache.get("a", model="m") == [1.0] * 4
+    cache.put("c", [3.0] * 8, model="m")
+
+    # "b" (least recently used) alone frees enough room for the wider "c"
+    assert cache.get_many(["a", "b", "c"], model="m") == [[1.0] * 4, None, [3.0] * 8]
+    assert cache.stats()["live_bytes"] == 12 * 4
+    cache.close()
+
+
+def test_compaction_runs_once_enough_of_the_file_is_dead(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2, compact_ratio=0.4)
+
+    cache.put_many(["a", "b"], [[1.0] * 4, [2.0] * 4], model="m")
+    cache.put("c", [3.0] * 4, model="m")
+    # One dead vector out of three: below the ratio
+    assert cache.compactions == 0
+    assert cache.dead_bytes() == 4 * 4
+
+    cache.put("d", [4.0] * 4, model="m")
+    cache.wait_for_compaction()
+    assert cache.compactions == 1
+    assert cache.dead_bytes() == 0
+    assert cache.stats()["blob_bytes"] == 2 * 4 * 4
+    assert cache.get_many(["c", "d"], model="m") == [[3.0] * 4, [4.0] * 4]
+    cache.close()
+
+
+def test_compact_reclaims_space_and_keeps_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=100, compact_ratio=1)
+    cache.put_many(["a", "b", "c"], [[1.0] * 4, [2.0] * 4, [3.0] * 4], model="m")
+
+    cache.evict(max_entries=1)
+    reclaimed = cache.compact()
+
+    assert reclaimed == 2 * 4 * 4
+    assert cache.stats()["blob_bytes"] == 4 * 4
+    assert cache.get("c", model="m") == [3.0] * 4
+
+    # Appends after compaction land after the live data
+    cache.put("d", [4.0] * 4, model="m")
+    assert cache.get_many(["c", "d"], model="m") == [[3.0] * 4, [4.0] * 4]
+    cache.close()
+
+
+def test_compaction_is_visible_to_other_instances(tmp_path):
+    writer = EmbeddingCache(str(tmp_path), compact_ratio=1)
+    reader = EmbeddingCache(str(tmp_path))
+
+    writer.put_many(["a", "b"], [[1.0], [2.0]], model="m")
+    assert reader.get("b", model="m") == [2.0]
+
+    writer.delete_model("m")
+    writer.put("b", [5.0], model="m")
+    writer.compact()
+
+    assert reader.get("b", model="m") == [5.0]
+    writer.close()
+    reader.close()
+
+
+def test_lookups_do_not_write_until_usage_is_flushed(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("a", [1.0], model="m")
+    index = sqlite3.connect(str(tmp_path / embedding_cache.INDEX_FILENAME))
+
+    def _last_used():
+        return index.execute("SELECT last_used_at FROM embeddings").fetchone()[0]
+
+    before = _last_used()
+    assert cache.get("a", model="m") == [1.0]
+    assert cache.get("b", model="m") is None
+    assert _last_used() == before
+    assert cache.stats()["hits"] == 1
+
+    cache.flush_usage()
+    assert _last_used() > before
+    assert index.execute("SELECT value FROM meta WHERE name = 'misses'").fetchone() == (
+        1,
+    )
+    index.close()
+    cache.close()
+
+
+def test_failed_lookup_rolls_back_its_transaction(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("a", [1.0], model="m")
+
+    def _broken_pread(*_args):
+        raise OSError("disk gone")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(embedding_cache.os, "pread", _broken_pread)
+        with pytest.raises(OSError):
+            cache.get("a", model="m")
+
+    # The connection is usable again, for reads and writes
+    cache.put("b", [2.0], model="m")
+    assert cache.get_many(["a", "b"], model="m") == [[1.0], [2.0]]
+    cache.close()
+
+
+def test_totals_are_kept_without_recounting(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=3, compact_ratio=1)
+    index = sqlite3.connect(str(tmp_path / embedding_cache.INDEX_FILENAME))
+
+    def _recount():
+        return index.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) * 4 FROM embeddings"
+        ).fetchone()
+
+    cache.put_many(["a", "b"], [[1.0] * 2, [2.0] * 2], model="m")
+    cache.put("a", [1.0] * 4, model="m")  # replaces, wider
+    cache.put_many(["c", "d"], [[3.0], [4.0]], model="other")  # evicts "b"
+    assert cache._totals() == _recount() == (3, 24)
+
+    cache.delete_model("other")
+    assert cache._totals() == _recount() == (1, 16)
+
+    # An index from before the totals were tracked is counted once on open
+    cache.close()
+    index.execute("DELETE FROM meta WHERE name IN ('entries', 'live_bytes')")
+    index.commit()
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened._totals() == (1, 16)
+    index.close()
+    reopened.close()
+
+
+class _PausingConnection:
+    """Runs `hook` just before the compaction takes the write lock."""
+
+    def __init__(self, conn, hook):
+        self._conn, self._hook = conn, hook
+
+    def execute(self, sql, *args):
+        if sql == "BEGIN IMMEDIATE" and self._hook:
+            hook, self._hook = self._hook, None
+            hook()
+        return self._conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_compaction_keeps_writes_made_while_it_copies(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path), compact_ratio=1)
+    other = EmbeddingCache(str(tmp_path), compact_ratio=1)
+    cache.put_many(["a", "b", "gone"], [[1.0], [2.0], [0.0] * 8], model="m")
+    cache.delete_model("m")
+    cache.put_many(["a", "b"], [[1.0], [2.0]], model="m")
+    old_blob = cache._blob_path(0)
+    lookups = []
+
+    def _meanwhile():
+        # Lookups are not blocked by the running compaction
+        reader = threading.Thread(
+            target=lambda: lookups.append(cache.get("a", model="m"))
+        )
+        reader.start()
+        reader.join(timeout=5)
+        other.put("c", [3.0], model="m")
+        other.put("a", [9.0, 9.0], model="m")
+
+    connect = sqlite3.connect
+    monkeypatch.setattr(
+        embedding_cache.sqlite3,
+        "connect",
+        lambda *a, **kw: _PausingConnection(connect(*a, **kw), _meanwhile),
+    )
+    cache.compact()
+    monkeypatch.undo()
+
+    assert lookups == [[1.0]]
+    assert not os.path.exists(old_blob)
+    for instance in (cache, other):
+        assert instance.get_many(["a", "b", "c"], model="m") == [
+            [9.0, 9.0],
+            [2.0],
+            [3.0],
+        ]
+    # The replaced "a" is the only dead vector left
+    assert cache.dead_bytes() == 4
+    other.close()
+    cache.close()
+
+
+def test_lookup_retries_when_its_generation_was_compacted_away(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("a", [1.0], model="m")
+    blob, calls = cache._blob, []
+
+    def _compacted_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise FileNotFoundError("vectors.f32")
+        return blob()
+
+    cache._blob = _compacted_once
+    assert cache.get("a", model="m") == [1.0]
+    assert len(calls) == 2
+    cache.close()
+
+
+def test_app_shutdown_writes_pending_usage(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.core.config import get_settings
+    from app.main import app
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "embedding_cache_enabled", True)
+    monkeypatch.setattr(settings, "embedding_cache_dir", str(tmp_path))
+    embedding_cache.get_embedding_cache.cache_clear()
+
+    with TestClient(app):
+        cache = embedding_cache.get_embedding_cache()
+        assert cache.get("never cached", model="m") is None
+
+    index = sqlite3.connect(str(tmp_path / embedding_cache.INDEX_FILENAME))
+    misses = index.execute("SELECT value FROM meta WHERE name = 'misses'").fetchone()
+    index.close()
+    assert misses == (1,)
+    # Closed and forgotten: the next caller gets a fresh instance
+    monkeypatch.setattr(settings, "embedding_cache_enabled", False)
+    assert embedding_cache.get_embedding_cache() is None
+    embedding_cache.get_embedding_cache.cache_clear()
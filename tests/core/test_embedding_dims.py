@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from app.core import embedding_dims
+
+
+def test_configured_dimensions_per_collection(monkeypatch):
+    settings = embedding_dims.get_settings()
+    monkeypatch.setattr(settings, "embed_dimensions", 1024)
+    monkeypatch.setattr(settings, "collection_embed_dimensions", {"docs": 256})
+
+    assert embedding_dims.configured_dimensions("docs") == 256
+    assert embedding_dims.configured_dimensions("docs__v20250101") == 256
+    assert embedding_dims.configured_dimensions("other") == 1024
+
+
+def test_shorten_truncates_and_normalizes():
+    short = embedding_dims.shorten([3.0, 4.0, 12.0], 2)
+    assert np.allclose(short, [0.6, 0.8])
+
+    with pytest.raises(embedding_dims.DimensionMismatchError):
+        embedding_dims.shorten([1.0, 0.0], 3)
+
+
+def test_adapt_query_vector_adapts_or_refuses(monkeypatch):
+    settings = embedding_dims.get_settings()
+    monkeypatch.setattr(settings, "embed_dimension_mismatch", "adapt")
+    assert len(embedding_dims.adapt_query_vector([1.0, 1.0, 1.0], 2, "docs")) == 2
+
+    monkeypatch.setattr(settings, "embed_dimension_mismatch", "refuse")
+    with pytest.raises(embedding_dims.DimensionMismatchError):
+        embedding_dims.adapt_query_vector([1.0, 1.0, 1.0], 2, "docs")
+    assert embedding_dims.adapt_query_vector([1.0, 1.0], 2, "docs") == [1.0, 1.0]
@@ -0,0 +1,39 @@
+import contextvars
+import threading
+
+import pytest
+
+from app.core import executors
+
+request_id = contextvars.ContextVar("request_id", default="-")
+
+
+@pytest.mark.asyncio
+async def test_run_read_and_run_write_use_separate_pools():
+    def thread_name():
+        return threading.current_thread().name
+
+    read_thread = await executors.run_read(thread_name)
+    write_thread = await executors.run_write(thread_name)
+
+    assert read_thread.startswith("read-pool")
+    assert write_thread.startswith("write-pool")
+
+
+@pytest.mark.asyncio
+async def test_run_read_passes_args_and_context():
+    request_id.set("abc")
+
+    def work(a, b=0):
+        return a + b, request_id.get()
+
+    assert await executors.run_read(work, 1, b=2) == (3, "abc")
+
+
+@pytest.mark.asyncio
+async def test_run_write_propagates_exceptions():
+    def boom():
+        raise ValueError("nope")
+
+    with pytest.raises(ValueError, match="nope"):
+        await executors.run_write(boom)
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+from loguru import logger
+
+from app.core.loop_monitor import LoopLagMonitor
+
+
+async def blocking_handler():
+    # Deliberately blocks the event loop
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_monitor_reports_stall_and_names_culprit():
+    records = []
+    sink_id = logger.add(lambda msg: records.append(msg.record), level="WARNING")
+
+    monitor = LoopLagMonitor(threshold_ms=100, interval_ms=20)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(blocking_handler(), name="slow-request")
+        await asyncio.sleep(0.1)
+    finally:
+        await monitor.stop()
+        logger.remove(sink_id)
+
+    stalls = [r for r in records if r["message"].startswith("event_loop_stall")]
+    assert monitor.stalls >= 1
+    assert stalls
+    assert stalls[0]["extra"]["lag_ms"] >= 100
+    assert "slow-request" in stalls[0]["extra"]["task"]
+    assert "blocking_handler" in stalls[0]["extra"]["task"]
+    assert any("blocking_handler" in frame for frame in stalls[0]["extra"]["stack"])
+
+
+@pytest.mark.asyncio
+async def test_monitor_stays_quiet_without_blocking():
+    monitor = LoopLagMonitor(threshold_ms=100, interval_ms=20)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls == 0
@@ -0,0 +1,86 @@
+from app.core import manifest as manifest_module
+from app.core.manifest import IngestManifest, ManifestEntry, file_sha256
+
+
+def _entry(source: str, chunk_ids) -> ManifestEntry:
+    return ManifestEntry(
+        source=source,
+        content_hash="abc",
+        size=3,
+        mtime_ns=1,
+        chunk_params={"chunk_size": 10, "chunk_overlap": 0},
+        chunk_ids=chunk_ids,
+    )
+
+
+def test_put_get_and_replace(tmp_path):
+    manifest = IngestManifest(str(tmp_path))
+    manifest.put("docs", _entry("a.txt", ["a-1"]))
+    manifest.put("docs", _entry("a.txt", ["a-1", "a-2"]))
+
+    entry = manifest.get("docs", "a.txt")
+    assert entry.chunk_ids == ["a-1", "a-2"]
+    assert entry.chunk_params == {"chunk_size": 10, "chunk_overlap": 0}
+    assert manifest.get("other", "a.txt") is None
+
+
+def test_entries_are_scoped_per_collection(tmp_path):
+    manifest = IngestManifest(str(tmp_path))
+    manifest.put("docs", _entry("a.txt", ["a-1"]))
+    manifest.put("docs", _entry("b.txt", ["b-1"]))
+    manifest.put("docs__v1", _entry("a.txt", ["a-1"]))
+
+    manifest.remove("docs", "b.txt")
+    assert set(manifest.entries("docs")) == {"a.txt"}
+
+    manifest.drop_collection("docs")
+    assert manifest.entries("docs") == {}
+    assert set(manifest.entries("docs__v1")) == {"a.txt"}
+
+
+def test_manifest_survives_reopen(tmp_path):
+    IngestManifest(str(tmp_path)).put("docs", _entry("a.txt", ["a-1"]))
+    assert IngestManifest(str(tmp_path)).get("docs", "a.txt") is not None
+
+
+def test_file_sha256(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_bytes(b"hello")
+    assert file_sha256(str(path)) == (
+        "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+    )
+
+
+def test_version_changes_with_content_only(tmp_path):
+    manifest = IngestManifest(str(tmp_path))
+    assert manifest.version("docs") == "0"
+
+    manifest.put("docs", _entry("a.txt", ["a-1"]))
+    first = manifest.version("docs")
+    assert first != "0"
+
+    touched = _entry("a.txt", ["a-1"]).model_copy(update={"mtime_ns": 5, "size": 4})
+    manifest.put("docs", touched)
+    assert manifest.version("docs") == first
+
+    manifest.put("docs", _entry("a.txt", ["a-1", "a-2"]))
+    second = manifest.version("docs")
+    assert second != first
+    manifest.remove("docs", "missing.txt")
+    assert manifest.version("docs") == second
+    manifest.remove("docs", "a.txt")
+    assert manifest.version("docs") != second
+
+
+def test_version_of_other_processes_writes_shows_up_after_the_ttl(
+    tmp_path, monkeypatch
+):
+    reader = IngestManifest(str(tmp_path))
+    writer = IngestManifest(str(tmp_path))
+    assert reader.version("docs") == "0"
+
+    writer.put("docs", _entry("a.txt", ["a-1"]))
+    assert reader.version("docs") == "0"
+
+    monkeypatch.setattr(manifest_module, "VERSION_TTL_S", 0.0)
+    assert reader.version("docs") == writer.version("docs") != "0"
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+from prometheus_client import REGISTRY
+
+from app.core import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _run(code: str, multiproc_dir: str) -> str:
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=multiproc_dir)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def test_metrics_are_summed_across_worker_processes(tmp_path):
+    observe = (
+        "from app.core import metrics;"
+        "metrics.observe_http('GET', '/health', 200, 0.01);"
+        "metrics.observe_llm('embeddings', 'm', 0.2, prompt_tokens=5)"
+    )
+    for _ in range(3):
+        _run(observe, str(tmp_path))
+
+    body = _run(
+        "from app.core import metrics; print(metrics.render()[0].decode())",
+        str(tmp_path),
+    )
+
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",'
+        'status="200"} 3.0'
+    ) in body
+    assert 'llm_tokens_total{kind="prompt",model="m",operation="embeddings"} 15.0' in (
+        body
+    )
+
+
+def test_llm_observation_counts_tokens_by_kind():
+    def value(kind):
+        return (
+            REGISTRY.get_sample_value(
+                "llm_tokens_total",
+                {"operation": "chat.completions", "model": "kind-test", "kind": kind},
+            )
+            or 0.0
+        )
+
+    metrics.observe_llm(
+        "chat.completions",
+        "kind-test",
+        1.5,
+        prompt_tokens=100,
+        completion_tokens=20,
+        cached_tokens=64,
+    )
+
+    assert (value("prompt"), value("completion"), value("cached")) == (100, 20, 64)
+    assert (
+        REGISTRY.get_sample_value(
+            "llm_request_duration_seconds_count",
+            {"operation": "chat.completions", "model": "kind-test"},
+        )
+        == 1
+    )
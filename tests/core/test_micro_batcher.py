@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from app.core.micro_batcher import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_flush():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(flush, max_batch_size=10, max_wait_ms=5)
+    results = await asyncio.gather(*(batcher.submit(t) for t in ["a", "b", "c"]))
+
+    assert [value for value, _ in results] == ["A", "B", "C"]
+    assert flushed == [["a", "b", "c"]]
+    assert all(info.batch_size == 3 for _, info in results)
+    assert batcher.stats()["flushed_on_timer"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        return items
+
+    # A wait far longer than the test: only the size limit can trigger flushes
+    batcher = MicroBatcher(flush, max_batch_size=2, max_wait_ms=60_000)
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1
+    )
+
+    assert [value for value, _ in results] == [0, 1, 2, 3]
+    assert flushed == [[0, 1], [2, 3]]
+    stats = batcher.stats()
+    assert stats["flushed_full"] == 2
+    assert stats["avg_batch_size"] == 2.0
+    assert stats["batch_size_histogram"]["2"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_fails_every_caller():
+    async def flush(items):
+        raise RuntimeError("upstream down")
+
+    batcher = MicroBatcher(flush, max_batch_size=10, max_wait_ms=1)
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.stats()["failed_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_short_result_list_fails_every_caller():
+    async def flush(items):
+        return items[:-1]
+
+    batcher = MicroBatcher(flush, max_batch_size=10, max_wait_ms=1)
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert "1 results for 2 items" in str(results[0])
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_cancels_every_caller():
+    started = asyncio.Event()
+
+    async def flush(items):
+        started.set()
+        await asyncio.sleep(10)
+
+    batcher = MicroBatcher(flush, max_batch_size=2, max_wait_ms=1)
+    callers = [asyncio.create_task(batcher.submit(i)) for i in range(2)]
+    await started.wait()
+    (flush_task,) = batcher._in_flight
+    flush_task.cancel()
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*callers, return_exceptions=True), timeout=1
+    )
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert flush_task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_is_left_out_of_the_batch():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        return items
+
+    batcher = MicroBatcher(flush, max_batch_size=10, max_wait_ms=20)
+    gone = asyncio.create_task(batcher.submit("gone"))
+    await asyncio.sleep(0)
+    gone.cancel()
+
+    value, info = await batcher.submit("kept")
+
+    assert value == "kept"
+    assert flushed == [["kept"]]
+    assert info.batch_size == 1
+
+
+class _Rejected(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_rejected_input_only_fails_its_own_caller():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        if "bad" in items:
+            raise _Rejected("input too long")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(
+        flush, max_batch_size=10, max_wait_ms=1, isolate_errors=(_Rejected,)
+    )
+    results = await asyncio.gather(
+        batcher.submit("a"),
+        batcher.submit("bad"),
+        batcher.submit("b"),
+        return_exceptions=True,
+    )
+
+    assert results[0][0] == "A" and results[2][0] == "B"
+    assert results[0][1].batch_size == 1
+    assert isinstance(results[1], _Rejected)
+    assert flushed[0] == ["a", "bad", "b"]
+    assert sorted(flushed[1:]) == [["a"], ["b"], ["bad"]]
+    stats = batcher.stats()
+    assert stats["isolated_batches"] == 1
+    assert stats["failed_batches"] == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_size_and_wait_reach_prometheus():
+    from prometheus_client import REGISTRY
+
+    async def flush(items):
+        return items
+
+    def _count(name):
+        return REGISTRY.get_sample_value(name, {"batcher": "test-metrics"}) or 0
+
+    before = _count("microbatch_size_count")
+    batcher = MicroBatcher(flush, max_batch_size=2, max_wait_ms=1, name="test-metrics")
+    await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert _count("microbatch_size_count") == before + 1
+    assert _count("microbatch_size_sum") >= 2
+    assert _count("microbatch_queue_wait_seconds_count") >= 2
@@ -0,0 +1,209 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+from app.core import chroma_client, vector_store
+from app.core.manifest import ManifestEntry, get_manifest
+from app.core.numpy_index import MetadataColumns, NumpyIndexStore, quantize_int8
+from app.core.retrieval import _build_where
+from app.scripts.eval_vector_index import evaluate_index, sample_queries
+
+METADATAS = [
+    {"source": "a.pdf", "filename": "a.pdf", "page": 1, "chunk_number": 0},
+    {"source": "a.pdf", "filename": "a.pdf", "page": 2.0, "chunk_number": 1},
+    {"source": "b.txt", "filename": "b.txt", "chunk_number": 0, "draft": True},
+    {"source": "c.md", "filename": "c.md", "page": 3, "draft": False},
+    {"source": "c.md", "filename": "c.md", "page": 4, "chunk_number": 7},
+]
+
+WHERE_FILTERS = [
+    _build_where("a.pdf", None),
+    _build_where(None, {"page": {"$gt": 1}}),
+    _build_where("c.md", {"page": {"$gte": 3}, "chunk_number": 7}),
+    _build_where(None, {"page": {"$ne": 1}}),
+    _build_where(None, {"filename": {"$nin": ["a.pdf", "b.txt"]}}),
+    _build_where(None, {"page": {"$in": [1, 4]}}),
+    _build_where(None, {"page": 2}),
+    _build_where(None, {"draft": True}),
+    _build_where(None, {"draft": 1}),
+    _build_where(None, {"page": {"$lt": 2.5}}),
+    _build_where(
+        "a.pdf", {"$or": [{"page": {"$lte": 1}}, {"chunk_number": {"$eq": 1}}]}
+    ),
+    _build_where(None, {"missing": "x"}),
+]
+
+
+def _collection(n, dim=16, seed=0):
+    name = f"npidx-{uuid.uuid4().hex[:8]}"
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    metadatas = [METADATAS[i % len(METADATAS)] for i in range(n)]
+    collection = chroma_client.get_collection(name, create=True)
+    collection.add(
+        ids=[f"id-{i}" for i in range(n)],
+        embeddings=vectors.tolist(),
+        documents=[f"document {i} ünïcode" for i in range(n)],
+        metadatas=metadatas,
+    )
+    return name, collection, vectors
+
+
+@pytest.mark.parametrize("where", WHERE_FILTERS)
+def test_where_filter_matches_chroma(where):
+    _, collection, _ = _collection(len(METADATAS))
+
+    expected = sorted(collection.get(where=where)["ids"])
+    mask = MetadataColumns(METADATAS).mask(where)
+    assert sorted(f"id-{i}" for i in np.flatnonzero(mask)) == expected
+
+
+@pytest.mark.parametrize(
+    "where",
+    [
+        {"filename": {"$gt": "a"}},
+        {"$and": [{"page": 1}]},
+        {"filename": "a.pdf", "page": 1},
+    ],
+)
+def test_invalid_where_is_rejected_like_chroma(where):
+    _, collection, _ = _collection(len(METADATAS))
+
+    with pytest.raises(ValueError):
+        collection.get(where=where)
+    with pytest.raises(ValueError):
+        MetadataColumns(METADATAS).mask(where)
+
+
+@pytest.mark.parametrize("where", [None, {"filename": "c.md"}])
+def test_numpy_store_is_exact_and_agrees_with_chroma(where):
+    name, collection, vectors = _collection(200)
+    query = np.random.default_rng(1).normal(size=16).astype(np.float32)
+    store = vector_store.NumpyVectorStore()
+    store.prepare(name)
+
+    hits = store.query(name, query, 5, where)
+
+    rows = np.arange(len(vectors))
+    if where:
+        rows = np.flatnonzero(
+            MetadataColumns(collection.get()["metadatas"]).mask(where)
+        )
+    exact = rows[np.argsort(((vectors[rows] - query) ** 2).sum(axis=1))[:5]]
+    assert [hit.id for hit in hits] == [f"id-{i}" for i in exact]
+
+    chroma_hits = vector_store.ChromaVectorStore().query(name, query, 5, where)
+    assert [h.id for h in hits] == [h.id for h in chroma_hits]
+    assert np.allclose(
+        [h.distance for h in hits], [h.distance for h in chroma_hits], rtol=1e-4
+    )
+    assert hits[0].document.startswith("document ")
+    assert hits[0].metadata == chroma_hits[0].metadata
+
+
+def test_snapshot_is_rebuilt_when_the_manifest_changes(tmp_path):
+    name, _, _ = _collection(20)
+    store = NumpyIndexStore(str(tmp_path))
+    builds = []
+
+    def build(physical, path):
+        builds.append(path)
+        vector_store.export_chroma_collection(physical, path, version)
+
+    version = get_manifest().version(name)
+    first = store.get(name, version, build)
+    assert len(first) == 20
+    assert store.get(name, version, build) is first
+
+    # Another worker process sharing the directory loads, it does not rebuild
+    assert len(NumpyIndexStore(str(tmp_path)).get(name, version, build)) == 20
+    assert len(builds) == 1
+
+    entry = ManifestEntry(
+        source="new.txt",
+        content_hash="x",
+        size=1,
+        mtime_ns=1,
+        chunk_params={},
+        chunk_ids=[],
+    )
+    get_manifest().put(name, entry)
+    version = get_manifest().version(name)
+    # A touched but unchanged file keeps the version
+    get_manifest().put(name, entry.model_copy(update={"mtime_ns": 2}))
+    assert get_manifest().version(name) == version
+    second = store.get(name, version, build)
+    assert second is not first
+    assert len(builds) == 2
+    # Only the live snapshot is kept on disk
+    snapshots = [d for d in os.listdir(os.path.join(store.root, name)) if d[:2] == "v-"]
+    assert snapshots == [os.path.basename(second.path)]
+
+
+def test_backend_is_selected_per_collection(monkeypatch):
+    settings = vector_store.get_settings()
+    monkeypatch.setattr(settings, "vector_backend", "chroma")
+    monkeypatch.setattr(settings, "vector_backends", {"docs": "numpy"})
+
+    assert vector_store.get_vector_store("docs").backend == "numpy"
+    assert vector_store.get_vector_store("docs__v20250101").backend == "numpy"
+    assert vector_store.get_vector_store("other").backend == "chroma"
+
+
+def test_int8_codes_reconstruct_vectors_within_one_step():
+    matrix = np.random.default_rng(3).normal(size=(50, 8)).astype(np.float32)
+    codes = np.empty(matrix.shape, dtype=np.int8)
+
+    offset, scale = quantize_int8(matrix, codes)
+
+    restored = offset + scale * (codes.astype(np.float32) + 128)
+    assert np.all(np.abs(restored - matrix) <= scale / 2 + 1e-6)
+    assert codes.min() == -128 and codes.max() == 127
+
+
+def test_quantized_search_rescores_with_float_vectors(tmp_path):
+    name, _, _ = _collection(300, dim=32, seed=4)
+    index = vector_store.NumpyVectorStore().prepare(name)
+    queries = sample_queries(index, 20, seed=5)
+
+    for query in queries:
+        exact = index.search(query, 5)
+        quantized = index.search(query, 5, quantized=True, oversample=8)
+        # Candidates come from int8 codes, but distances are exact float ones
+        for hit in quantized:
+            row = index.ids.index(hit.id)
+            expected = float(((index.vectors[row] - query) ** 2).sum())
+            assert hit.distance == pytest.approx(expected, rel=1e-4, abs=1e-4)
+        assert {h.id for h in quantized} == {h.id for h in exact}
+
+    rows = evaluate_index(index, queries, k=5, oversamples=[1, 8])
+    assert [row["mode"] for row in rows] == ["exact", "int8", "int8"]
+    assert rows[2]["recall"] == 1.0
+    assert rows[1]["recall"] <= rows[2]["recall"]
+    assert index.codes.nbytes * 4 == index.vectors.nbytes
+
+
+def test_queries_never_build_snapshots(monkeypatch):
+    name, _, _ = _collection(20)
+    store = vector_store.NumpyVectorStore()
+    query = np.zeros(16, dtype=np.float32)
+
+    # No snapshot yet: Chroma answers and nothing is built
+    chroma_hits = vector_store.ChromaVectorStore().query(name, query, 3)
+    assert [h.id for h in store.query(name, query, 3)] == [h.id for h in chroma_hits]
+    assert store.index(name) is None
+
+    # Built by another process: found on the next refresh
+    other = NumpyIndexStore(vector_store.get_settings().chroma_persist_dir)
+    version = get_manifest().version(name)
+    other.get(
+        name,
+        version,
+        lambda physical, path: vector_store.export_chroma_collection(
+            physical, path, version
+        ),
+    )
+    monkeypatch.setattr(vector_store.get_settings(), "numpy_index_refresh_seconds", 0.0)
+    assert len(store.index(name)) == 20
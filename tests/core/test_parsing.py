@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from app.core import parsing
+from app.core.parsing import ParsePool, chunk_pages, page_ranges
+from app.scripts.ingest import assemble_chunks, build_chunks_for_file
+
+SAMPLE_PDF = Path(__file__).parents[1] / "data" / "test_fastapi_multipage.pdf"
+
+
+def test_page_ranges_cover_all_pages_in_order():
+    assert page_ranges(7, 3) == [(0, 3), (3, 6), (6, 7)]
+    assert page_ranges(2, 5) == [(0, 2)]
+    assert page_ranges(0, 5) == []
+
+
+def test_page_ranges_rejects_non_positive_size():
+    with pytest.raises(ValueError):
+        page_ranges(10, 0)
+
+
+def test_chunk_pages_reports_words_per_page(tmp_path: Path):
+    path = tmp_path / "a.txt"
+    path.write_text("one two three four five", encoding="utf-8")
+
+    pages = chunk_pages(str(path), "fixed", chunk_size=2, chunk_overlap=0)
+
+    assert [(num, words) for num, _, words in pages] == [(1, 5)]
+    assert pages[0][1] == ["one two", "three four", "five"]
+
+
+@pytest.mark.asyncio
+async def test_parse_pool_matches_in_process_parsing(tmp_path: Path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(" ".join(f"w{i}-{n}" for n in range(25)), encoding="utf-8")
+        paths.append(path)
+    if SAMPLE_PDF.exists():
+        paths.append(SAMPLE_PDF)
+
+    # One page per task forces the PDF to be split across workers
+    pool = ParsePool(workers=2, pages_per_task=1)
+    try:
+        for path in paths:
+            pages = await pool.parse(path, "fixed", chunk_size=10, chunk_overlap=2)
+            assert assemble_chunks(path, pages) == build_chunks_for_file(
+                path, mode="fixed", chunk_size=10, chunk_overlap=2
+            )
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_aborted_parse_drops_queued_ranges_and_drains_running_ones(
+    monkeypatch,
+):
+    if not SAMPLE_PDF.exists():
+        pytest.skip("sample PDF missing")
+    started, finished = [], []
+    release = threading.Event()
+
+    def slow_chunk_pages(path, mode, chunk_size, chunk_overlap, page_range=None):
+        started.append(page_range)
+        release.wait(5)
+        finished.append(page_range)
+        return []
+
+    monkeypatch.setattr(parsing, "chunk_pages", slow_chunk_pages)
+    # Two ranges in flight but one worker: one runs, one waits in the pool
+    pool = ParsePool(workers=2, pages_per_task=1)
+    pool._pool.shutdown()
+    pool._pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        parts = pool.iter_parse(SAMPLE_PDF, "fixed", chunk_size=10, chunk_overlap=2)
+        task = asyncio.create_task(anext(parts))
+        while not started:
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # The abort waits for the range a worker is already parsing
+        assert not task.done()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert finished == started == [(0, 1)]
+    finally:
+        release.set()
+        pool.close()
@@ -1,5 +1,7 @@
 # tests/core/test_rag.py
 
+import pytest
+
 from app.core import rag
 from app.models.chunk import ChunkMetadata, TextChunk
 
@@ -71,20 +73,127 @@ def test_build_rag_prompt_structure():
     question = "What is this about?"
 
     prompt = rag.build_rag_prompt(context=context, question=question)
+    system, user = prompt.system, prompt.user
 
-    # Basic structure checks
-    assert "You are a precise assistant" in prompt
-    assert "Context:" in prompt
-    assert context in prompt
-    assert "Question:" in prompt
-    assert question in prompt
-    assert "Instructions:" in prompt
-    assert "Use ONLY the information in the context" in prompt
-    assert "If the answer is not in the context" in prompt
-    assert "add citations like [0], [1], [2]" in prompt
-    assert "First write an 'ANSWER:' section" in prompt
-    assert "Then write a 'SUMMARY:' section" in prompt
+    # Fixed instructions form the system prefix
+    assert "You are a precise assistant" in system
+    assert "Grounding rules:" in system
+    assert "Use ONLY the information in the context" in system
+    assert "If the answer is not in the context" in system
+    assert "add citations like [0], [1], [2]" in system
+    assert "First write an 'ANSWER:' section" in system
+    assert "Then write a 'SUMMARY:' section" in system
 
     # Format markers
-    assert "ANSWER:" in prompt
-    assert "SUMMARY:" in prompt
+    assert "ANSWER:" in system
+    assert "SUMMARY:" in system
+
+    # Only the context and the question vary, after the prefix
+    assert "Context:" in user
+    assert context in user
+    assert "Question:" in user
+    assert question in user
+    assert [m["role"] for m in prompt.messages()] == ["system", "user"]
+    assert prompt.template_id == "rag@v3"
+
+
+def test_rag_prompt_prefix_is_long_enough_to_be_cached():
+    from app.core import tokens
+
+    system = rag.build_rag_prompt(context="ctx", question="q?").system
+
+    # OpenAI caches prompt prefixes from 1024 tokens; keep a margin, since
+    # the chars-per-token estimate is rough for English prose.
+    assert len(system) / tokens.CHARS_PER_TOKEN > 1400
+    assert "FastAPI" not in system
+
+
+def test_rag_prompt_prefix_is_identical_across_requests():
+    first = rag.build_rag_prompt(context="[0] [source=a]\nx {y}", question="q1?")
+    second = rag.build_rag_prompt(context="[0] [source=b]\nz", question="q2?")
+
+    assert first.system == second.system
+    assert first.user != second.user
+    assert "x {y}" in first.user
+
+
+def test_prompt_versions_can_be_pinned(monkeypatch):
+    from app.core import prompts
+
+    monkeypatch.setattr(prompts.get_settings(), "prompt_versions", {"rag": "v1"})
+
+    prompt = rag.build_rag_prompt(context="ctx", question="q?")
+
+    assert prompt.template_id == "rag@v1"
+    assert "ctx" in prompt.user and "ANSWER:" in prompt.user
+    assert rag.build_rag_prompt("ctx", "q?", version="v2").template_id == "rag@v2"
+    assert prompts.registry.versions("rag") == ["v1", "v2", "v3"]
+    with pytest.raises(ValueError):
+        prompts.registry.register(prompts.PromptTemplate("rag", "v3", system="x"))
+
+
+def _page_chunk(id_, text, score, page=1, chunk_number=None, filename="a.pdf"):
+    return TextChunk(
+        id=id_,
+        text=text,
+        score=score,
+        metadata=ChunkMetadata(
+            source=f"/data/{filename}",
+            filename=filename,
+            page=page,
+            chunk_number=chunk_number,
+        ),
+    )
+
+
+def test_merge_adjacent_drops_overlapping_words():
+    chunks = [
+        _page_chunk("c2", "five six seven eight", 0.3, chunk_number=2),
+        _page_chunk("c1", "one two three four five six", 0.2, chunk_number=1),
+        # Next page: never merged, even with consecutive numbers
+        _page_chunk("c3", "seven eight nine", 0.1, page=2, chunk_number=3),
+        _page_chunk("b0", "other file", 0.4, filename="b.txt", chunk_number=0),
+    ]
+
+    blocks = rag.merge_adjacent(chunks)
+
+    assert [[c.id for c in b.chunks] for b in blocks] == [["c3"], ["c1", "c2"], ["b0"]]
+    assert blocks[1].text == "one two three four five six seven eight"
+    assert blocks[1].score == 0.2
+
+
+def test_pack_context_stops_at_budget_and_keeps_citations_aligned(monkeypatch):
+    # Deterministic estimate (4 chars per token) whether or not tiktoken is there
+    monkeypatch.setattr(rag.tokens, "_encoding", lambda model: None)
+    chunks = [
+        _page_chunk(f"c{i}", f"chunk {i} " + "word " * 20, 0.1 * i, chunk_number=i * 2)
+        for i in range(5)
+    ]
+
+    unlimited = rag.pack_context(chunks)
+    budget = unlimited.tokens // 2
+    packed = rag.pack_context(chunks, max_tokens=budget)
+
+    assert 0 < len(packed.blocks) < 5
+    assert packed.tokens <= budget
+    assert rag.tokens.count_tokens(packed.context) <= budget
+    for idx, block in enumerate(packed.blocks):
+        assert (
+            f"[{idx}] [source=a.pdf, page=1, chunk={block.chunks[0].metadata.chunk_number}]\n{block.text}"
+            in packed.context
+        )
+    assert [b.chunks[0].id for b in packed.blocks] == ["c0", "c1", "c2", "c3", "c4"][
+        : len(packed.blocks)
+    ]
+
+
+def test_pack_context_truncates_a_single_oversized_block(monkeypatch):
+    monkeypatch.setattr(rag.tokens, "_encoding", lambda model: None)
+    chunks = [_page_chunk("big", "word " * 500, 0.1, chunk_number=0)]
+
+    packed = rag.pack_context(chunks, max_tokens=50)
+
+    assert len(packed.blocks) == 1
+    assert packed.tokens <= 50
+    assert packed.context.startswith("[0] [source=a.pdf")
+    assert 0 < len(packed.blocks[0].text) < len("word " * 500)
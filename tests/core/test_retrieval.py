@@ -48,7 +48,11 @@ async def test_search_chunks_without_filters_uses_where_none(monkeypatch):
     # Mock Chroma client
     from app.core import chroma_client
 
-    monkeypatch.setattr(chroma_client, "get_chroma_client", lambda: fake_client)
+    monkeypatch.setattr(
+        chroma_client,
+        "get_collection",
+        lambda name, db_path=None: fake_client.get_or_create_collection(name=name),
+    )
 
     # Mock embed_text
     from app.services import openai_service
@@ -80,7 +84,11 @@ async def test_search_chunks_with_filename_builds_filename_where(monkeypatch):
 
     from app.core import chroma_client
 
-    monkeypatch.setattr(chroma_client, "get_chroma_client", lambda: fake_client)
+    monkeypatch.setattr(
+        chroma_client,
+        "get_collection",
+        lambda name, db_path=None: fake_client.get_or_create_collection(name=name),
+    )
 
     from app.services import openai_service
 
@@ -107,7 +115,11 @@ async def test_search_chunks_with_combined_filters_uses_and(monkeypatch):
 
     from app.core import chroma_client
 
-    monkeypatch.setattr(chroma_client, "get_chroma_client", lambda: fake_client)
+    monkeypatch.setattr(
+        chroma_client,
+        "get_collection",
+        lambda name, db_path=None: fake_client.get_or_create_collection(name=name),
+    )
 
     from app.services import openai_service
 
@@ -135,3 +147,69 @@ async def test_search_chunks_with_combined_filters_uses_and(monkeypatch):
     assert len(chunks) == 1
     assert isinstance(chunks[0].metadata, ChunkMetadata)
     assert chunks[0].metadata.page == 1
+
+
+@pytest.mark.asyncio
+async def test_search_chunks_refreshes_stale_collection_handle(monkeypatch):
+    from chromadb.errors import NotFoundError
+
+    from app.core import chroma_client
+    from app.services import openai_service
+
+    class StaleCollection:
+        def query(self, **kwargs):
+            handles.pop(0)
+            raise NotFoundError("Collection does not exist.")
+
+    fresh = FakeCollection()
+    handles = [StaleCollection(), fresh]
+    invalidated = []
+
+    monkeypatch.setattr(
+        chroma_client, "get_collection", lambda name, db_path=None: handles[0]
+    )
+    monkeypatch.setattr(
+        chroma_client,
+        "invalidate_collection",
+        lambda name=None, db_path=None: invalidated.append(name),
+    )
+
+    async def fake_embed_text(_request, query: str):
+        return [0.1, 0.2, 0.3]
+
+    monkeypatch.setattr(openai_service, "embed_text", fake_embed_text)
+
+    chunks = await retrieval.search_chunks(http_request=None, query="q", k=3)
+
+    assert invalidated == ["docs"]
+    assert fresh.last_query_kwargs is not None
+    assert len(chunks) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_chunks_embeds_at_collection_width(monkeypatch):
+    from app.core import chroma_client
+    from app.services import openai_service
+
+    fake_collection = FakeCollection()
+    fake_collection.metadata = {"embed_dimensions": 2, "embed_dimensions_reduced": True}
+    monkeypatch.setattr(
+        chroma_client, "get_collection", lambda name, db_path=None: fake_collection
+    )
+    requested = []
+
+    async def fake_embed_text(_request, query: str, dimensions=None):
+        requested.append(dimensions)
+        return [0.6, 0.8]
+
+    monkeypatch.setattr(openai_service, "embed_text", fake_embed_text)
+
+    await retrieval.search_chunks(http_request=None, query="q", k=3)
+    assert requested == [2]
+
+    # A full-width vector computed elsewhere is shortened to match
+    await retrieval.search_chunks(
+        http_request=None, query="q", k=3, query_embedding=[3.0, 4.0, 12.0]
+    )
+    sent = fake_collection.last_query_kwargs["query_embeddings"][0]
+    assert sent == pytest.approx([0.6, 0.8])
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_upstream_call():
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    flight = SingleFlight()
+    results = await asyncio.gather(*(flight.do(("op", "x"), fn) for _ in range(3)))
+
+    assert calls == 1
+    assert [value for value, _ in results] == ["result"] * 3
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert flight.stats()["saved_calls"] == {"op": 2}
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_and_disabled_do_not_share():
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    flight = SingleFlight()
+    await asyncio.gather(flight.do(("op", "a"), fn), flight.do(("op", "b"), fn))
+    assert calls == 2
+
+    disabled = SingleFlight(enabled=False)
+    await asyncio.gather(*(disabled.do(("op", "a"), fn) for _ in range(2)))
+    assert calls == 4
+
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_waiter():
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    flight = SingleFlight()
+    results = await asyncio.gather(
+        flight.do(("op",), fn), flight.do(("op",), fn), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_others():
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        return "ok"
+
+    flight = SingleFlight()
+    first = asyncio.create_task(flight.do(("op",), fn))
+    second = asyncio.create_task(flight.do(("op",), fn))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == ("ok", True)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_upstream_is_cancelled_when_every_waiter_leaves():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fn():
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    flight = SingleFlight()
+    waiter = asyncio.create_task(flight.do(("op",), fn))
+    await started.wait()
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_late_joiner_gets_the_whole_stream():
+    second_token = asyncio.Event()
+
+    async def factory(meta):
+        yield "a"
+        await second_token.wait()
+        yield "b"
+        meta["usage"] = 2
+
+    flight = SingleFlight()
+    first, tee, shared_first = flight.stream(("stream",), factory)
+    assert await first.__anext__() == "a"
+
+    late, late_tee, shared_late = flight.stream(("stream",), factory)
+    assert late_tee is tee
+    assert (shared_first, shared_late) == (False, True)
+
+    second_token.set()
+    assert [t async for t in late] == ["a", "b"]
+    assert [t async for t in first] == ["b"]
+    assert tee.meta == {"usage": 2}
+    assert flight.stats()["saved_calls"] == {"stream": 1}
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_error_reaches_every_reader():
+    async def factory(meta):
+        yield "a"
+        raise RuntimeError("broken stream")
+
+    flight = SingleFlight()
+    first, _, _ = flight.stream(("stream",), factory)
+    second, _, _ = flight.stream(("stream",), factory)
+
+    for tokens in (first, second):
+        with pytest.raises(RuntimeError):
+            async for _ in tokens:
+                pass
+
+
+@pytest.mark.asyncio
+async def test_stream_upstream_cancelled_when_last_reader_leaves():
+    closed = asyncio.Event()
+
+    async def factory(meta):
+        try:
+            while True:
+                yield "t"
+                await asyncio.sleep(0.001)
+        finally:
+            closed.set()
+
+    flight = SingleFlight()
+    first, _, _ = flight.stream(("stream",), factory)
+    second, _, _ = flight.stream(("stream",), factory)
+    assert await first.__anext__() == "t"
+    assert await second.__anext__() == "t"
+
+    await first.aclose()
+    assert not closed.is_set()
+    await second.aclose()
+
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core import tokens
+
+
+class _FakeEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class _FakeTiktoken:
+    """Fails the first `failures` loads, recording the thread of each."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.threads = []
+
+    def encoding_for_model(self, model):
+        self.threads.append(threading.current_thread().name)
+        if self.failures:
+            self.failures -= 1
+            raise OSError("no network")
+        return _FakeEncoding()
+
+    get_encoding = encoding_for_model
+
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    def _install(failures=0):
+        fake = _FakeTiktoken(failures)
+        monkeypatch.setattr(tokens, "tiktoken", fake)
+        return fake
+
+    monkeypatch.setattr(tokens, "_encodings", {})
+    monkeypatch.setattr(tokens, "_failed_at", {})
+    monkeypatch.setattr(tokens, "_loading", set())
+    return _install
+
+
+def test_failed_load_is_retried_instead_of_estimating_forever(
+    fake_tiktoken, monkeypatch
+):
+    fake = fake_tiktoken(failures=1)
+    text = "alpha beta gamma delta epsilon"
+
+    # Estimate (4 chars per token) after the failed load, not retried at once
+    assert tokens.count_tokens(text, "m") == 8
+    assert tokens.count_tokens(text, "m") == 8
+    assert len(fake.threads) == 1
+
+    monkeypatch.setattr(tokens, "RETRY_SECONDS", 0)
+    assert tokens.count_tokens(text, "m") == 5
+    assert len(fake.threads) == 2
+
+
+@pytest.mark.asyncio
+async def test_event_loop_never_loads_inline(fake_tiktoken):
+    fake = fake_tiktoken()
+
+    assert tokens.count_tokens("one two three", "m") == 4  # estimate
+    deadline = time.monotonic() + 5
+    while "m" not in tokens._encodings:
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+    assert fake.threads == ["tokenizer-load"]
+    assert tokens.count_tokens("one two three", "m") == 3
+
+
+def test_load_encodings_loads_up_front(fake_tiktoken):
+    fake = fake_tiktoken()
+
+    tokens.load_encodings(["chat", "embed"])
+
+    assert set(tokens._encodings) == {"chat", "embed"}
+    assert len(fake.threads) == 2
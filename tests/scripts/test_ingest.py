@@ -0,0 +1,266 @@
+import asyncio
+
+import pytest
+
+from app.scripts import ingest
+from app.services import openai_service
+
+
+def _write_doc(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+async def _fake_embed_texts(_request, texts, dimensions=None):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_reset_builds_shadow_collection_and_swaps_alias(monkeypatch, tmp_path):
+    from app.core import chroma_client
+    from app.core.collection_aliases import get_alias_store
+
+    monkeypatch.setattr(openai_service, "embed_texts", _fake_embed_texts)
+    doc = _write_doc(tmp_path, "a.txt", "first version of the document")
+
+    await ingest.ingest_files([doc], collection_name="bluegreen", reset=True)
+    first_build = get_alias_store().resolve("bluegreen")
+    assert first_build.startswith("bluegreen__v")
+    assert chroma_client.get_collection("bluegreen").count() == 1
+
+    seen_during_build = []
+
+    async def observing_embed_texts(_request, texts, dimensions=None):
+        # While the new build is running, queries still see the old one
+        seen_during_build.append(get_alias_store().resolve("bluegreen"))
+        return await _fake_embed_texts(_request, texts)
+
+    monkeypatch.setattr(openai_service, "embed_texts", observing_embed_texts)
+    _write_doc(tmp_path, "a.txt", "second version of the document")
+    await ingest.ingest_files([doc], collection_name="bluegreen", reset=True)
+
+    second_build = get_alias_store().resolve("bluegreen")
+    assert seen_during_build == [first_build]
+    assert second_build != first_build
+    assert chroma_client.get_collection("bluegreen").get()["documents"] == [
+        "second version of the document"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_rebuild_keeps_serving_previous_build(
+    monkeypatch, tmp_path, no_embedding_cache
+):
+    from app.core import chroma_client
+    from app.core.collection_aliases import get_alias_store
+
+    monkeypatch.setattr(openai_service, "embed_texts", _fake_embed_texts)
+    doc = _write_doc(tmp_path, "a.txt", "stable content")
+    await ingest.ingest_files([doc], collection_name="failsafe", reset=True)
+    live = get_alias_store().resolve("failsafe")
+
+    async def failing_embed_texts(_request, texts, dimensions=None):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(openai_service, "embed_texts", failing_embed_texts)
+    with pytest.raises(ExceptionGroup):
+        await ingest.ingest_files([doc], collection_name="failsafe", reset=True)
+
+    assert get_alias_store().resolve("failsafe") == live
+    assert [v["name"] for v in get_alias_store().versions("failsafe")] == [live]
+    assert chroma_client.get_collection("failsafe").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_incremental_ingest_skips_unchanged_and_cleans_up(monkeypatch, tmp_path):
+    from app.core import chroma_client
+
+    embedded = []
+
+    async def recording_embed_texts(_request, texts, dimensions=None):
+        embedded.extend(texts)
+        return await _fake_embed_texts(_request, texts)
+
+    monkeypatch.setattr(openai_service, "embed_texts", recording_embed_texts)
+
+    long_text = " ".join(f"w{i}" for i in range(30))
+    _write_doc(tmp_path, "keep.txt", "this file never changes")
+    _write_doc(tmp_path, "shrink.txt", long_text)
+    _write_doc(tmp_path, "gone.txt", "this file will be deleted")
+    pattern = str(tmp_path / "*.txt")
+
+    reports = []
+    await ingest.ingest_files(
+        [pattern], collection_name="incremental", chunk_size=10, chunk_overlap=0
+    )
+    collection = chroma_client.get_collection("incremental")
+    assert collection.count() == 5  # keep + gone + 3 chunks of shrink
+
+    # Second run with nothing changed: no embedding calls, no duplicates
+    embedded.clear()
+    await ingest.ingest_files(
+        [pattern],
+        collection_name="incremental",
+        chunk_size=10,
+        chunk_overlap=0,
+        on_progress=lambda p: reports.append(
+            (p.files_done, p.files_skipped, p.files_removed)
+        ),
+    )
+    assert embedded == []
+    assert reports[-1] == (3, 3, 0)
+    assert collection.count() == 5
+
+    # Shrink one file, delete another
+    _write_doc(tmp_path, "shrink.txt", "now only a few words")
+    (tmp_path / "gone.txt").unlink()
+    reports.clear()
+    await ingest.ingest_files(
+        [pattern],
+        collection_name="incremental",
+        chunk_size=10,
+        chunk_overlap=0,
+        on_progress=lambda p: reports.append(
+            (p.files_done, p.files_skipped, p.files_removed)
+        ),
+    )
+
+    assert embedded == ["now only a few words"]
+    assert reports[-1] == (2, 1, 1)
+    remaining = collection.get()
+    assert sorted(remaining["ids"]) == ["keep.txt-p1-c0", "shrink.txt-p1-c0"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_parsing_gives_same_chunks_as_serial(monkeypatch, tmp_path):
+    from app.core import chroma_client
+
+    monkeypatch.setattr(openai_service, "embed_texts", _fake_embed_texts)
+    for i in range(4):
+        _write_doc(tmp_path, f"d{i}.txt", " ".join(f"w{n}" for n in range(15 + i)))
+    pattern = str(tmp_path / "*.txt")
+
+    await ingest.ingest_files(
+        [pattern],
+        collection_name="serial",
+        chunk_size=5,
+        chunk_overlap=1,
+        parse_workers=1,
+    )
+    await ingest.ingest_files(
+        [pattern],
+        collection_name="parallel",
+        chunk_size=5,
+        chunk_overlap=1,
+        parse_workers=2,
+    )
+
+    serial = chroma_client.get_collection("serial").get()
+    parallel = chroma_client.get_collection("parallel").get()
+    assert sorted(zip(parallel["ids"], parallel["documents"])) == sorted(
+        zip(serial["ids"], serial["documents"])
+    )
+
+
+@pytest.mark.asyncio
+async def test_small_files_share_embedding_batches(monkeypatch, tmp_path):
+    from app.core import chroma_client
+    from app.core.config import get_settings
+
+    calls = []
+
+    async def recording_embed_texts(_request, texts, dimensions=None):
+        calls.append(list(texts))
+        return await _fake_embed_texts(_request, texts)
+
+    monkeypatch.setattr(openai_service, "embed_texts", recording_embed_texts)
+    for i in range(6):
+        _write_doc(tmp_path, f"s{i}.txt", f"small file number {i}")
+    pattern = str(tmp_path / "*.txt")
+
+    await ingest.ingest_files(
+        [pattern], collection_name="smallfiles", embed_batch_size=4, parse_workers=1
+    )
+    assert [len(texts) for texts in calls] == [4, 2]
+    assert chroma_client.get_collection("smallfiles").count() == 6
+
+    # The token budget closes a batch too: each chunk here is ~6 tokens
+    calls.clear()
+    monkeypatch.setattr(get_settings(), "embed_batch_max_tokens", 12)
+    for i in range(6):
+        _write_doc(tmp_path, f"s{i}.txt", f"small file number {i} changed")
+    await ingest.ingest_files(
+        [pattern], collection_name="smallfiles", embed_batch_size=4, parse_workers=1
+    )
+    assert [len(texts) for texts in calls] == [2, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_applies_backpressure_between_stages(monkeypatch, tmp_path):
+    from app.core import chroma_client
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "ingest_queue_size", 1)
+
+    created = 0
+
+    class CountingBatch(ingest._Batch):
+        def __init__(self, *args, **kwargs):
+            nonlocal created
+            created += 1
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(ingest, "_Batch", CountingBatch)
+
+    embedded = 0
+    ahead = []
+
+    async def slow_embed_texts(_request, texts, dimensions=None):
+        nonlocal embedded
+        # Batches the parse stage produced that embedding has not reached yet
+        ahead.append(created - embedded)
+        embedded += 1
+        await asyncio.sleep(0.005)
+        return await _fake_embed_texts(_request, texts)
+
+    monkeypatch.setattr(openai_service, "embed_texts", slow_embed_texts)
+    doc = _write_doc(tmp_path, "big.txt", " ".join(f"w{n}" for n in range(40)))
+
+    total = await ingest.ingest_files(
+        [doc],
+        collection_name="pipeline",
+        chunk_size=2,
+        chunk_overlap=0,
+        embed_batch_size=2,
+        embed_concurrency=1,
+    )
+
+    assert total == 20
+    assert embedded == 10
+    # The batch being embedded, one queued, one waiting to be queued and
+    # the one being filled; never the whole file
+    assert max(ahead) <= 4
+    metadatas = chroma_client.get_collection("pipeline").get()["metadatas"]
+    assert sorted(m["chunk_number"] for m in metadatas) == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_ingest_reports_chunks_and_write_latency_metrics(monkeypatch, tmp_path):
+    from prometheus_client import REGISTRY
+
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    monkeypatch.setattr(openai_service, "embed_texts", _fake_embed_texts)
+    doc = _write_doc(tmp_path, "m.txt", "some text to measure")
+    writes = sample("chroma_write_duration_seconds_count", {"operation": "upsert"})
+
+    await ingest.ingest_files([doc], collection_name="metered", reset=True)
+
+    assert sample("ingest_chunks_total", {"collection": "metered"}) == 1
+    assert sample("ingest_chunks_per_second_count", {"collection": "metered"}) == 1
+    assert (
+        sample("chroma_write_duration_seconds_count", {"operation": "upsert"})
+        == writes + 1
+    )
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from app.core import chroma_client, embedding_dims
+from app.core.collection_aliases import get_alias_store
+from app.core.manifest import get_manifest
+from app.scripts import ingest
+from app.scripts.migrate_dimensions import migrate_dimensions
+from app.services import openai_service
+
+FULL_WIDTH = 8
+
+
+def _vector(text, width):
+    rng = np.random.default_rng(len(text))
+    vector = rng.normal(size=FULL_WIDTH)[:width]
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    calls = []
+
+    async def fake_embed_texts(_request, texts, dimensions=None):
+        calls.append(dimensions)
+        return [_vector(t, dimensions or FULL_WIDTH) for t in texts]
+
+    monkeypatch.setattr(openai_service, "embed_texts", fake_embed_texts)
+    return calls
+
+
+def _ingest_docs(tmp_path, collection, **kwargs):
+    for i in range(3):
+        (tmp_path / f"d{i}.txt").write_text(f"document number {i} " * (i + 1))
+    return ingest.ingest_files(
+        [str(tmp_path / "*.txt")], collection_name=collection, **kwargs
+    )
+
+
+def _widths(collection_name):
+    stored = chroma_client.get_collection(collection_name).get(include=["embeddings"])
+    return {len(vector) for vector in stored["embeddings"]}
+
+
+@pytest.mark.asyncio
+async def test_ingest_records_width_and_uses_configured_dimensions(
+    monkeypatch, tmp_path, embed_calls
+):
+    settings = ingest.get_settings()
+    monkeypatch.setattr(settings, "collection_embed_dimensions", {"narrow": 4})
+
+    await _ingest_docs(tmp_path, "narrow", reset=True)
+
+    recorded = embedding_dims.recorded_dimensions(
+        chroma_client.get_collection("narrow")
+    )
+    assert recorded.width == 4 and recorded.reduced
+    assert set(embed_calls) == {4}
+    assert _widths("narrow") == {4}
+
+    # Config changes later do not leak into an existing collection
+    monkeypatch.setattr(settings, "collection_embed_dimensions", {"narrow": 6})
+    (tmp_path / "new.txt").write_text("a brand new file")
+    embed_calls.clear()
+    await _ingest_docs(tmp_path, "narrow")
+    assert set(embed_calls) == {4}
+    assert _widths("narrow") == {4}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("reembed", [True, False])
+async def test_migration_builds_narrower_collection_and_swaps_alias(
+    tmp_path, embed_calls, reembed
+):
+    name = f"migrate-{int(reembed)}"
+    await _ingest_docs(tmp_path, name, reset=True)
+    before = get_alias_store().resolve(name)
+    assert _widths(name) == {FULL_WIDTH}
+    embed_calls.clear()
+
+    reports = []
+    target = await migrate_dimensions(
+        name, 4, reembed=reembed, on_progress=lambda p: reports.append(p.chunks_done)
+    )
+
+    assert get_alias_store().resolve(name) == target != before
+    assert _widths(name) == {4}
+    assert embed_calls == ([4] if reembed else [])
+    assert reports[-1] == chroma_client.get_collection(before).count()
+    assert embedding_dims.recorded_dimensions(
+        chroma_client.get_collection(name)
+    ) == embedding_dims.CollectionDimensions(
+        4, True, ingest.get_settings().openai_embed_model
+    )
+    # Truncating + re-normalizing gives what the API returns for `dimensions`
+    migrated = chroma_client.get_collection(name).get(
+        include=["embeddings", "documents"]
+    )
+    for doc, vector in zip(migrated["documents"], migrated["embeddings"]):
+        assert np.allclose(vector, _vector(doc, 4), atol=1e-6)
+    assert set(get_manifest().entries(target)) == set(get_manifest().entries(before))
+
+
+@pytest.mark.asyncio
+async def test_migration_refuses_to_widen_by_truncation(tmp_path, embed_calls):
+    await _ingest_docs(tmp_path, "widen", reset=True)
+
+    with pytest.raises(embedding_dims.DimensionMismatchError):
+        await migrate_dimensions("widen", FULL_WIDTH * 2, reembed=False)
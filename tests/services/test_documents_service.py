@@ -30,8 +30,8 @@ def _setup_fake_chroma(monkeypatch, metadatas):
 
     monkeypatch.setattr(
         chroma_client,
-        "get_chroma_client",
-        lambda: fake_client,
+        "get_collection",
+        lambda name, db_path=None: fake_client.get_or_create_collection(name=name),
     )
 
     return fake_client, fake_collection
@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.core.config import get_settings
+from app.core.embedding_cache import EmbeddingCache
+from app.services import embedding_service, openai_service
+
+
+@pytest.mark.asyncio
+async def test_embed_chunks_batches_and_preserves_order(monkeypatch):
+    calls = []
+
+    async def fake_embed_texts(_request, texts, dimensions=None):
+        calls.append(list(texts))
+        # Finish later batches first to prove order does not depend on timing
+        await asyncio.sleep(0.01 if texts[0] == "c0" else 0)
+        return [[float(t[1:])] for t in texts]
+
+    monkeypatch.setattr(openai_service, "embed_texts", fake_embed_texts)
+
+    chunks = [f"c{i}" for i in range(5)]
+    vectors = await embedding_service.embed_chunks(chunks, batch_size=2, concurrency=3)
+
+    assert vectors == [[0.0], [1.0], [2.0], [3.0], [4.0]]
+    assert sorted(calls) == [["c0", "c1"], ["c2", "c3"], ["c4"]]
+
+
+@pytest.mark.asyncio
+async def test_embed_chunks_bounds_batches_in_flight(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_embed_texts(_request, texts, dimensions=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(openai_service, "embed_texts", fake_embed_texts)
+
+    await embedding_service.embed_chunks(["x"] * 10, batch_size=1, concurrency=2)
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_embed_chunks_retries_failed_batch(monkeypatch):
+    attempts = 0
+
+    async def flaky_embed_texts(_request, texts, dimensions=None):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise openai.APIConnectionError(
+                request=httpx.Request("POST", "https://api.openai.com")
+            )
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(openai_service, "embed_texts", flaky_embed_texts)
+    monkeypatch.setattr(embedding_service, "RETRY_BASE_DELAY_S", 0)
+
+    vectors = await embedding_service.embed_chunks(
+        ["a", "b"], batch_size=10, max_retries=2
+    )
+
+    assert vectors == [[1.0], [1.0]]
+    assert attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_embed_chunks_gives_up_after_max_retries(monkeypatch):
+    async def failing_embed_texts(_request, texts, dimensions=None):
+        raise openai.APIConnectionError(
+            request=httpx.Request("POST", "https://api.openai.com")
+        )
+
+    monkeypatch.setattr(openai_service, "embed_texts", failing_embed_texts)
+    monkeypatch.setattr(embedding_service, "RETRY_BASE_DELAY_S", 0)
+
+    with pytest.raises(ExceptionGroup):
+        await embedding_service.embed_chunks(["a"], batch_size=10, max_retries=1)
+
+
+@pytest.mark.asyncio
+async def test_embed_chunks_only_embeds_cache_misses(monkeypatch, tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("cached", [9.0], model=get_settings().openai_embed_model)
+    monkeypatch.setattr(embedding_service, "get_embedding_cache", lambda: cache)
+
+    sent = []
+
+    async def fake_embed_texts(_request, texts, dimensions=None):
+        sent.extend(texts)
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(openai_service, "embed_texts", fake_embed_texts)
+
+    vectors = await embedding_service.embed_chunks(["new", "cached"], batch_size=10)
+
+    assert vectors == [[1.0], [9.0]]
+    assert sent == ["new"]
+    # The miss was written back, so a second run sends nothing
+    sent.clear()
+    assert await embedding_service.embed_chunks(["new", "cached"]) == [[1.0], [9.0]]
+    assert sent == []
+    cache.close()
@@ -0,0 +1,203 @@
+import asyncio
+import json
+
+import pytest
+
+from app.models.admin import ReindexRequest
+from app.scripts import ingest
+from app.services.jobs_service import (
+    JobManager,
+    JobNotFoundError,
+    JobQueueFullError,
+    JobsRunElsewhereError,
+)
+
+
+async def _wait_finished(manager, job_id, timeout=2.0):
+    async with asyncio.timeout(timeout):
+        while not (await manager.get_job(job_id)).is_finished:
+            await asyncio.sleep(0.01)
+    return await manager.get_job(job_id)
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_throughput_and_history(monkeypatch, tmp_path):
+    async def fake_ingest_files(on_progress=None, **kwargs):
+        progress = ingest.IngestProgress(files_total=2, bytes_total=200)
+        on_progress(progress)
+        await asyncio.sleep(0.05)
+        progress.files_done = 1
+        progress.bytes_done = 100
+        progress.chunks_embedded = 10
+        on_progress(progress)
+        return 10
+
+    monkeypatch.setattr(ingest, "ingest_files", fake_ingest_files)
+
+    store = tmp_path / "jobs.json"
+    manager = JobManager(store_path=str(store))
+    job = await manager.submit_reindex(ReindexRequest(paths=["a.txt", "b.txt"]))
+
+    job = await _wait_finished(manager, job.id)
+
+    assert job.status == "succeeded"
+    assert job.files_done == 1
+    assert job.chunks_embedded == 10
+    assert job.chunks_per_second and job.chunks_per_second > 0
+    await manager.flush()
+    assert json.loads(store.read_text())[0]["status"] == "succeeded"
+
+    manager.release()
+    reloaded = JobManager(store_path=str(store))
+    await reloaded.start()
+    assert (await reloaded.get_job(job.id)).status == "succeeded"
+    reloaded.release()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error(monkeypatch, tmp_path):
+    async def failing_ingest_files(**kwargs):
+        raise FileNotFoundError("No files matched patterns")
+
+    monkeypatch.setattr(ingest, "ingest_files", failing_ingest_files)
+
+    manager = JobManager(store_path=str(tmp_path / "jobs.json"))
+    job = await manager.submit_reindex(ReindexRequest(paths=["missing/*.pdf"]))
+
+    job = await _wait_finished(manager, job.id)
+
+    assert job.status == "failed"
+    assert "No files matched" in job.error
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_queues_and_rejects(monkeypatch, tmp_path):
+    release = asyncio.Event()
+    running = 0
+    peak = 0
+
+    async def blocking_ingest_files(**kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await release.wait()
+        running -= 1
+        return 0
+
+    monkeypatch.setattr(ingest, "ingest_files", blocking_ingest_files)
+
+    manager = JobManager(
+        store_path=str(tmp_path / "jobs.json"), max_concurrent=1, max_queued=1
+    )
+    first = await manager.submit_reindex(ReindexRequest(paths=["a"]))
+    second = await manager.submit_reindex(ReindexRequest(paths=["b"]))
+    with pytest.raises(JobQueueFullError):
+        await manager.submit_reindex(ReindexRequest(paths=["c"]))
+
+    await asyncio.sleep(0.05)
+    assert (await manager.get_job(first.id)).status == "running"
+    assert (await manager.get_job(second.id)).status == "queued"
+
+    release.set()
+    await _wait_finished(manager, first.id)
+    await _wait_finished(manager, second.id)
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_unfinished_jobs_are_interrupted_after_restart(monkeypatch, tmp_path):
+    async def slow_ingest_files(**kwargs):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(ingest, "ingest_files", slow_ingest_files)
+
+    store = tmp_path / "jobs.json"
+    manager = JobManager(store_path=str(store))
+    job = await manager.submit_reindex(ReindexRequest(paths=["a"]))
+    await asyncio.sleep(0.02)
+
+    # Simulate a crash: the lock is gone, the history says "running"
+    await manager.flush()
+    manager.release()
+    restarted = JobManager(store_path=str(store))
+    await restarted.start()
+    assert restarted.is_owner
+    assert (await restarted.get_job(job.id)).status == "interrupted"
+
+    await manager.shutdown()
+    assert (await manager.get_job(job.id)).status == "interrupted"
+
+    with pytest.raises(JobNotFoundError):
+        await restarted.get_job("nope")
+    restarted.release()
+
+
+@pytest.mark.asyncio
+async def test_only_one_process_runs_jobs(monkeypatch, tmp_path):
+    release = asyncio.Event()
+
+    async def blocking_ingest_files(**kwargs):
+        await release.wait()
+
+    monkeypatch.setattr(ingest, "ingest_files", blocking_ingest_files)
+
+    store = str(tmp_path / "jobs.json")
+    owner = JobManager(store_path=store)
+    await owner.start()
+    # Another worker on the same persist dir
+    follower = JobManager(store_path=store)
+    await follower.start()
+    assert owner.is_owner and not follower.is_owner
+
+    job = await owner.submit_reindex(ReindexRequest(paths=["a"]))
+    await asyncio.sleep(0.02)
+    await owner.flush()
+
+    assert (await follower.get_job(job.id)).status == "running"
+    with pytest.raises(JobsRunElsewhereError):
+        await follower.submit_reindex(ReindexRequest(paths=["b"]))
+    with pytest.raises(JobsRunElsewhereError):
+        await follower.cancel(job.id)
+
+    release.set()
+    await _wait_finished(owner, job.id)
+    await owner.shutdown()
+    owner.release()
+
+    # The owner is gone: the next submission takes over
+    await follower.submit_reindex(ReindexRequest(paths=["b"]))
+    assert follower.is_owner
+    await follower.shutdown()
+    follower.release()
+
+
+@pytest.mark.asyncio
+async def test_store_is_read_and_written_off_the_event_loop(monkeypatch, tmp_path):
+    import threading
+
+    from app.services.jobs_service import JobManager as Manager
+
+    threads = []
+    for name in ("_try_lock", "_read_store", "_write"):
+        original = getattr(Manager, name)
+
+        def recording(self, *args, _original=original, **kwargs):
+            threads.append(threading.current_thread())
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(Manager, name, recording)
+
+    store = str(tmp_path / "jobs.json")
+    (tmp_path / "jobs.json").write_text("[]", encoding="utf-8")
+    owner = JobManager(store_path=store)
+    await owner.start()
+    follower = JobManager(store_path=store)
+    await follower.start()
+    await follower.list_jobs()
+    with pytest.raises(JobNotFoundError):
+        await follower.get_job("nope")
+
+    # lock + load + rewrite for the owner, lock + read for the follower
+    assert len(threads) >= 5
+    assert threading.main_thread() not in threads
+    owner.release()
@@ -2,7 +2,14 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.services.openai_service import ask_llm, embed_text, stream_chat_llm
+from app.core.embedding_cache import EmbeddingCache
+from app.services import openai_service
+from app.services.openai_service import (
+    ask_llm,
+    embed_text,
+    embed_texts,
+    stream_chat_llm,
+)
 
 
 @pytest.mark.asyncio
@@ -26,6 +33,7 @@ async def test_ask_llm_uses_openai_client(mock_client):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("no_embed_microbatch")
 @patch("app.services.openai_service.client")
 async def test_embed_text_uses_openai_client(mock_client):
     fake_embedding = [0.1, 0.2, 0.3]
@@ -46,6 +54,51 @@ async def test_embed_text_uses_openai_client(mock_client):
     assert kwargs["input"] == "hello world"
 
 
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_embed_text_uses_cache_after_first_call(
+    mock_client, monkeypatch, tmp_path
+):
+    cache = EmbeddingCache(str(tmp_path))
+    monkeypatch.setattr(openai_service, "get_embedding_cache", lambda: cache)
+
+    fake_response = MagicMock()
+    fake_response.data = [MagicMock(embedding=[0.25, 0.5])]
+    mock_client.embeddings.create = AsyncMock(return_value=fake_response)
+
+    first = await embed_text(None, "hello world")
+    second = await embed_text(None, "hello   world")
+
+    assert first == second == [0.25, 0.5]
+    mock_client.embeddings.create.assert_called_once()
+    assert cache.hits == 1
+    cache.close()
+
+
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_embed_texts_sends_one_request_and_keeps_order(mock_client):
+    # Provider items deliberately out of order; `index` decides the position
+    item_b = MagicMock(index=1, embedding=[0.2])
+    item_a = MagicMock(index=0, embedding=[0.1])
+
+    fake_response = MagicMock()
+    fake_response.data = [item_b, item_a]
+
+    mock_client.embeddings.create = AsyncMock(return_value=fake_response)
+
+    result = await embed_texts(None, ["a", "b"])
+    assert result == [[0.1], [0.2]]
+
+    mock_client.embeddings.create.assert_called_once()
+    kwargs = mock_client.embeddings.create.call_args.kwargs
+    assert kwargs["input"] == ["a", "b"]
+    assert "dimensions" not in kwargs
+
+    await embed_texts(None, ["a", "b"], dimensions=256)
+    assert mock_client.embeddings.create.call_args.kwargs["dimensions"] == 256
+
+
 @pytest.mark.asyncio
 @patch("app.services.openai_service.client")
 async def test_stream_chat_llm(mock_client):
@@ -77,3 +130,211 @@ async def test_stream_chat_llm(mock_client):
     kwargs = mock_client.chat.completions.create.call_args.kwargs
     assert kwargs["stream"] is True
     assert kwargs["stream_options"] == {"include_usage": True}
+
+
+def test_split_tokens_adds_up_to_total():
+    shares = openai_service._split_tokens(10, ["aaa", "a", "aaaaaa"])
+    assert sum(shares) == 10
+    assert shares[2] > shares[0] > shares[1]
+    assert openai_service._split_tokens(None, ["a", "b"]) == [None, None]
+
+
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_embed_text_coalesces_concurrent_callers(mock_client, monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    monkeypatch.setattr(openai_service.settings, "embed_microbatch_enabled", True)
+    monkeypatch.setattr(openai_service.settings, "embed_microbatch_max_wait_ms", 5)
+    monkeypatch.setattr(openai_service, "_embed_batchers", {})
+
+    async def fake_create(model, input):
+        # Returned out of order; vectors must still reach the right caller
+        items = [
+            MagicMock(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(input)
+        ]
+        return MagicMock(
+            data=list(reversed(items)),
+            model="embed-model",
+            usage=MagicMock(prompt_tokens=9),
+        )
+
+    mock_client.embeddings.create = AsyncMock(side_effect=fake_create)
+
+    first = SimpleNamespace(state=SimpleNamespace(llm_calls=[]))
+    second = SimpleNamespace(state=SimpleNamespace(llm_calls=[]))
+    vectors = await asyncio.gather(embed_text(first, "a"), embed_text(second, "bb"))
+
+    assert vectors == [[1.0], [2.0]]
+    mock_client.embeddings.create.assert_called_once()
+    assert mock_client.embeddings.create.call_args.kwargs["input"] == ["a", "bb"]
+
+    # Each request logs exactly its own call, with its share of the tokens
+    (first_call,) = first.state.llm_calls
+    (second_call,) = second.state.llm_calls
+    assert first_call.batch_size == second_call.batch_size == 2
+    assert first_call.prompt_tokens + second_call.prompt_tokens == 9
+    assert first_call.prompt_tokens < second_call.prompt_tokens
+    assert openai_service.get_embed_batcher().stats()["items"] == 2
+
+
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_identical_concurrent_ask_llm_calls_share_one_request(mock_client):
+    import asyncio
+    from types import SimpleNamespace
+
+    async def fake_create(model, messages, **_):
+        await asyncio.sleep(0.01)
+        return MagicMock(
+            choices=[MagicMock(message=MagicMock(content="shared answer"))],
+            model="chat-model",
+        )
+
+    mock_client.chat.completions.create = AsyncMock(side_effect=fake_create)
+
+    requests = [SimpleNamespace(state=SimpleNamespace(llm_calls=[])) for _ in range(3)]
+    answers = await asyncio.gather(*(ask_llm(r, "same prompt") for r in requests))
+
+    assert answers == ["shared answer"] * 3
+    mock_client.chat.completions.create.assert_called_once()
+    # Every request still logs its call; all but one are marked deduplicated
+    logged = [r.state.llm_calls[0] for r in requests]
+    assert sorted(bool(call.deduplicated) for call in logged) == [False, True, True]
+
+
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_ask_llm_logs_cached_prompt_tokens(mock_client, monkeypatch):
+    from types import SimpleNamespace
+
+    from app.core.llm_telemetry import PromptCacheStats
+
+    stats = PromptCacheStats()
+    monkeypatch.setattr(openai_service, "prompt_cache_stats", stats)
+    usage = SimpleNamespace(
+        prompt_tokens=2000,
+        completion_tokens=10,
+        total_tokens=2010,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1536),
+    )
+    mock_client.chat.completions.create = AsyncMock(
+        return_value=MagicMock(
+            choices=[MagicMock(message=MagicMock(content="ok"))],
+            usage=usage,
+            model="chat-model",
+        )
+    )
+    request = SimpleNamespace(state=SimpleNamespace(llm_calls=[]))
+
+    await ask_llm(
+        request, "Context: ...", system_prompt="fixed", prompt_template="rag@v2"
+    )
+
+    kwargs = mock_client.chat.completions.create.call_args.kwargs
+    assert kwargs["messages"][0] == {"role": "system", "content": "fixed"}
+    assert kwargs["prompt_cache_key"] == "rag@v2"
+    (call,) = request.state.llm_calls
+    assert call.cached_tokens == 1536
+    assert call.prompt_template == "rag@v2"
+    (row,) = stats.stats()
+    assert row["operation"] == "chat.completions"
+    assert row["prompt_template"] == "rag@v2"
+    assert row["hit_rate"] == pytest.approx(0.768)
+
+
+def _stream_chunks(*contents, usage=None):
+    from types import SimpleNamespace
+
+    chunks = [
+        SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=c))],
+            usage=None,
+            model="chat-model",
+        )
+        for c in contents
+    ]
+    if usage is not None:
+        chunks.append(SimpleNamespace(choices=[], usage=usage, model="chat-model"))
+    return chunks
+
+
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_stream_chat_llm_logs_first_token_and_gaps(mock_client):
+    import asyncio
+    from types import SimpleNamespace
+
+    from app.core import metrics
+
+    usage = SimpleNamespace(prompt_tokens=5, completion_tokens=4, total_tokens=9)
+    chunks = _stream_chunks("a", "b", "c", "d", usage=usage)
+
+    async def fake_stream():
+        await asyncio.sleep(0.05)
+        for i, chunk in enumerate(chunks):
+            # One stall in the middle of the stream
+            await asyncio.sleep(0.1 if i == 2 else 0.005)
+            yield chunk
+
+    mock_client.chat.completions.create = AsyncMock(return_value=fake_stream())
+    ttft_before = metrics.STREAM_FIRST_TOKEN_SECONDS.labels("gpt-4.1-mini")._sum.get()
+    request = SimpleNamespace(state=SimpleNamespace(llm_calls=[]))
+
+    tokens = [t async for t in stream_chat_llm(request, "timed stream")]
+
+    assert tokens == ["a", "b", "c", "d"]
+    (call,) = request.state.llm_calls
+    assert call.first_token_ms >= 50
+    assert call.inter_token_max_ms >= 100
+    assert call.inter_token_p50_ms < 50
+    # 3 tokens after the first, in roughly 0.11s
+    assert 10 < call.output_tokens_per_second < 40
+    assert call.client_disconnected is None
+    ttft_after = metrics.STREAM_FIRST_TOKEN_SECONDS.labels("gpt-4.1-mini")._sum.get()
+    assert ttft_after - ttft_before >= 0.05
+
+
+@pytest.mark.asyncio
+@patch("app.services.openai_service.client")
+async def test_stream_chat_llm_records_client_disconnect(mock_client):
+    from types import SimpleNamespace
+
+    from app.core import metrics
+
+    async def fake_stream():
+        for chunk in _stream_chunks("one", "two", "three"):
+            yield chunk
+
+    mock_client.chat.completions.create = AsyncMock(return_value=fake_stream())
+    disconnects = metrics.STREAM_DISCONNECTS.labels("gpt-4.1-mini")
+    before = disconnects._value.get()
+    request = SimpleNamespace(state=SimpleNamespace(llm_calls=[]))
+
+    stream = stream_chat_llm(request, "left early")
+    assert await stream.__anext__() == "one"
+    await stream.aclose()
+
+    (call,) = request.state.llm_calls
+    assert call.client_disconnected is True
+    assert call.first_token_ms is not None
+    assert disconnects._value.get() == before + 1
+
+
+def test_stream_timer_percentiles():
+    from app.core.llm_telemetry import StreamTimer
+
+    timer = StreamTimer()
+    timer.started, timer.first, timer.last, timer.chunks = 0.0, 0.5, 1.5, 11
+    timer.gaps = [0.01 * i for i in range(1, 11)]
+
+    summary = timer.summary(completion_tokens=21)
+
+    assert summary["first_token_ms"] == 500
+    assert summary["inter_token_p50_ms"] == 50.0
+    assert summary["inter_token_p95_ms"] == 100.0
+    assert summary["inter_token_max_ms"] == 100.0
+    assert summary["output_tokens_per_second"] == 20.0
+    assert timer.summary()["output_tokens_per_second"] == 10.0
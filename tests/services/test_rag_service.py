@@ -6,7 +6,7 @@ from app.services import rag_service
 
 
 @pytest.mark.asyncio
-async def test_rag_with_answer_basic(monkeypatch):
+async def test_rag_with_answer_basic(monkeypatch, no_answer_cache):
     # Fake retrieval: returns one chunk
     async def fake_search_chunks(
         http_request,
@@ -15,6 +15,7 @@ async def test_rag_with_answer_basic(monkeypatch):
         k: int = 3,
         filename=None,
         metadata_filter=None,
+        query_embedding=None,
     ):
         assert query == "What is FastAPI?"
         assert k == 3
@@ -30,13 +31,18 @@ async def test_rag_with_answer_basic(monkeypatch):
             )
         ]
 
-    async def fake_ask_llm(_request, prompt: str) -> str:
-        # Prompt should contain context + question + markers
+    async def fake_ask_llm(
+        _request, prompt: str, system_prompt=None, prompt_template=None
+    ) -> str:
+        # Context + question in the user message, fixed instructions and
+        # output markers in the system prefix
         assert "FastAPI is a modern, fast (high-performance)" in prompt
         assert "Question:" in prompt
         assert "What is FastAPI?" in prompt
-        assert "ANSWER:" in prompt
-        assert "SUMMARY:" in prompt
+        assert "ANSWER:" in system_prompt
+        assert "SUMMARY:" in system_prompt
+        assert "FastAPI" not in system_prompt
+        assert prompt_template == "rag@v3"
 
         return (
             "ANSWER:\n"
@@ -74,7 +80,7 @@ async def test_rag_with_answer_basic(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_rag_with_answer_no_chunks(monkeypatch):
+async def test_rag_with_answer_no_chunks(monkeypatch, no_answer_cache):
     # Fake retrieval: returns no chunks
     async def fake_search_chunks(
         http_request,
@@ -83,10 +89,11 @@ async def test_rag_with_answer_no_chunks(monkeypatch):
         k: int = 3,
         filename=None,
         metadata_filter=None,
+        query_embedding=None,
     ):
         return []
 
-    async def fake_ask_llm(_request, prompt: str) -> str:
+    async def fake_ask_llm(_request, prompt: str, **_) -> str:
         raise AssertionError("ask_llm should not be called when no chunks are found")
 
     from app.core import retrieval
@@ -105,3 +112,200 @@ async def test_rag_with_answer_no_chunks(monkeypatch):
     )
     assert result.summary is None
     assert result.sources == []
+
+
+RAW_OUTPUTS = [
+    "ANSWER:\nFastAPI is fast [0].\n\nSUMMARY:\n- Fast\n- Typed\n",
+    "  answer: lower-case marker  SUMMARY:  one point  ",
+    "No markers at all, just an answer.",
+    "ANSWER: only an answer\n\nSUMMARY:   \n",
+    "ANS",
+    "",
+]
+
+
+def _parse_streamed(raw: str, step: int):
+    parser = rag_service.AnswerStreamParser()
+    pieces = []
+    for start in range(0, len(raw), step):
+        pieces.extend(parser.feed(raw[start : start + step]))
+    pieces.extend(parser.finish())
+    answer = "".join(text for section, text in pieces if section == "answer")
+    summary = "".join(text for section, text in pieces if section == "summary")
+    return answer, summary or None
+
+
+@pytest.mark.parametrize("raw", RAW_OUTPUTS)
+@pytest.mark.parametrize("step", [1, 2, 3, 7, 1000])
+def test_stream_parser_matches_non_streaming_parse(raw, step):
+    assert _parse_streamed(raw, step) == rag_service._parse_answer_and_summary(raw)
+
+
+def test_stream_parser_emits_answer_before_the_end():
+    parser = rag_service.AnswerStreamParser()
+    assert parser.feed("ANSWER: Fast") == [("answer", "Fast")]
+    # "SUM" could be the start of the marker, so it is held back
+    assert parser.feed("API is quick SUM") == [("answer", "API is quick")]
+    assert parser.feed("MARY: - speed") == [("summary", "- speed")]
+    assert parser.finish() == []
+
+
+@pytest.mark.asyncio
+async def test_stream_rag_answer_sends_sources_then_deltas_then_done(monkeypatch):
+    async def fake_search_chunks(http_request, query, k=3, **_):
+        return [
+            TextChunk(
+                id="doc1",
+                text="FastAPI is fast.",
+                score=0.9,
+                metadata=ChunkMetadata(source="docs.md", filename="docs.md"),
+            )
+        ]
+
+    async def fake_stream_chat_llm(_request, prompt, **_):
+        assert "FastAPI is fast." in prompt
+        for token in ["ANSWER: Fast", "API is fast [0].", "\nSUMMARY:", " - fast"]:
+            yield token
+
+    from app.core import retrieval
+    from app.services import openai_service
+
+    monkeypatch.setattr(retrieval, "search_chunks", fake_search_chunks)
+    monkeypatch.setattr(openai_service, "stream_chat_llm", fake_stream_chat_llm)
+
+    events = [
+        event
+        async for event in rag_service.stream_rag_answer(
+            http_request=None, question="What is FastAPI?", top_k=3
+        )
+    ]
+
+    names = [name for name, _ in events]
+    assert names[0] == "sources"
+    assert names[-1] == "done"
+    assert events[0][1]["sources"][0]["id"] == "doc1"
+    answer = "".join(d["delta"] for name, d in events if name == "answer")
+    summary = "".join(d["delta"] for name, d in events if name == "summary")
+    assert answer == "FastAPI is fast [0]."
+    assert summary == "- fast"
+    done = events[-1][1]
+    assert done["usage"] is None
+    assert done["first_token_ms"] is not None
+    assert done["total_ms"] >= done["retrieval_ms"]
+
+
+@pytest.mark.asyncio
+async def test_rag_with_answer_serves_paraphrases_from_answer_cache(monkeypatch):
+    from app.core import retrieval
+    from app.core.answer_cache import SemanticAnswerCache
+    from app.core.manifest import ManifestEntry, get_manifest
+    from app.services import openai_service
+
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, threshold=0.95)
+    monkeypatch.setattr(rag_service, "get_answer_cache", lambda: cache)
+
+    vectors = {
+        "What is FastAPI?": [1.0, 0.0],
+        "what's fastapi": [0.99, 0.02],
+        "How do I deploy?": [0.0, 1.0],
+    }
+
+    async def fake_embed_text(_request, text):
+        return vectors[text]
+
+    searched_with = []
+
+    async def fake_search_chunks(http_request, query, k=3, **kwargs):
+        searched_with.append(kwargs["query_embedding"])
+        return [
+            TextChunk(
+                id="doc1",
+                text="FastAPI is fast.",
+                score=0.9,
+                metadata=ChunkMetadata(source="docs.md", filename="docs.md"),
+            )
+        ]
+
+    llm_calls = []
+
+    async def fake_ask_llm(_request, prompt, **_):
+        llm_calls.append(prompt)
+        return "ANSWER: It is a framework.\nSUMMARY: - fast"
+
+    monkeypatch.setattr(openai_service, "embed_text", fake_embed_text)
+    monkeypatch.setattr(retrieval, "search_chunks", fake_search_chunks)
+    monkeypatch.setattr(openai_service, "ask_llm", fake_ask_llm)
+
+    first = await rag_service.rag_with_answer(None, "What is FastAPI?", top_k=3)
+    again = await rag_service.rag_with_answer(None, "what's fastapi", top_k=3)
+    other = await rag_service.rag_with_answer(None, "How do I deploy?", top_k=3)
+
+    assert first.cached is False
+    assert again.cached is True
+    assert again.answer == first.answer
+    assert other.cached is False
+    assert len(llm_calls) == 2
+    # The query embedding is reused for retrieval, not computed twice
+    assert searched_with == [[1.0, 0.0], [0.0, 1.0]]
+
+    # A different top_k is a different scope
+    assert (
+        await rag_service.rag_with_answer(None, "What is FastAPI?", 4)
+    ).cached is False
+
+    # New content in the collection invalidates earlier answers
+    get_manifest().put(
+        "docs",
+        ManifestEntry(
+            source="/data/new.txt",
+            content_hash="h",
+            size=1,
+            mtime_ns=1,
+            chunk_params={},
+            chunk_ids=["new.txt-p1-c0"],
+        ),
+    )
+    assert (
+        await rag_service.rag_with_answer(None, "What is FastAPI?", 3)
+    ).cached is False
+
+
+@pytest.mark.asyncio
+async def test_sources_follow_merged_context_blocks(monkeypatch, no_answer_cache):
+    def chunk(id_, text, score, chunk_number):
+        return TextChunk(
+            id=id_,
+            text=text,
+            score=score,
+            metadata=ChunkMetadata(
+                source="a.md", filename="a.md", page=1, chunk_number=chunk_number
+            ),
+        )
+
+    async def fake_search_chunks(http_request, query, k=3, **kwargs):
+        return [
+            chunk("far", "unrelated text", 0.9, 7),
+            chunk("c1", "alpha beta gamma", 0.2, 1),
+            chunk("c2", "beta gamma delta", 0.5, 2),
+        ]
+
+    prompts = []
+
+    async def fake_ask_llm(_request, prompt: str, **_) -> str:
+        prompts.append(prompt)
+        return "ANSWER:\nSee [0].\n\nSUMMARY:\n- x"
+
+    from app.core import retrieval
+    from app.services import openai_service
+
+    monkeypatch.setattr(retrieval, "search_chunks", fake_search_chunks)
+    monkeypatch.setattr(openai_service, "ask_llm", fake_ask_llm)
+
+    result = await rag_service.rag_with_answer(None, "question?", top_k=3)
+
+    # Adjacent chunks c1 and c2 became citation [0], without the repeated words
+    assert [s.chunk_ids for s in result.sources] == [["c1", "c2"], ["far"]]
+    assert result.sources[0].text == "alpha beta gamma delta"
+    assert result.sources[0].score == 0.2
+    assert "[0] [source=a.md, page=1, chunk=1]\nalpha beta gamma delta" in prompts[0]
+    assert "[1] [source=a.md, page=1, chunk=7]\nunrelated text" in prompts[0]